@@ -3,7 +3,10 @@ from datetime import datetime
 import logging
 import os
 
+from metrics import init_app as init_metrics
+
 app = Flask(__name__)
+init_metrics(app)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -0,0 +1,47 @@
+"""Métricas Prometheus do servidor web: contagem e latência de todas as
+rotas e o endpoint /metrics.
+
+Os valores são por processo; com vários workers, defina
+PROMETHEUS_MULTIPROC_DIR (diretório vazio e gravável) para que /metrics
+some o que cada processo gravou."""
+import os
+import time
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+    generate_latest, multiprocess
+)
+
+REQUESTS = Counter('http_requests_total', 'Requisições HTTP atendidas', ['method', 'route', 'status'])
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Latência das requisições HTTP', ['method', 'route'])
+
+
+def metrics_payload():
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def init_app(app):
+    """Registra a medição de todas as rotas e o endpoint /metrics."""
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUESTS.labels(request.method, route, response.status_code).inc()
+        if started is not None:
+            REQUEST_LATENCY.labels(request.method, route).observe(time.perf_counter() - started)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        payload, content_type = metrics_payload()
+        return Response(payload, content_type=content_type)
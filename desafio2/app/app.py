@@ -1,9 +1,18 @@
 import psycopg2
 from psycopg2 import sql
+from psycopg2.extras import execute_values
+import argparse
+import atexit
+import json
+import queue
+import re
+import threading
 import time
 import logging
-from datetime import datetime
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
 import os
+import sys
 
 logging.basicConfig(
     level=logging.INFO,
@@ -18,6 +27,29 @@ DB_CONFIG = {
     'port': os.getenv('DB_PORT', '5432')
 }
 
+BULK_PAGE_SIZE = int(os.getenv('BULK_PAGE_SIZE', '1000'))
+SYNTHETIC_BATCH_SIZE = int(os.getenv('SYNTHETIC_BATCH_SIZE', '50000'))
+LIST_PAGE_SIZE = int(os.getenv('LIST_PAGE_SIZE', '20'))
+BATCH_TX_SIZE = int(os.getenv('BATCH_TX_SIZE', '1000'))
+TASK_COLUMNS = ('id', 'title', 'description', 'status', 'created_at', 'updated_at')
+STATS_APPROXIMATE = os.getenv('STATS_APPROXIMATE', 'false').lower() in ('1', 'true', 'yes')
+
+LOG_PARTITIONS_AHEAD = int(os.getenv('LOG_PARTITIONS_AHEAD', '3'))
+LOG_RETENTION_MONTHS = int(os.getenv('LOG_RETENTION_MONTHS', '12'))
+LOG_MAINTENANCE_INTERVAL = float(os.getenv('LOG_MAINTENANCE_INTERVAL', '3600'))
+LOG_PARTITION_NAME = re.compile(r'^operation_logs_p(\d{4})(\d{2})$')
+
+AUDIT_MODE = os.getenv('AUDIT_MODE', 'strict')
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', '500'))
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', '1.0'))
+AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', '10000'))
+AUDIT_DEAD_LETTER_FILE = os.getenv('AUDIT_DEAD_LETTER_FILE', '')
+
+_connection = None
+_pending_audit = []
+_log_maintenance_due = float('inf')
+audit_writer = None
+
 def wait_for_db(max_retries=30):
     logging.info("Aguardando banco de dados estar pronto...")
     
@@ -35,139 +67,640 @@ def wait_for_db(max_retries=30):
     return False
 
 def get_db_connection():
+    """Conexão única da sessão; reaberta quando a anterior foi perdida."""
+    global _connection
+    if _connection is not None and not _connection.closed:
+        return _connection
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        return conn
+        _connection = psycopg2.connect(**DB_CONFIG)
+        return _connection
     except Exception as e:
         logging.error(f"Erro ao conectar ao banco: {e}")
         raise
 
-def initialize_database():
-    logging.info("Inicializando banco de dados...")
+def close_db_connection():
+    global _connection
+    if _connection is not None and not _connection.closed:
+        _connection.close()
+    _connection = None
+
+class AuditWriter:
+    """Grava eventos de operation_logs em lotes, numa thread com conexão
+    própria. Um lote é gravado ao juntar batch_size eventos ou flush_interval
+    segundos depois do primeiro evento pendente. A fila é limitada: cheia,
+    log_many() bloqueia até a thread abrir espaço. Só a perda de conexão é
+    repetida; eventos que o banco rejeita são descartados (e anexados a
+    AUDIT_DEAD_LETTER_FILE, se definido)."""
+    
+    def __init__(self, batch_size=AUDIT_BATCH_SIZE, flush_interval=AUDIT_FLUSH_INTERVAL,
+                 max_queue=AUDIT_QUEUE_SIZE):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._conn = None
+        self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self._thread.start()
+    
+    def log_many(self, events):
+        if not self._thread.is_alive():
+            self.dropped += len(events)
+            logging.error(f"✗ Auditoria em lotes inativa: {len(events)} eventos descartados")
+            return
+        now = datetime.now(timezone.utc)
+        for operation, details in events:
+            self._queue.put((operation, details, now))
+    
+    def close(self, timeout=10.0):
+        """Grava o que estiver na fila e encerra a thread."""
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logging.error(f"✗ Auditoria encerrada com {self._queue.qsize()} eventos não gravados")
+        else:
+            logging.info(
+                f"✓ Auditoria: {self.written} eventos gravados em {self.batches} lotes, "
+                f"{self.dropped} descartados"
+            )
+    
+    def _next_batch(self):
+        event = self._queue.get()
+        if event is None:
+            return [], True
+        
+        batch = [event]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                event = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if event is None:
+                return batch, True
+            batch.append(event)
+        return batch, False
+    
+    def _write(self, batch):
+        if self._conn is None or self._conn.closed:
+            self._conn = psycopg2.connect(**DB_CONFIG)
+        with self._conn.cursor() as cursor:
+            execute_values(
+                cursor,
+                "INSERT INTO operation_logs (operation, details, timestamp) VALUES %s",
+                batch,
+                page_size=len(batch)
+            )
+        self._conn.commit()
+        self.written += len(batch)
+        self.batches += 1
     
+    def _close_conn(self):
+        if self._conn is not None and not self._conn.closed:
+            self._conn.close()
+        self._conn = None
+    
+    def _rollback(self):
+        try:
+            self._conn.rollback()
+        except psycopg2.Error:
+            self._close_conn()
+    
+    def _dead_letter(self, event, error):
+        operation, details, timestamp = event
+        self.dropped += 1
+        logging.error(f"✗ Evento de auditoria descartado ({operation}): {str(error).strip()}")
+        if not AUDIT_DEAD_LETTER_FILE:
+            return
+        try:
+            with open(AUDIT_DEAD_LETTER_FILE, 'a', encoding='utf-8') as output:
+                output.write(json.dumps({
+                    'operation': operation,
+                    'details': details,
+                    'timestamp': timestamp.isoformat(),
+                    'error': str(error).strip()
+                }, ensure_ascii=False) + '\n')
+        except OSError as e:
+            logging.error(f"Erro ao gravar {AUDIT_DEAD_LETTER_FILE}: {e}")
+    
+    def _flush(self, batch):
+        while True:
+            try:
+                self._write(batch)
+                return
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                logging.error(f"Conexão da auditoria perdida, nova tentativa em 1s: {e}")
+                self._close_conn()
+                time.sleep(1)
+            except psycopg2.Error as e:
+                self._rollback()
+                if len(batch) == 1:
+                    self._dead_letter(batch[0], e)
+                    return
+                # Um evento rejeitado derruba o lote inteiro: regrava um a
+                # um para descartar só os que falham
+                for event in batch:
+                    self._flush([event])
+                return
+    
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                batch, stopping = self._next_batch()
+                if batch:
+                    self._flush(batch)
+            except Exception as e:
+                logging.error(f"Erro inesperado na auditoria em lotes: {e}")
+        self._close_conn()
+
+def start_audit_writer():
+    global audit_writer
+    audit_writer = AuditWriter()
+    atexit.register(audit_writer.close)
+    logging.info(f"✓ Auditoria em lotes ativa (lotes de {AUDIT_BATCH_SIZE}, a cada {AUDIT_FLUSH_INTERVAL}s)")
+
+def stop_audit_writer():
+    global audit_writer
+    if audit_writer is not None:
+        audit_writer.close()
+    audit_writer = None
+
+@contextmanager
+def transaction():
+    """Cursor numa transação da conexão da sessão: commit ao final e
+    rollback em caso de erro. Se a conexão cair, a próxima operação reconecta.
+    No modo de auditoria em lotes, os eventos só entram na fila após o commit."""
+    if time.monotonic() >= _log_maintenance_due:
+        maintain_log_partitions(get_db_connection())
     conn = get_db_connection()
-    cursor = conn.cursor()
+    del _pending_audit[:]
+    try:
+        with conn.cursor() as cursor:
+            yield cursor
+        conn.commit()
+    except Exception:
+        del _pending_audit[:]
+        if conn.closed:
+            logging.warning("Conexão com o banco perdida; será reaberta na próxima operação")
+        else:
+            conn.rollback()
+        raise
     
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS tasks (
-            id SERIAL PRIMARY KEY,
-            title VARCHAR(200) NOT NULL,
-            description TEXT,
-            status VARCHAR(20) DEFAULT 'pending',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    if _pending_audit:
+        audit_writer.log_many(_pending_audit)
+        del _pending_audit[:]
+
+def log_operations(cursor, events):
+    """Registra (operação, detalhes) em operation_logs: na própria transação
+    (modo strict) ou pelo AuditWriter depois do commit (modo batched)."""
+    if audit_writer is not None:
+        _pending_audit.extend(events)
+    else:
+        execute_values(
+            cursor,
+            "INSERT INTO operation_logs (operation, details) VALUES %s",
+            events,
+            page_size=BULK_PAGE_SIZE
         )
-    """)
+
+def initialize_database():
+    logging.info("Inicializando banco de dados...")
+    
+    with transaction() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id SERIAL PRIMARY KEY,
+                title VARCHAR(200) NOT NULL,
+                description TEXT,
+                status VARCHAR(20) DEFAULT 'pending',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        cursor.execute("CREATE INDEX IF NOT EXISTS tasks_created_at_idx ON tasks (created_at, id)")
+        
+        setup_operation_logs(cursor)
     
+    logging.info("✓ Banco de dados inicializado com sucesso!")
+
+def month_start(day, offset=0):
+    month = day.month - 1 + offset
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+def setup_operation_logs(cursor):
+    """operation_logs é particionada por mês em timestamp. Cria a tabela (ou
+    converte a de versões anteriores, preservando IDs), garante as partições
+    dos próximos LOG_PARTITIONS_AHEAD meses e remove as que passaram de
+    LOG_RETENTION_MONTHS."""
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('operation_logs')")
+    row = cursor.fetchone()
+    legacy = row is not None and row[0] != 'p'
+    if legacy:
+        logging.info("Convertendo operation_logs em tabela particionada...")
+        cursor.execute("ALTER SEQUENCE operation_logs_id_seq OWNED BY NONE")
+        cursor.execute("ALTER TABLE operation_logs RENAME TO operation_logs_legacy")
+        cursor.execute("ALTER INDEX operation_logs_pkey RENAME TO operation_logs_legacy_pkey")
+    
+    cursor.execute("CREATE SEQUENCE IF NOT EXISTS operation_logs_id_seq AS integer")
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS operation_logs (
-            id SERIAL PRIMARY KEY,
+            id INTEGER NOT NULL DEFAULT nextval('operation_logs_id_seq'),
             operation VARCHAR(50) NOT NULL,
             details TEXT,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
+            timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
     """)
+    cursor.execute("ALTER SEQUENCE operation_logs_id_seq OWNED BY operation_logs.id")
+    cursor.execute("CREATE INDEX IF NOT EXISTS operation_logs_timestamp_idx ON operation_logs (timestamp)")
     
-    conn.commit()
-    cursor.close()
-    conn.close()
+    cursor.execute("SELECT CURRENT_DATE")
+    today = cursor.fetchone()[0]
+    first_month = month_start(today)
+    if legacy:
+        cursor.execute("SELECT MIN(timestamp)::date FROM operation_logs_legacy")
+        oldest = cursor.fetchone()[0]
+        if oldest is not None:
+            first_month = min(first_month, month_start(oldest))
+    create_log_partitions(cursor, first_month, month_start(today, LOG_PARTITIONS_AHEAD))
     
-    logging.info("✓ Banco de dados inicializado com sucesso!")
+    if legacy:
+        cursor.execute("""
+            INSERT INTO operation_logs (id, operation, details, timestamp)
+            SELECT id, operation, details, COALESCE(timestamp, CURRENT_TIMESTAMP)
+            FROM operation_logs_legacy
+        """)
+        migrated = cursor.rowcount
+        cursor.execute("DROP TABLE operation_logs_legacy")
+        logging.info(f"✓ {migrated} logs migrados para operation_logs particionada")
+    
+    drop_expired_log_partitions(cursor, today)
+    schedule_log_maintenance(LOG_MAINTENANCE_INTERVAL)
 
-def add_task(title, description=""):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def schedule_log_maintenance(delay):
+    global _log_maintenance_due
+    _log_maintenance_due = time.monotonic() + delay
+
+def maintain_log_partitions(conn):
+    """Repete, a cada LOG_MAINTENANCE_INTERVAL segundos de sessão, a criação
+    das próximas partições e a retenção, numa transação própria antes da
+    operação seguinte: um processo longo não chega a um mês sem partição."""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT CURRENT_DATE")
+            today = cursor.fetchone()[0]
+            create_log_partitions(cursor, month_start(today), month_start(today, LOG_PARTITIONS_AHEAD))
+            drop_expired_log_partitions(cursor, today)
+        conn.commit()
+    except psycopg2.Error as e:
+        if not conn.closed:
+            conn.rollback()
+        logging.warning(f"Manutenção das partições de operation_logs falhou, nova tentativa em 60s: {e}")
+        schedule_log_maintenance(60)
+        return
+    schedule_log_maintenance(LOG_MAINTENANCE_INTERVAL)
+
+def create_log_partitions(cursor, first_month, last_month):
+    month = first_month
+    while month <= last_month:
+        next_month = month_start(month, 1)
+        cursor.execute(
+            sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF operation_logs FOR VALUES FROM ({}) TO ({})").format(
+                sql.Identifier(f"operation_logs_p{month:%Y%m}"),
+                sql.Literal(month),
+                sql.Literal(next_month)
+            )
+        )
+        month = next_month
+
+def drop_expired_log_partitions(cursor, today):
+    if LOG_RETENTION_MONTHS <= 0:
+        return []
+    
+    cutoff = month_start(today, -LOG_RETENTION_MONTHS)
+    cursor.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'operation_logs'::regclass
+    """)
+    expired = []
+    for (name,) in cursor.fetchall():
+        match = LOG_PARTITION_NAME.match(name)
+        if match and date(int(match.group(1)), int(match.group(2)), 1) < cutoff:
+            expired.append(name)
     
+    for name in sorted(expired):
+        cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(name)))
+        logging.info(f"✓ Partição {name} removida (retenção de {LOG_RETENTION_MONTHS} meses)")
+    return expired
+
+def insert_task(cursor, title, description=""):
     cursor.execute(
         "INSERT INTO tasks (title, description) VALUES (%s, %s) RETURNING id",
         (title, description)
     )
     task_id = cursor.fetchone()[0]
     
-    cursor.execute(
-        "INSERT INTO operation_logs (operation, details) VALUES (%s, %s)",
-        ("CREATE_TASK", f"Criada tarefa ID {task_id}: {title}")
-    )
-    
-    conn.commit()
-    cursor.close()
-    conn.close()
+    log_operations(cursor, [("CREATE_TASK", f"Criada tarefa ID {task_id}: {title}")])
+    return task_id
+
+def add_task(title, description=""):
+    with transaction() as cursor:
+        task_id = insert_task(cursor, title, description)
     
     logging.info(f"✓ Tarefa '{title}' adicionada com ID {task_id}")
     return task_id
 
-def list_tasks():
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def add_tasks_bulk(tasks):
+    """Insere uma lista de (título, descrição) e os respectivos logs com
+    INSERTs de várias linhas, numa única transação. Retorna os IDs criados."""
+    if not tasks:
+        return []
     
-    cursor.execute("""
-        SELECT id, title, description, status, created_at, updated_at
-        FROM tasks 
-        ORDER BY created_at DESC
-    """)
+    with transaction() as cursor:
+        created = execute_values(
+            cursor,
+            "INSERT INTO tasks (title, description) VALUES %s RETURNING id, title",
+            tasks,
+            page_size=BULK_PAGE_SIZE,
+            fetch=True
+        )
+        
+        log_operations(
+            cursor,
+            [("CREATE_TASK", f"Criada tarefa ID {task_id}: {title}") for task_id, title in created]
+        )
     
-    tasks = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    logging.info(f"✓ {len(created)} tarefas adicionadas em lote")
+    return [task_id for task_id, _ in created]
+
+def generate_synthetic_tasks(count, batch_size=SYNTHETIC_BATCH_SIZE):
+    """Gera tarefas sintéticas no próprio servidor (generate_series), em
+    transações de até batch_size tarefas. Os logs de criação são gravados
+    pelo mesmo comando, em qualquer modo de auditoria."""
+    logging.info(f"Gerando {count} tarefas sintéticas...")
+    started = time.perf_counter()
+    generated = 0
+    
+    while generated < count:
+        size = min(batch_size, count - generated)
+        with transaction() as cursor:
+            cursor.execute("""
+                WITH inserted AS (
+                    INSERT INTO tasks (title, description, status)
+                    SELECT 'Tarefa sintética ' || n,
+                           'Gerada automaticamente para testes de volume',
+                           (ARRAY['pending', 'in_progress', 'completed', 'cancelled'])[1 + n %% 4]
+                    FROM generate_series(%s, %s) AS n
+                    RETURNING id, title
+                )
+                INSERT INTO operation_logs (operation, details)
+                SELECT 'CREATE_TASK', 'Criada tarefa ID ' || id || ': ' || title
+                FROM inserted
+            """, (generated + 1, generated + size))
+        generated += size
+        logging.info(f"  {generated}/{count} tarefas geradas")
     
-    return tasks
+    elapsed = time.perf_counter() - started
+    logging.info(f"✓ {count} tarefas sintéticas geradas em {elapsed:.1f}s ({count / max(elapsed, 1e-9):.0f} tarefas/s)")
+    return count
 
-def update_task_status(task_id, new_status):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def select_tasks(cursor, limit=LIST_PAGE_SIZE, after=None):
+    """Uma página de tarefas, da mais recente para a mais antiga. after é o
+    (created_at, id) da última tarefa da página anterior (paginação por
+    chave, servida pelo índice tasks_created_at_idx)."""
+    if after is None:
+        cursor.execute("""
+            SELECT id, title, description, status, created_at, updated_at
+            FROM tasks 
+            ORDER BY created_at DESC, id DESC
+            LIMIT %s
+        """, (limit,))
+    else:
+        cursor.execute("""
+            SELECT id, title, description, status, created_at, updated_at
+            FROM tasks 
+            WHERE (created_at, id) < (%s, %s)
+            ORDER BY created_at DESC, id DESC
+            LIMIT %s
+        """, (after[0], after[1], limit))
+    
+    return cursor.fetchall()
+
+def list_tasks(limit=LIST_PAGE_SIZE, after=None):
+    with transaction() as cursor:
+        return select_tasks(cursor, limit, after)
+
+def show_task_pages(page_size=LIST_PAGE_SIZE):
+    after = None
+    page = 1
     
+    while True:
+        tasks = list_tasks(page_size, after)
+        if not tasks:
+            print("\nNenhuma tarefa encontrada." if after is None else "\nFim da lista.")
+            return
+        
+        print("\n" + "=" * 60)
+        print(f"LISTA DE TAREFAS - página {page}")
+        print("=" * 60)
+        for task in tasks:
+            print(f"\nID: {task[0]}")
+            print(f"Título: {task[1]}")
+            print(f"Descrição: {task[2]}")
+            print(f"Status: {task[3]}")
+            print(f"Criada em: {task[4]}")
+            print(f"Atualizada em: {task[5]}")
+            print("-" * 60)
+        
+        if len(tasks) < page_size:
+            return
+        if input("\nEnter para a próxima página, 'q' para voltar: ").strip().lower() == 'q':
+            return
+        after = (tasks[-1][4], tasks[-1][0])
+        page += 1
+
+def set_task_status(cursor, task_id, new_status):
     cursor.execute(
         "UPDATE tasks SET status = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
         (new_status, task_id)
     )
     
-    cursor.execute(
-        "INSERT INTO operation_logs (operation, details) VALUES (%s, %s)",
-        ("UPDATE_TASK", f"Tarefa ID {task_id} atualizada para status '{new_status}'")
-    )
-    
-    conn.commit()
-    cursor.close()
-    conn.close()
+    log_operations(cursor, [("UPDATE_TASK", f"Tarefa ID {task_id} atualizada para status '{new_status}'")])
+
+def update_task_status(task_id, new_status):
+    with transaction() as cursor:
+        set_task_status(cursor, task_id, new_status)
     
     logging.info(f"✓ Tarefa ID {task_id} atualizada para status '{new_status}'")
 
-def get_statistics():
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def get_statistics(approximate=False):
+    """Contagens por status, de tarefas e de operações numa única consulta.
+    Com approximate=True, usa as estimativas do planner (pg_class.reltuples
+    e pg_stats), sem varrer as tabelas; se tasks ainda não foi analisada,
+    faz a contagem exata."""
+    with transaction() as cursor:
+        return select_statistics(cursor, approximate)
+
+def select_statistics(cursor, approximate=False):
+    if approximate:
+        stats = select_approximate_statistics(cursor)
+        if stats is not None:
+            return stats
     
     cursor.execute("""
-        SELECT status, COUNT(*) 
-        FROM tasks 
-        GROUP BY status
+        SELECT GROUPING(status) = 1, status, COUNT(*),
+               (SELECT COUNT(*) FROM operation_logs)
+        FROM tasks
+        GROUP BY GROUPING SETS ((status), ())
     """)
-    status_counts = dict(cursor.fetchall())
+    rows = cursor.fetchall()
     
-    cursor.execute("SELECT COUNT(*) FROM tasks")
-    total_tasks = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM operation_logs")
-    total_operations = cursor.fetchone()[0]
-    
-    cursor.close()
-    conn.close()
+    status_counts = {status: count for is_total, status, count, _ in rows if not is_total}
+    total_tasks = next(count for is_total, _, count, _ in rows if is_total)
     
     return {
         'total_tasks': total_tasks,
         'status_counts': status_counts,
-        'total_operations': total_operations
+        'total_operations': rows[0][3],
+        'approximate': False
+    }
+
+def select_approximate_statistics(cursor):
+    cursor.execute("""
+        SELECT t.reltuples,
+               (SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = 'operation_logs'::regclass),
+               s.most_common_vals::text::text[],
+               s.most_common_freqs
+        FROM pg_class t
+        LEFT JOIN pg_stats s
+          ON s.schemaname = 'public' AND s.tablename = 'tasks' AND s.attname = 'status'
+        WHERE t.oid = 'tasks'::regclass
+    """)
+    reltuples, operations, values, freqs = cursor.fetchone()
+    
+    if reltuples < 0:
+        logging.info("Estatísticas de tasks indisponíveis (tabela ainda não analisada); usando contagem exata")
+        return None
+    
+    return {
+        'total_tasks': int(reltuples),
+        'status_counts': {status: round(freq * reltuples) for status, freq in zip(values or [], freqs or [])},
+        'total_operations': int(operations),
+        'approximate': True
     }
 
+def parse_operation(line):
+    """Converte uma linha NDJSON do modo lote em (operação, parâmetros)."""
+    op = json.loads(line)
+    kind = op.get('op')
+    if kind == 'create':
+        if not op.get('title'):
+            raise ValueError("create sem title")
+        return kind, (str(op['title']), str(op.get('description', '')))
+    if kind == 'update_status':
+        return kind, (int(op['id']), str(op['status']))
+    if kind == 'list':
+        after = op.get('after')
+        return kind, (int(op.get('limit', LIST_PAGE_SIZE)), tuple(after) if after else None)
+    if kind == 'stats':
+        return kind, (bool(op.get('approximate', False)),)
+    raise ValueError(f"operação desconhecida: {kind!r}")
+
+def read_operation_batches(source, size):
+    batch = []
+    for line_number, line in enumerate(source, 1):
+        if not line.strip():
+            continue
+        try:
+            kind, params = parse_operation(line)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"linha {line_number}: {e}") from e
+        batch.append((line_number, kind, params))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def execute_operation(cursor, kind, params):
+    if kind == 'create':
+        return {'id': insert_task(cursor, *params)}
+    if kind == 'update_status':
+        set_task_status(cursor, *params)
+        return None
+    if kind == 'list':
+        tasks = select_tasks(cursor, *params)
+        return {'tasks': [dict(zip(TASK_COLUMNS, task)) for task in tasks]}
+    return select_statistics(cursor, *params)
+
+def run_batch(source, tx_size=BATCH_TX_SIZE):
+    """Executa operações NDJSON (create, update_status, list, stats) em
+    transações de tx_size operações na conexão da sessão. Os resultados de
+    create, list e stats saem em NDJSON no stdout depois do commit do lote;
+    a vazão de cada lote vai para o log. Um erro desfaz o lote corrente e
+    interrompe a execução; os lotes anteriores continuam gravados."""
+    started = time.perf_counter()
+    total = 0
+    batch_number = 0
+    
+    try:
+        for batch in read_operation_batches(source, tx_size):
+            batch_started = time.perf_counter()
+            results = []
+            with transaction() as cursor:
+                for line_number, kind, params in batch:
+                    result = execute_operation(cursor, kind, params)
+                    if result is not None:
+                        results.append({'line': line_number, 'op': kind, **result})
+            elapsed = time.perf_counter() - batch_started
+            batch_number += 1
+            
+            for result in results:
+                print(json.dumps(result, default=str, ensure_ascii=False))
+            total += len(batch)
+            logging.info(
+                f"Lote {batch_number}: {len(batch)} operações em {elapsed:.3f}s "
+                f"({len(batch) / max(elapsed, 1e-9):.0f} ops/s)"
+            )
+    except Exception as e:
+        logging.error(f"✗ Lote {batch_number + 1} desfeito: {e}")
+        return False
+    
+    elapsed = time.perf_counter() - started
+    logging.info(f"✓ {total} operações em {batch_number} lotes, {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} ops/s)")
+    return True
+
+def run_batch_file(path, tx_size=BATCH_TX_SIZE):
+    if path == '-':
+        return run_batch(sys.stdin, tx_size)
+    with open(path, encoding='utf-8') as source:
+        return run_batch(source, tx_size)
+
 def show_menu():
     print("\n" + "=" * 60)
     print("SISTEMA DE GERENCIAMENTO DE TAREFAS")
     print("=" * 60)
     print("1. Adicionar nova tarefa")
-    print("2. Listar todas as tarefas")
+    print("2. Listar tarefas (paginado)")
     print("3. Atualizar status de tarefa")
     print("4. Ver estatísticas")
     print("5. Adicionar tarefas de exemplo")
-    print("6. Sair")
+    print("6. Gerar tarefas sintéticas em massa")
+    print("7. Sair")
     print("=" * 60)
 
 def add_sample_tasks():
@@ -179,12 +712,30 @@ def add_sample_tasks():
     ]
     
     logging.info("Adicionando tarefas de exemplo...")
-    for title, desc in samples:
-        add_task(title, desc)
+    add_tasks_bulk(samples)
     
     logging.info(f"✓ {len(samples)} tarefas de exemplo adicionadas!")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Gerenciamento de tarefas com PostgreSQL")
+    parser.add_argument('--generate', type=int, metavar='N',
+                        help="gera N tarefas sintéticas e encerra, sem abrir o menu")
+    parser.add_argument('--batch-size', type=int, default=SYNTHETIC_BATCH_SIZE,
+                        help="tarefas por transação na geração sintética")
+    parser.add_argument('--batch', metavar='ARQUIVO',
+                        help="executa operações NDJSON do arquivo ('-' para stdin) e encerra, sem abrir o menu")
+    parser.add_argument('--batch-tx-size', type=int, default=BATCH_TX_SIZE,
+                        help="operações por transação no modo lote")
+    parser.add_argument('--approx-stats', action='store_true', default=STATS_APPROXIMATE,
+                        help="estatísticas estimadas pelo planner, sem varrer as tabelas")
+    parser.add_argument('--audit-mode', choices=('strict', 'batched'), default=AUDIT_MODE,
+                        help="strict: log na mesma transação da operação; batched: logs "
+                             "gravados em lotes por uma thread (eventos na fila se perdem se o processo morrer)")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    
     logging.info("=" * 60)
     logging.info("Iniciando aplicação de gerenciamento de tarefas")
     logging.info("=" * 60)
@@ -193,8 +744,27 @@ def main():
         logging.error("Encerrando aplicação - banco de dados indisponível")
         return
     
-    initialize_database()
-    
+    try:
+        initialize_database()
+        
+        if args.audit_mode == 'batched':
+            start_audit_writer()
+        
+        if args.generate:
+            generate_synthetic_tasks(args.generate, args.batch_size)
+            return
+        
+        if args.batch:
+            if not run_batch_file(args.batch, args.batch_tx_size):
+                sys.exit(1)
+            return
+        
+        run_menu(args)
+    finally:
+        stop_audit_writer()
+        close_db_connection()
+
+def run_menu(args):
     while True:
         show_menu()
         choice = input("\nEscolha uma opção: ").strip()
@@ -209,21 +779,7 @@ def main():
                     print("✗ Título não pode ser vazio!")
             
             elif choice == '2':
-                tasks = list_tasks()
-                if tasks:
-                    print("\n" + "=" * 60)
-                    print("LISTA DE TAREFAS")
-                    print("=" * 60)
-                    for task in tasks:
-                        print(f"\nID: {task[0]}")
-                        print(f"Título: {task[1]}")
-                        print(f"Descrição: {task[2]}")
-                        print(f"Status: {task[3]}")
-                        print(f"Criada em: {task[4]}")
-                        print(f"Atualizada em: {task[5]}")
-                        print("-" * 60)
-                else:
-                    print("\nNenhuma tarefa encontrada.")
+                show_task_pages()
             
             elif choice == '3':
                 task_id = input("ID da tarefa: ").strip()
@@ -235,9 +791,9 @@ def main():
                     print("✗ Entrada inválida!")
             
             elif choice == '4':
-                stats = get_statistics()
+                stats = get_statistics(args.approx_stats)
                 print("\n" + "=" * 60)
-                print("ESTATÍSTICAS DO BANCO DE DADOS")
+                print("ESTATÍSTICAS DO BANCO DE DADOS" + (" (aproximadas)" if stats['approximate'] else ""))
                 print("=" * 60)
                 print(f"Total de tarefas: {stats['total_tasks']}")
                 print(f"Total de operações registradas: {stats['total_operations']}")
@@ -249,6 +805,13 @@ def main():
                 add_sample_tasks()
             
             elif choice == '6':
+                count = input("Quantidade de tarefas: ").strip()
+                if count.isdigit() and int(count) > 0:
+                    generate_synthetic_tasks(int(count))
+                else:
+                    print("✗ Quantidade inválida!")
+            
+            elif choice == '7':
                 print("\nEncerrando aplicação...")
                 break
             
@@ -1,4 +1,6 @@
 import psycopg2
+import psycopg2.extensions
+import argparse
 import time
 import logging
 import os
@@ -16,6 +18,13 @@ DB_CONFIG = {
     'port': os.getenv('DB_PORT', '5432')
 }
 
+READER_ITERSIZE = int(os.getenv('READER_ITERSIZE', '2000'))
+
+EXPORT_QUERIES = {
+    'tasks': "SELECT id, title, description, status, created_at, updated_at FROM tasks",
+    'operation_logs': "SELECT id, operation, details, timestamp FROM operation_logs"
+}
+
 def wait_for_db(max_retries=30):
     logging.info("Aguardando banco de dados estar pronto...")
     
@@ -31,24 +40,35 @@ def wait_for_db(max_retries=30):
     
     return False
 
-def read_all_tasks():
+def open_snapshot():
+    """Conexão única do leitor, numa transação somente leitura REPEATABLE
+    READ: todas as consultas enxergam o mesmo instante do banco."""
     conn = psycopg2.connect(**DB_CONFIG)
-    cursor = conn.cursor()
+    conn.set_session(
+        isolation_level=psycopg2.extensions.ISOLATION_LEVEL_REPEATABLE_READ,
+        readonly=True
+    )
+    return conn
+
+def read_all_tasks(conn, itersize=READER_ITERSIZE):
+    """Percorre as tarefas com um cursor nomeado (do lado do servidor), que
+    traz itersize linhas por ida ao banco: memória constante em qualquer volume."""
+    cursor = conn.cursor(name='read_all_tasks')
+    cursor.itersize = itersize
     
     cursor.execute("""
         SELECT id, title, description, status, created_at, updated_at 
         FROM tasks 
-        ORDER BY created_at DESC
+        ORDER BY created_at DESC, id DESC
     """)
     
-    tasks = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    
-    return tasks
+    try:
+        for task in cursor:
+            yield task
+    finally:
+        cursor.close()
 
-def read_operation_logs():
-    conn = psycopg2.connect(**DB_CONFIG)
+def read_operation_logs(conn):
     cursor = conn.cursor()
     
     cursor.execute("""
@@ -60,34 +80,86 @@ def read_operation_logs():
     
     logs = cursor.fetchall()
     cursor.close()
-    conn.close()
     
     return logs
 
-def get_database_info():
-    conn = psycopg2.connect(**DB_CONFIG)
+def get_database_info(conn):
     cursor = conn.cursor()
     
     cursor.execute("SELECT pg_database_size(current_database())")
     db_size = cursor.fetchone()[0]
     
     cursor.execute("""
-        SELECT table_name 
-        FROM information_schema.tables 
-        WHERE table_schema = 'public'
+        SELECT c.relname
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public'
+          AND c.relkind IN ('r', 'p')
+          AND NOT c.relispartition
+        ORDER BY c.relname
     """)
     tables = [row[0] for row in cursor.fetchall()]
     
+    cursor.execute("""
+        SELECT COUNT(*)
+        FROM pg_inherits
+        WHERE inhparent = to_regclass('operation_logs')
+    """)
+    log_partitions = cursor.fetchone()[0]
+    
     cursor.close()
-    conn.close()
     
     return {
         'size_bytes': db_size,
         'size_mb': db_size / (1024 * 1024),
-        'tables': tables
+        'tables': tables,
+        'log_partitions': log_partitions
     }
 
+def export_table(conn, table, path, fmt):
+    """Grava a tabela em path com COPY ... TO STDOUT; as linhas são
+    formatadas pelo servidor. NDJSON usa row_to_json num COPY em modo CSV
+    com aspas e delimitador que nunca aparecem no JSON, para que a saída
+    não seja escapada."""
+    query = EXPORT_QUERIES[table]
+    if fmt == 'csv':
+        copy_sql = f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)"
+    else:
+        copy_sql = (
+            f"COPY (SELECT row_to_json(t) FROM ({query}) t) TO STDOUT "
+            "WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')"
+        )
+    
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    with open(path, 'wb') as output:
+        cursor.copy_expert(copy_sql, output)
+    rows = cursor.rowcount
+    cursor.close()
+    
+    elapsed = time.perf_counter() - started
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    logging.info(f"✓ {table}: {rows} linhas, {size_mb:.2f} MB em {elapsed:.2f}s -> {path}")
+    return rows
+
+def export_data(conn, directory, fmt):
+    os.makedirs(directory, exist_ok=True)
+    for table in EXPORT_QUERIES:
+        export_table(conn, table, os.path.join(directory, f"{table}.{fmt}"), fmt)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Leitor dos dados persistidos")
+    parser.add_argument('--itersize', type=int, default=READER_ITERSIZE,
+                        help="linhas buscadas por ida ao banco ao percorrer as tarefas")
+    parser.add_argument('--export', metavar='DIR',
+                        help="exporta tasks e operation_logs para DIR e encerra")
+    parser.add_argument('--format', choices=('csv', 'ndjson'), default='csv',
+                        help="formato dos arquivos exportados")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    
     print("=" * 70)
     print("LEITOR DE DADOS PERSISTIDOS - Demonstração de Persistência")
     print("=" * 70)
@@ -99,25 +171,37 @@ def main():
         logging.error("✗ Não foi possível conectar ao banco de dados")
         return
     
-    db_info = get_database_info()
+    conn = open_snapshot()
+    try:
+        if args.export:
+            export_data(conn, args.export, args.format)
+        else:
+            show_data(conn, args.itersize)
+    finally:
+        conn.close()
+
+def show_data(conn, itersize):
+    db_info = get_database_info(conn)
     print(f"\n📊 INFORMAÇÕES DO BANCO DE DADOS")
     print(f"Tamanho: {db_info['size_mb']:.2f} MB")
     print(f"Tabelas: {', '.join(db_info['tables'])}")
+    print(f"Partições mensais de operation_logs: {db_info['log_partitions']}")
     
     print("\n" + "=" * 70)
     print("📝 TAREFAS PERSISTIDAS")
     print("=" * 70)
     
-    tasks = read_all_tasks()
-    if tasks:
-        for task in tasks:
-            print(f"\n┌─ Tarefa ID: {task[0]}")
-            print(f"│  Título: {task[1]}")
-            print(f"│  Descrição: {task[2]}")
-            print(f"│  Status: {task[3]}")
-            print(f"│  Criada em: {task[4]}")
-            print(f"└─ Atualizada em: {task[5]}")
-        print(f"\n✓ Total de tarefas encontradas: {len(tasks)}")
+    total_tasks = 0
+    for task in read_all_tasks(conn, itersize):
+        print(f"\n┌─ Tarefa ID: {task[0]}")
+        print(f"│  Título: {task[1]}")
+        print(f"│  Descrição: {task[2]}")
+        print(f"│  Status: {task[3]}")
+        print(f"│  Criada em: {task[4]}")
+        print(f"└─ Atualizada em: {task[5]}")
+        total_tasks += 1
+    if total_tasks:
+        print(f"\n✓ Total de tarefas encontradas: {total_tasks}")
     else:
         print("\n⚠️  Nenhuma tarefa encontrada no banco de dados.")
         print("Execute a aplicação principal primeiro para criar dados.")
@@ -126,7 +210,7 @@ def main():
     print("📋 HISTÓRICO DE OPERAÇÕES (últimas 20)")
     print("=" * 70)
     
-    logs = read_operation_logs()
+    logs = read_operation_logs(conn)
     if logs:
         for log in logs:
             print(f"\n[{log[3]}] {log[1]}")
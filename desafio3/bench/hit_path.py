@@ -0,0 +1,90 @@
+"""Compara o custo de CPU do caminho de cache hit antigo (json.loads +
+jsonify de um dicionário) com o novo (bytes do cache repassados direto
+na resposta). Uso: python bench/hit_path.py [--requests N] [--json]"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'web'))
+
+from flask import Flask, jsonify
+
+from app import fragment_response
+from catalog import dumps
+
+bench_app = Flask(__name__)
+
+
+def make_products(count):
+    base = datetime(2024, 1, 1)
+    return [{
+        "id": i,
+        "name": f"Produto {i}",
+        "description": "Descrição do produto de teste " * 3,
+        "price": 10.0 + i,
+        "stock": i % 100,
+        "created_at": (base + timedelta(minutes=i)).isoformat(),
+        "updated_at": (base + timedelta(minutes=i)).isoformat()
+    } for i in range(1, count + 1)]
+
+
+def old_hit(cached):
+    payload = json.loads(cached)
+    payload["source"] = "cache"
+    return jsonify(payload).get_data()
+
+
+def new_hit(cached):
+    return fragment_response("cache", cached).get_data()
+
+
+def measure(func, cached, requests):
+    start = time.process_time()
+    for _ in range(requests):
+        func(cached)
+    return (time.process_time() - start) / requests * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do caminho de cache hit")
+    parser.add_argument('--requests', type=int, default=2000, help="Requisições simuladas por cenário")
+    parser.add_argument('--json', action='store_true', help="Saída em JSON")
+    args = parser.parse_args()
+
+    products = make_products(1000)
+    scenarios = {
+        "product": {"product": products[0]},
+        "page": {"limit": 20, "products": products[:20], "next_after": "x"},
+        "all": {"products": products}
+    }
+
+    results = {}
+    with bench_app.app_context():
+        for name, payload in scenarios.items():
+            old_cached = json.dumps(payload).encode('utf-8')
+            new_cached = dumps(payload)
+            requests = max(args.requests // len(payload.get("products", [None])), 20)
+            old_us = measure(old_hit, old_cached, requests)
+            new_us = measure(new_hit, new_cached, requests)
+            results[name] = {
+                "requests": requests,
+                "old_cpu_us": round(old_us, 1),
+                "new_cpu_us": round(new_us, 1),
+                "speedup": round(old_us / new_us, 1) if new_us else None,
+                "old_bytes": len(old_cached),
+                "new_bytes": len(new_cached)
+            }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'cenário':<10}{'antigo (µs)':>14}{'novo (µs)':>12}{'ganho':>8}{'bytes antigo':>15}{'bytes novo':>12}")
+        for name, r in results.items():
+            print(f"{name:<10}{r['old_cpu_us']:>14}{r['new_cpu_us']:>12}{r['speedup']:>7}x{r['old_bytes']:>15}{r['new_bytes']:>12}")
+
+
+if __name__ == '__main__':
+    main()
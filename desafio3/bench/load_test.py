@@ -0,0 +1,360 @@
+"""Teste de carga da API de produtos (desafio3/web/app.py) contra o
+Postgres e o Redis reais do docker-compose.
+
+Dispara requisições concorrentes por um tempo fixo, com escolha de chaves
+uniforme ou Zipfiana e uma fração configurável de escritas, e reporta por
+rota: throughput, latência p50/p95/p99 e taxa de acerto do cache (lida do
+campo "source" das respostas). O resultado pode ser salvo em JSON e
+comparado com uma execução anterior para detectar regressões.
+
+Uso:
+    docker compose up -d --build
+    python bench/load_test.py --seed-products 10000 --duration 30 \\
+        --concurrency 32 --distribution zipf --write-ratio 0.02 \\
+        --output bench/results/atual.json --compare bench/results/base.json
+"""
+import argparse
+import bisect
+import csv
+import io
+import itertools
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+try:
+    import brotli  # noqa: F401 (permite ao urllib3 decodificar respostas br)
+    DEFAULT_ACCEPT_ENCODING = "gzip, br"
+except ImportError:
+    DEFAULT_ACCEPT_ENCODING = "gzip"
+
+WORDS = [
+    "notebook", "mouse", "teclado", "monitor", "cadeira", "headset", "webcam",
+    "impressora", "roteador", "tablet", "celular", "carregador", "cabo", "ssd",
+    "memoria", "processador", "gabinete", "fonte", "microfone", "caixa"
+]
+ADJECTIVES = ["gamer", "sem fio", "ultra", "compacto", "profissional", "basico", "premium", "rgb"]
+DEFAULT_MIX = "product=60,page=20,search=10,batch=5,all=5"
+PAGE_LIMIT = 20
+BATCH_SIZE = 20
+
+
+class KeyChooser:
+    """Escolhe índices em [0, n) de forma uniforme ou Zipfiana (o índice 0
+    é o mais popular)."""
+
+    def __init__(self, n, distribution, s, rng):
+        self.n = n
+        self.rng = rng
+        self.cumulative = None
+        if distribution == "zipf":
+            weights = [1.0 / (rank ** s) for rank in range(1, n + 1)]
+            self.cumulative = list(itertools.accumulate(weights))
+
+    def choose(self):
+        if self.cumulative is None:
+            return self.rng.randrange(self.n)
+        return bisect.bisect_left(self.cumulative, self.rng.random() * self.cumulative[-1])
+
+
+def seed_products(session, base_url, count):
+    rng = random.Random(42)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["name", "description", "price", "stock"])
+    for i in range(count):
+        name = f"{rng.choice(WORDS).title()} {rng.choice(ADJECTIVES)} {i}"
+        writer.writerow([name, f"{name} para testes de carga", f"{rng.uniform(10, 5000):.2f}", rng.randrange(500)])
+    response = session.post(
+        f"{base_url}/products/import",
+        data=buffer.getvalue().encode('utf-8'),
+        headers={"Content-Type": "text/csv"},
+        timeout=300
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def crawl_catalog(session, base_url, max_keys):
+    """Percorre a listagem paginada e retorna (ids, cursores de página)."""
+    ids = []
+    cursors = [None]
+    after = None
+    while len(ids) < max_keys:
+        params = {"limit": PAGE_LIMIT}
+        if after:
+            params["after"] = after
+        payload = session.get(f"{base_url}/products", params=params, timeout=30).json()
+        ids.extend(product["id"] for product in payload["products"])
+        after = payload.get("next_after")
+        if not after:
+            break
+        cursors.append(after)
+    return ids[:max_keys], cursors
+
+
+def parse_mix(text):
+    mix = {}
+    for item in text.split(','):
+        route, weight = item.split('=')
+        mix[route.strip()] = float(weight)
+    unknown = set(mix) - {"product", "page", "search", "batch", "all"}
+    if unknown:
+        raise ValueError(f"Unknown routes in mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+class Worker(threading.Thread):
+    def __init__(self, index, args, ids, cursors, deadline, record):
+        super().__init__(name=f"load-{index}", daemon=True)
+        self.args = args
+        self.ids = ids
+        self.cursors = cursors
+        self.deadline = deadline
+        self.record = record
+        self.rng = random.Random(args.seed + index)
+        self.session = requests.Session()
+        self.session.headers["Accept-Encoding"] = args.accept_encoding
+        self.products = KeyChooser(len(ids), args.distribution, args.zipf_s, self.rng)
+        self.pages = KeyChooser(len(cursors), args.distribution, args.zipf_s, self.rng)
+        self.terms = KeyChooser(len(WORDS), args.distribution, args.zipf_s, self.rng)
+        self.routes = list(args.mix)
+        self.weights = list(itertools.accumulate(args.mix.values()))
+
+    def next_request(self):
+        url = self.args.url
+        if self.rng.random() < self.args.write_ratio:
+            product_id = self.ids[self.products.choose()]
+            return "write", "PUT", f"{url}/products/{product_id}", {"stock": self.rng.randrange(500)}
+
+        route = self.routes[bisect.bisect_left(self.weights, self.rng.random() * self.weights[-1])]
+        if route == "product":
+            return route, "GET", f"{url}/products/{self.ids[self.products.choose()]}", None
+        if route == "page":
+            after = self.cursors[self.pages.choose()]
+            query = f"?limit={PAGE_LIMIT}" + (f"&after={after}" if after else "")
+            return route, "GET", f"{url}/products{query}", None
+        if route == "search":
+            return route, "GET", f"{url}/products/search?q={WORDS[self.terms.choose()]}", None
+        if route == "batch":
+            ids = [self.ids[self.products.choose()] for _ in range(BATCH_SIZE)]
+            return route, "POST", f"{url}/products/batch", {"ids": ids}
+        return route, "GET", f"{url}/products", None
+
+    def run(self):
+        while time.monotonic() < self.deadline:
+            route, method, url, body = self.next_request()
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, json=body, timeout=self.args.timeout)
+                content = response.content
+                latency = time.perf_counter() - start
+                ok = response.status_code < 400
+            except requests.exceptions.RequestException:
+                latency = time.perf_counter() - start
+                content = b''
+                ok = False
+            self.record(
+                route,
+                latency,
+                ok,
+                content.count(b'"source":"cache"'),
+                content.count(b'"source":"database"')
+            )
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+
+    def __call__(self, route, latency, ok, hits, misses):
+        with self.lock:
+            stats = self.routes.setdefault(route, {"latencies": [], "errors": 0, "hits": 0, "misses": 0})
+            stats["latencies"].append(latency)
+            stats["errors"] += 0 if ok else 1
+            stats["hits"] += hits
+            stats["misses"] += misses
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def summarize(stats, elapsed):
+    latencies = sorted(stats["latencies"])
+    lookups = stats["hits"] + stats["misses"]
+    return {
+        "requests": len(latencies),
+        "errors": stats["errors"],
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+            "p50": round(percentile(latencies, 0.50) * 1000, 3) if latencies else None,
+            "p95": round(percentile(latencies, 0.95) * 1000, 3) if latencies else None,
+            "p99": round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+            "max": round(latencies[-1] * 1000, 3) if latencies else None
+        },
+        "cache_hits": stats["hits"],
+        "cache_misses": stats["misses"],
+        "hit_ratio": round(stats["hits"] / lookups, 4) if lookups else None
+    }
+
+
+def run_phase(args, ids, cursors, duration):
+    recorder = Recorder()
+    deadline = time.monotonic() + duration
+    workers = [Worker(index, args, ids, cursors, deadline, recorder) for index in range(args.concurrency)]
+    start = time.monotonic()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return recorder, time.monotonic() - start
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, max_regression):
+    """Lista regressões por rota: p95 ou p99 maiores, throughput ou taxa de
+    acerto menores que a base além da tolerância."""
+    regressions = []
+    for route, now in current["routes"].items():
+        before = baseline.get("routes", {}).get(route)
+        if not before or not now["requests"] or not before["requests"]:
+            continue
+        for metric in ("p95", "p99"):
+            old, new = before["latency_ms"][metric], now["latency_ms"][metric]
+            if old and new > old * (1 + max_regression):
+                regressions.append(f"{route}: {metric} {old} ms -> {new} ms")
+        old, new = before["throughput_rps"], now["throughput_rps"]
+        if old and new < old * (1 - max_regression):
+            regressions.append(f"{route}: throughput {old} -> {new} req/s")
+        old, new = before["hit_ratio"], now["hit_ratio"]
+        if old is not None and new is not None and new < old - max_regression:
+            regressions.append(f"{route}: hit ratio {old} -> {new}")
+    return regressions
+
+
+def print_report(result):
+    print(f"{'rota':<10}{'req':>9}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'erros':>8}{'hit %':>8}")
+    for route, r in sorted(result["routes"].items()) + [("total", result["overall"])]:
+        latency = r["latency_ms"]
+        hit = f"{r['hit_ratio'] * 100:.1f}" if r["hit_ratio"] is not None else "-"
+        print(
+            f"{route:<10}{r['requests']:>9}{r['throughput_rps']:>10}{latency['p50'] or '-':>10}"
+            f"{latency['p95'] or '-':>10}{latency['p99'] or '-':>10}{r['errors']:>8}{hit:>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga da API de produtos")
+    parser.add_argument('--url', default=os.getenv('BENCH_URL', 'http://localhost:5000'), help="URL base da API")
+    parser.add_argument('--duration', type=float, default=30, help="Duração da medição em segundos")
+    parser.add_argument('--warmup', type=float, default=5, help="Segundos de carga descartados antes da medição")
+    parser.add_argument('--concurrency', type=int, default=16, help="Clientes simultâneos")
+    parser.add_argument('--distribution', choices=['uniform', 'zipf'], default='zipf', help="Distribuição das chaves")
+    parser.add_argument('--zipf-s', type=float, default=1.1, help="Expoente da distribuição Zipfiana")
+    parser.add_argument('--write-ratio', type=float, default=0.0, help="Fração de requisições que são escritas (PUT)")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"Peso das rotas de leitura (padrão: {DEFAULT_MIX})")
+    parser.add_argument('--max-keys', type=int, default=10000, help="Máximo de produtos usados como chaves")
+    parser.add_argument('--seed-products', type=int, default=0, help="Importa N produtos antes do teste")
+    parser.add_argument('--accept-encoding', default=DEFAULT_ACCEPT_ENCODING, help="Valor do header Accept-Encoding")
+    parser.add_argument('--timeout', type=float, default=10, help="Timeout por requisição em segundos")
+    parser.add_argument('--seed', type=int, default=1, help="Semente dos geradores aleatórios")
+    parser.add_argument('--label', help="Rótulo da execução, gravado no JSON")
+    parser.add_argument('--output', help="Arquivo JSON com o resultado")
+    parser.add_argument('--compare', help="JSON de uma execução anterior para comparar")
+    parser.add_argument('--max-regression', type=float, default=0.10, help="Tolerância relativa na comparação")
+    parser.add_argument('--json', action='store_true', help="Saída em JSON")
+    args = parser.parse_args()
+    args.url = args.url.rstrip('/')
+
+    session = requests.Session()
+    if args.seed_products:
+        summary = seed_products(session, args.url, args.seed_products)
+        print(f"✓ {summary.get('inserted')} produtos importados", file=sys.stderr)
+
+    ids, cursors = crawl_catalog(session, args.url, args.max_keys)
+    if not ids:
+        sys.exit("Nenhum produto encontrado; use --seed-products")
+    random.Random(args.seed).shuffle(ids)
+    print(f"✓ {len(ids)} produtos e {len(cursors)} páginas como chaves", file=sys.stderr)
+
+    if args.warmup > 0:
+        run_phase(args, ids, cursors, args.warmup)
+
+    started_at = datetime.now().isoformat()
+    recorder, elapsed = run_phase(args, ids, cursors, args.duration)
+
+    overall = {"latencies": [], "errors": 0, "hits": 0, "misses": 0}
+    for stats in recorder.routes.values():
+        overall["latencies"].extend(stats["latencies"])
+        overall["errors"] += stats["errors"]
+        overall["hits"] += stats["hits"]
+        overall["misses"] += stats["misses"]
+
+    result = {
+        "meta": {
+            "label": args.label,
+            "started_at": started_at,
+            "git_revision": git_revision(),
+            "url": args.url,
+            "duration_s": round(elapsed, 3),
+            "concurrency": args.concurrency,
+            "distribution": args.distribution,
+            "zipf_s": args.zipf_s if args.distribution == "zipf" else None,
+            "write_ratio": args.write_ratio,
+            "mix": args.mix,
+            "keys": len(ids),
+            "pages": len(cursors),
+            "accept_encoding": args.accept_encoding
+        },
+        "overall": summarize(overall, elapsed),
+        "routes": {route: summarize(stats, elapsed) for route, stats in recorder.routes.items()}
+    }
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(result, json.load(f), args.max_regression)
+        if regressions:
+            print("\n✗ Regressões em relação a " + args.compare, file=sys.stderr)
+            for regression in regressions:
+                print(f"  - {regression}", file=sys.stderr)
+            sys.exit(1)
+        print(f"\n✓ Sem regressões em relação a {args.compare}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
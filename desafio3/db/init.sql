@@ -12,19 +12,94 @@ CREATE INDEX IF NOT EXISTS idx_products_name ON products(name);
 
 CREATE INDEX IF NOT EXISTS idx_products_created_at ON products(created_at);
 
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_products_search ON products USING GIN (
+    to_tsvector('simple', name || ' ' || coalesce(description, ''))
+);
+
+CREATE INDEX IF NOT EXISTS idx_products_name_trgm ON products USING GIN (name gin_trgm_ops);
+
 CREATE
-OR REPLACE FUNCTION update_updated_at_column() RETURNS TRIGGER AS $ $ BEGIN NEW.updated_at = CURRENT_TIMESTAMP;
+OR REPLACE FUNCTION update_updated_at_column() RETURNS TRIGGER AS $$ BEGIN NEW.updated_at = CURRENT_TIMESTAMP;
 
 RETURN NEW;
 
 END;
 
-$ $ language 'plpgsql';
+$$ language 'plpgsql';
 
 CREATE TRIGGER update_products_updated_at BEFORE
 UPDATE
     ON products FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+CREATE TABLE IF NOT EXISTS product_stats (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    total_products BIGINT NOT NULL DEFAULT 0,
+    total_stock BIGINT NOT NULL DEFAULT 0,
+    reconciled_at TIMESTAMP
+);
+
+INSERT INTO
+    product_stats (id)
+VALUES
+    (TRUE) ON CONFLICT DO NOTHING;
+
+CREATE
+OR REPLACE FUNCTION product_stats_after_insert() RETURNS TRIGGER AS $$ BEGIN
+UPDATE
+    product_stats
+SET
+    total_products = total_products + (SELECT COUNT(*) FROM new_rows),
+    total_stock = total_stock + (SELECT COALESCE(SUM(stock), 0) FROM new_rows);
+
+RETURN NULL;
+
+END;
+
+$$ language 'plpgsql';
+
+CREATE
+OR REPLACE FUNCTION product_stats_after_update() RETURNS TRIGGER AS $$ BEGIN
+UPDATE
+    product_stats
+SET
+    total_stock = total_stock + (SELECT COALESCE(SUM(stock), 0) FROM new_rows) - (SELECT COALESCE(SUM(stock), 0) FROM old_rows);
+
+RETURN NULL;
+
+END;
+
+$$ language 'plpgsql';
+
+CREATE
+OR REPLACE FUNCTION product_stats_after_delete() RETURNS TRIGGER AS $$ BEGIN
+UPDATE
+    product_stats
+SET
+    total_products = total_products - (SELECT COUNT(*) FROM old_rows),
+    total_stock = total_stock - (SELECT COALESCE(SUM(stock), 0) FROM old_rows);
+
+RETURN NULL;
+
+END;
+
+$$ language 'plpgsql';
+
+CREATE TRIGGER products_stats_insert
+AFTER
+INSERT
+    ON products REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION product_stats_after_insert();
+
+CREATE TRIGGER products_stats_update
+AFTER
+UPDATE
+    ON products REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION product_stats_after_update();
+
+CREATE TRIGGER products_stats_delete
+AFTER
+    DELETE ON products REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION product_stats_after_delete();
+
 INSERT INTO
     products (name, description, price, stock)
 VALUES
@@ -59,7 +134,7 @@ VALUES
         20
     ) ON CONFLICT DO NOTHING;
 
-DO $ $ BEGIN RAISE NOTICE 'Banco de dados inicializado com sucesso!';
+DO $$ BEGIN RAISE NOTICE 'Banco de dados inicializado com sucesso!';
 
 RAISE NOTICE 'Total de produtos: %',
 (
@@ -69,4 +144,4 @@ RAISE NOTICE 'Total de produtos: %',
         products
 );
 
-END $ $;
\ No newline at end of file
+END $$;
\ No newline at end of file
@@ -0,0 +1,15 @@
+#!/bin/sh
+set -e
+
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    echo "Criando réplica a partir de $PRIMARY_HOST..."
+    until pg_basebackup -h "$PRIMARY_HOST" -U replicator -D "$PGDATA" -R -X stream; do
+        echo "Primário indisponível, tentando novamente em 2s..."
+        rm -rf "$PGDATA"/*
+        sleep 2
+    done
+    chmod 700 "$PGDATA"
+    echo "✓ Réplica criada"
+fi
+
+exec postgres -c hot_standby=on
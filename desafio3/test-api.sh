@@ -13,40 +13,62 @@ NC='\033[0m'
 
 BASE_URL="http://localhost:5000"
 
-echo -e "\n${YELLOW}[1/7] Testando endpoint raiz...${NC}"
+echo -e "\n${YELLOW}[1/10] Testando endpoint raiz...${NC}"
 curl -s $BASE_URL | python3 -m json.tool
 echo -e "${GREEN}✓ Endpoint raiz OK${NC}"
 
-echo -e "\n${YELLOW}[2/7] Listando produtos (primeira vez - do banco)...${NC}"
+echo -e "\n${YELLOW}[2/10] Listando produtos (primeira vez - do banco)...${NC}"
 curl -s $BASE_URL/products | python3 -m json.tool
 echo -e "${GREEN}✓ Produtos listados${NC}"
 
-echo -e "\n${YELLOW}[3/7] Listando produtos (segunda vez - do cache)...${NC}"
+echo -e "\n${YELLOW}[3/10] Listando produtos (segunda vez - do cache)...${NC}"
 echo -e "${BLUE}Observe que 'source' será 'cache' desta vez${NC}"
 sleep 1
 curl -s $BASE_URL/products | python3 -m json.tool | head -20
 echo -e "${GREEN}✓ Cache funcionando!${NC}"
 
-echo -e "\n${YELLOW}[4/7] Buscando produto específico (ID: 1)...${NC}"
+echo -e "\n${YELLOW}[4/10] Listando produtos paginados (limit=2)...${NC}"
+PAGE=$(curl -s "$BASE_URL/products?limit=2")
+echo "$PAGE" | python3 -m json.tool
+NEXT=$(echo "$PAGE" | python3 -c "import sys, json; print(json.load(sys.stdin).get('next_after') or '')")
+if [ -n "$NEXT" ]; then
+    curl -s "$BASE_URL/products?limit=2&after=$NEXT" | python3 -m json.tool
+fi
+echo -e "${GREEN}✓ Paginação por cursor OK${NC}"
+
+echo -e "\n${YELLOW}[5/10] Buscando produto específico (ID: 1)...${NC}"
 curl -s $BASE_URL/products/1 | python3 -m json.tool
 echo -e "${GREEN}✓ Produto encontrado${NC}"
 
-echo -e "\n${YELLOW}[5/7] Criando novo produto...${NC}"
-curl -s -X POST $BASE_URL/products \
+echo -e "\n${YELLOW}[6/10] Criando novo produto...${NC}"
+CREATED=$(curl -s -X POST $BASE_URL/products \
   -H "Content-Type: application/json" \
   -d '{
     "name": "Webcam Logitech C920",
     "description": "Webcam Full HD 1080p",
     "price": 399.99,
     "stock": 30
-  }' | python3 -m json.tool
+  }')
+echo "$CREATED" | python3 -m json.tool
+NEW_ID=$(echo "$CREATED" | python3 -c "import sys, json; print(json.load(sys.stdin)['id'])")
 echo -e "${GREEN}✓ Produto criado${NC}"
 
-echo -e "\n${YELLOW}[6/7] Verificando estatísticas...${NC}"
+echo -e "\n${YELLOW}[7/10] Atualizando produto criado (ID: $NEW_ID)...${NC}"
+curl -s -X PUT $BASE_URL/products/$NEW_ID \
+  -H "Content-Type: application/json" \
+  -d '{"price": 349.99, "stock": 25}' | python3 -m json.tool
+curl -s $BASE_URL/products/$NEW_ID | python3 -m json.tool
+echo -e "${GREEN}✓ Produto atualizado (cache invalidado)${NC}"
+
+echo -e "\n${YELLOW}[8/10] Removendo produto criado (ID: $NEW_ID)...${NC}"
+curl -s -X DELETE $BASE_URL/products/$NEW_ID | python3 -m json.tool
+echo -e "${GREEN}✓ Produto removido${NC}"
+
+echo -e "\n${YELLOW}[9/10] Verificando estatísticas...${NC}"
 curl -s $BASE_URL/stats | python3 -m json.tool
 echo -e "${GREEN}✓ Estatísticas obtidas${NC}"
 
-echo -e "\n${YELLOW}[7/7] Verificando health check...${NC}"
+echo -e "\n${YELLOW}[10/10] Verificando health check...${NC}"
 curl -s $BASE_URL/health | python3 -m json.tool
 echo -e "${GREEN}✓ Health check OK${NC}"
 
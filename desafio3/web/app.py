@@ -1,12 +1,49 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
+from psycopg2 import sql
 import psycopg2
 import redis
 import logging
-import os
-import json
+import hashlib
+import threading
+import io
+import time
+from contextlib import contextmanager
 from datetime import datetime
 
+from bulk_import import IMPORT_COLUMNS, detect_format, import_products, validate_fields
+from cache import HitCounter, LocalCache, TwoTierCache
+from catalog import (
+    ADMIN_TOKEN, ALL_PRODUCTS_QUERY, CACHE_COMPRESS_MIN_BYTES,
+    CACHE_EARLY_REFRESH_BETA, CACHE_EXPIRATION, CACHE_INVALIDATION_CHANNEL,
+    CACHE_LOCK_TIMEOUT, CACHE_STALE_TTL, CONTENT_ENCODINGS, DB_CONFIG,
+    DB_CONNECT_TIMEOUT, DB_POOL_MAX, DB_POOL_MIN, DB_POOL_TIMEOUT,
+    DB_POOL_VALIDATE_AFTER, DB_REPLICA_DSNS, DB_REPLICA_RETRY_AFTER,
+    DB_REPLICA_TIMEOUT, GEN_ALL_KEY, HEALTH_PROBE_INTERVAL,
+    HEALTH_PROBE_TIMEOUT, HOT_PRODUCTS_FLUSH_INTERVAL, HOT_PRODUCTS_KEY,
+    HOT_PRODUCTS_MAX_TRACKED, IMPORT_MAX_ERRORS, LOCAL_CACHE_MAX_ENTRIES,
+    LOCAL_CACHE_TTL, LSN_TOKEN_COOKIE, LSN_TOKEN_HEADER,
+    PRODUCTS_ALL_CACHE_MAX_BYTES, PRODUCTS_BATCH_MAX_IDS,
+    PRODUCTS_PAGE_DEFAULT, PRODUCTS_PAGE_MAX, PRODUCTS_STREAM_ITERSIZE,
+    PRODUCT_COLUMNS, RECORD_WRITE_LSN_SCRIPT, REDIS_HOST, REDIS_PORT,
+    RESPONSE_COMPRESS_MIN_BYTES, SCHEMA_RETRY_MAX, SEARCH_DOCUMENT,
+    SEARCH_PAGE_DEFAULT, SEARCH_QUERY_MAX_LENGTH, STATS_RECONCILE_INTERVAL,
+    WARMUP_ENABLED, WARMUP_HOT_PRODUCTS, WARMUP_PAGES, WARMUP_RETRY_MAX,
+    WRITE_LSN_KEY,
+    build_prefix_tsquery, catalog_etag, compress_body, content_etag,
+    decode_cursor, dumps, encode_cursor, generation_keys,
+    normalize_search_query, pack_variants, page_gen_keys, page_value,
+    plan_first_pages, product_cache_keys, product_gen_key, row_to_product,
+    split_versions, unpack_variants, warmup_batches, warmup_counter_keys,
+    warmup_values, with_etag, with_lsn_token
+)
+from db_pool import ConnectionPool
+from db_router import ReplicaRouter, current_wal_lsn, parse_lsn
+from health import HealthProber
+from metrics import TimedCursor, count_lookup, init_app as init_metrics
+from schema import migrate_schema
+
 app = Flask(__name__)
+init_metrics(app)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -14,34 +51,386 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'db'),
-    'database': os.getenv('DB_NAME', 'productsdb'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', 'postgres'),
-    'port': os.getenv('DB_PORT', '5432')
-}
+db_pool = None
+db_router = None
+redis_client = None
+product_cache = None
+_db_pool_lock = threading.Lock()
+_cache_lock = threading.Lock()
+_catalog_too_large_until = 0.0
+_stats_reconciler = None
+_background_lock = threading.Lock()
+health_prober = None
+product_hits = HitCounter()
+_hit_flusher = None
+_warmup_thread = None
+_probe_conn = None
+_schema_thread = None
+_background_started = False
 
-REDIS_HOST = os.getenv('REDIS_HOST', 'cache')
-REDIS_PORT = int(os.getenv('REDIS_PORT', '6379'))
-CACHE_EXPIRATION = 300
+PROBE_ENDPOINTS = ('livez', 'readyz', 'health', 'metrics')
 
-db_conn = None
-redis_client = None
+def get_db_pool():
+    global db_pool
+    if db_pool is None:
+        with _db_pool_lock:
+            if db_pool is None:
+                db_pool = ConnectionPool(
+                    DB_POOL_MIN,
+                    DB_POOL_MAX,
+                    timeout=DB_POOL_TIMEOUT,
+                    validate_after=DB_POOL_VALIDATE_AFTER,
+                    connect_timeout=DB_CONNECT_TIMEOUT,
+                    cursor_factory=TimedCursor,
+                    **DB_CONFIG
+                )
+                logger.info(f"✓ Pool de conexões PostgreSQL criado (min={DB_POOL_MIN}, max={DB_POOL_MAX})")
+    return db_pool
+
+def get_db_router():
+    global db_router
+    if db_router is None:
+        primary = get_db_pool()
+        with _db_pool_lock:
+            if db_router is None:
+                replicas = [
+                    ConnectionPool(
+                        0,
+                        DB_POOL_MAX,
+                        timeout=DB_REPLICA_TIMEOUT,
+                        validate_after=DB_POOL_VALIDATE_AFTER,
+                        dsn=dsn,
+                        connect_timeout=max(1, int(DB_REPLICA_TIMEOUT)),
+                        cursor_factory=TimedCursor
+                    )
+                    for dsn in DB_REPLICA_DSNS
+                ]
+                db_router = ReplicaRouter(primary, replicas, retry_after=DB_REPLICA_RETRY_AFTER)
+                if replicas:
+                    logger.info(f"✓ Leituras distribuídas entre {len(replicas)} réplica(s)")
+    return db_router
+
+def client_lsn():
+    """LSN da última escrita do cliente, vindo do header ou do cookie.
+    Deve ser lido na rota: recargas em segundo plano rodam fora da requisição."""
+    token = request.headers.get(LSN_TOKEN_HEADER) or request.cookies.get(LSN_TOKEN_COOKIE)
+    try:
+        return parse_lsn(token) if token else 0
+    except ValueError:
+        return 0
 
-def get_db_connection():
-    return psycopg2.connect(**DB_CONFIG)
+def required_lsn(min_lsn=0):
+    """Além do LSN do cliente, exige o da última escrita conhecida pela
+    aplicação, para que o cache compartilhado não seja preenchido com dados
+    anteriores a uma invalidação. Leituras que não vão para o cache usam só
+    o LSN do cliente."""
+    try:
+        value = get_product_cache().redis.get(WRITE_LSN_KEY)
+    except Exception:
+        value = None
+    return max(min_lsn, int(value or 0))
+
+def checkout_read(min_lsn=0, fills_cache=True):
+    router = get_db_router()
+    if not router.replicas:
+        return router.primary.getconn(), router.primary
+    return router.checkout_read(required_lsn(min_lsn) if fills_cache else min_lsn)
+
+@contextmanager
+def read_connection(min_lsn=0, fills_cache=True):
+    conn, pool = checkout_read(min_lsn, fills_cache)
+    try:
+        yield conn
+    finally:
+        pool.putconn(conn)
+
+def record_write(conn):
+    """Chamado após o commit de uma escrita; retorna o LSN que o cliente
+    deve apresentar para ler o próprio resultado. Sem réplicas, None."""
+    if not DB_REPLICA_DSNS:
+        return None
+    lsn = current_wal_lsn(conn)
+    try:
+        get_product_cache().redis.eval(RECORD_WRITE_LSN_SCRIPT, 1, WRITE_LSN_KEY, lsn)
+    except Exception as e:
+        logger.warning(f"Erro ao registrar LSN da escrita: {e}")
+    return lsn
 
 def get_redis_client():
     return redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
 
+def get_product_cache():
+    global product_cache
+    if product_cache is None:
+        with _cache_lock:
+            if product_cache is None:
+                product_cache = TwoTierCache(
+                    redis.Redis(host=REDIS_HOST, port=REDIS_PORT),
+                    local=LocalCache(LOCAL_CACHE_MAX_ENTRIES, LOCAL_CACHE_TTL),
+                    channel=CACHE_INVALIDATION_CHANNEL,
+                    stale_ttl=CACHE_STALE_TTL,
+                    lock_timeout=CACHE_LOCK_TIMEOUT,
+                    early_refresh_beta=CACHE_EARLY_REFRESH_BETA,
+                    compress_min_bytes=CACHE_COMPRESS_MIN_BYTES
+                )
+                product_cache.start_listener()
+    return product_cache
+
+def reconcile_product_stats(force=False):
+    """Recalcula product_stats a partir de products. O lock na linha de
+    resumo é obtido antes da contagem, de modo que escritas concorrentes
+    aguardam e aplicam seus incrementos sobre o valor reconciliado."""
+    with get_db_pool().connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT pg_try_advisory_xact_lock(hashtext('product_stats_reconcile'))")
+        if not cursor.fetchone()[0]:
+            conn.rollback()
+            return False
+        
+        cursor.execute("""
+            SELECT reconciled_at > CURRENT_TIMESTAMP - make_interval(secs => %s)
+            FROM product_stats
+            FOR UPDATE
+        """, (STATS_RECONCILE_INTERVAL,))
+        row = cursor.fetchone()
+        if row is None or (row[0] and not force):
+            conn.rollback()
+            return False
+        
+        cursor.execute("""
+            UPDATE product_stats
+            SET total_products = totals.total_products,
+                total_stock = totals.total_stock,
+                reconciled_at = CURRENT_TIMESTAMP
+            FROM (
+                SELECT COUNT(*) AS total_products, COALESCE(SUM(stock), 0) AS total_stock
+                FROM products
+            ) AS totals
+        """)
+        conn.commit()
+        cursor.close()
+    
+    logger.info("✓ Estatísticas de produtos reconciliadas")
+    return True
+
+def run_stats_reconciler():
+    while True:
+        try:
+            reconcile_product_stats()
+        except Exception as e:
+            logger.warning(f"Erro ao reconciliar estatísticas: {e}")
+        time.sleep(STATS_RECONCILE_INTERVAL)
+
+def start_stats_reconciler():
+    global _stats_reconciler
+    with _background_lock:
+        if _stats_reconciler is None and STATS_RECONCILE_INTERVAL > 0:
+            _stats_reconciler = threading.Thread(
+                target=run_stats_reconciler,
+                name="stats-reconciler",
+                daemon=True
+            )
+            _stats_reconciler.start()
+
+def check_database():
+    """Sonda com conexão própria, fora do pool: um pool esgotado por
+    requisições lentas não deve tirar o serviço de prontidão. Chamada só
+    pela thread do prober."""
+    global _probe_conn
+    if _probe_conn is None or _probe_conn.closed:
+        _probe_conn = psycopg2.connect(
+            connect_timeout=max(1, int(HEALTH_PROBE_TIMEOUT)),
+            options=f"-c statement_timeout={int(HEALTH_PROBE_TIMEOUT * 1000)}",
+            **DB_CONFIG
+        )
+        _probe_conn.autocommit = True
+    try:
+        cursor = _probe_conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.close()
+    except psycopg2.Error:
+        _probe_conn.close()
+        raise
+
+def get_health_prober():
+    global health_prober
+    with _background_lock:
+        if health_prober is None:
+            probe_client = redis.Redis(
+                host=REDIS_HOST,
+                port=REDIS_PORT,
+                socket_timeout=HEALTH_PROBE_TIMEOUT,
+                socket_connect_timeout=HEALTH_PROBE_TIMEOUT
+            )
+            health_prober = HealthProber(
+                {"database": check_database, "cache": probe_client.ping},
+                interval=HEALTH_PROBE_INTERVAL
+            )
+            health_prober.start()
+    return health_prober
+
+def flush_product_hits():
+    """Envia ao Redis, em um único pipeline, os acessos a produtos
+    contados em memória desde o último envio."""
+    counts = product_hits.drain()
+    if not counts:
+        return
+    pipe = get_product_cache().redis.pipeline(transaction=False)
+    for product_id, count in counts.items():
+        pipe.zincrby(HOT_PRODUCTS_KEY, count, product_id)
+    pipe.zremrangebyrank(HOT_PRODUCTS_KEY, 0, -HOT_PRODUCTS_MAX_TRACKED - 1)
+    pipe.execute()
+
+def run_hit_flusher():
+    while True:
+        time.sleep(HOT_PRODUCTS_FLUSH_INTERVAL)
+        try:
+            flush_product_hits()
+        except Exception as e:
+            logger.warning(f"Erro ao registrar produtos mais acessados: {e}")
+
+def start_hit_flusher():
+    global _hit_flusher
+    with _background_lock:
+        if _hit_flusher is None:
+            _hit_flusher = threading.Thread(target=run_hit_flusher, name="hot-products", daemon=True)
+            _hit_flusher.start()
+
+WARMUP_QUERY = f"""
+    SELECT TRUE AS hot, {PRODUCT_COLUMNS}
+    FROM products
+    WHERE id = ANY(%s::int[])
+    UNION ALL
+    (
+        SELECT FALSE AS hot, {PRODUCT_COLUMNS}
+        FROM products
+        ORDER BY created_at DESC, id DESC
+        LIMIT %s
+    )
+"""
+
+def warm_cache():
+    """Carrega do banco, em uma única consulta, os produtos mais acessados
+    e as primeiras páginas da listagem, e grava tudo no Redis em pipelines
+    de WARMUP_BATCH_SIZE entradas."""
+    start = time.monotonic()
+    cache = get_product_cache()
+    hot_ids = [int(pid) for pid in cache.redis.zrevrange(HOT_PRODUCTS_KEY, 0, WARMUP_HOT_PRODUCTS - 1)]
+    guard = cache.get_counters([GEN_ALL_KEY], fresh=True)[GEN_ALL_KEY]
+    
+    with read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(WARMUP_QUERY, (hot_ids, WARMUP_PAGES * PRODUCTS_PAGE_DEFAULT + 1))
+        rows = cursor.fetchall()
+        cursor.close()
+    
+    pages = plan_first_pages([row[1:] for row in rows if not row[0]], PRODUCTS_PAGE_DEFAULT, WARMUP_PAGES)
+    versions = cache.get_counters(warmup_counter_keys(rows, pages), fresh=True)
+    values = warmup_values(rows, pages, versions if versions[GEN_ALL_KEY] == guard else None)
+    
+    batches = 0
+    for batch, compress in warmup_batches(values):
+        cache.set_many(batch, CACHE_EXPIRATION, raw=True, compress=compress)
+        batches += 1
+    
+    summary = {
+        "hot_products": len(hot_ids),
+        "products": sum(1 for key in values if key.startswith("product:")),
+        "pages": sum(1 for key in values if key.startswith("products:page:")),
+        "batches": batches,
+        "duration_ms": round((time.monotonic() - start) * 1000, 1)
+    }
+    logger.info(f"✓ Cache aquecido: {summary['products']} produtos e {summary['pages']} páginas em {summary['duration_ms']}ms")
+    return summary
+
+def catalog_generation():
+    generation = get_product_cache().get_counters([GEN_ALL_KEY], fresh=True)[GEN_ALL_KEY]
+    return generation if generation >= 0 else None
+
+def run_warmup():
+    """Retenta o aquecimento com backoff até conseguir ou até a primeira
+    escrita no catálogo: a partir daí as próprias leituras repovoam o cache.
+    Só a primeira tentativa segura a prontidão."""
+    delay = 1
+    baseline = catalog_generation()
+    while True:
+        try:
+            warm_cache()
+            return
+        except Exception as e:
+            logger.warning(f"Erro ao aquecer o cache, nova tentativa em {delay:g}s: {e}")
+        finally:
+            get_health_prober().release("warmup")
+        time.sleep(delay)
+        delay = min(delay * 2, WARMUP_RETRY_MAX)
+        current = catalog_generation()
+        if baseline is None:
+            baseline = current
+        elif current is not None and current != baseline:
+            logger.info("✓ Aquecimento dispensado: o catálogo foi alterado")
+            return
+
+def start_warmup():
+    global _warmup_thread
+    with _background_lock:
+        if _warmup_thread is not None or not WARMUP_ENABLED:
+            return
+        _warmup_thread = threading.Thread(target=run_warmup, name="cache-warmup", daemon=True)
+    get_health_prober().hold("warmup")
+    _warmup_thread.start()
+
+def run_schema_migration():
+    """Aplica a migração do esquema, retentando com backoff até o banco
+    aceitar; o serviço fica fora de prontidão enquanto isso."""
+    delay = 1
+    while True:
+        try:
+            with get_db_pool().connection() as conn:
+                migrate_schema(conn)
+            logger.info("✓ Esquema do banco atualizado")
+            get_health_prober().release("schema")
+            return
+        except Exception as e:
+            logger.warning(f"Erro ao migrar o esquema, nova tentativa em {delay:g}s: {e}")
+            time.sleep(delay)
+            delay = min(delay * 2, SCHEMA_RETRY_MAX)
+
+def start_schema_migration():
+    global _schema_thread
+    with _background_lock:
+        if _schema_thread is not None:
+            return
+        _schema_thread = threading.Thread(target=run_schema_migration, name="schema-migration", daemon=True)
+    get_health_prober().hold("schema")
+    _schema_thread.start()
+
+def start_background_tasks():
+    """Inicia as threads de segundo plano. Nenhuma delas se conecta ao
+    banco ao ser criada: o prober é quem tenta (e retenta) a conexão."""
+    global _background_started
+    if _background_started:
+        return
+    get_product_cache()
+    start_schema_migration()
+    start_stats_reconciler()
+    get_health_prober()
+    start_hit_flusher()
+    start_warmup()
+    _background_started = True
+
 @app.before_request
 def initialize_connections():
-    global db_conn, redis_client
-    if db_conn is None:
+    global redis_client
+    # Sem efeito quando iniciado por __main__; cobre servidores WSGI que
+    # apenas importam o módulo
+    start_background_tasks()
+    # Sondas e métricas só leem o estado do prober: nunca tentam conectar
+    if request.endpoint in PROBE_ENDPOINTS:
+        return
+    
+    if db_pool is None:
         try:
-            db_conn = get_db_connection()
-            logger.info("✓ Conexão com PostgreSQL estabelecida")
+            get_db_pool()
         except Exception as e:
             logger.error(f"Erro ao conectar ao PostgreSQL: {e}")
     
@@ -60,161 +449,483 @@ def home():
         "version": "1.0.0",
         "endpoints": {
             "GET /": "Esta página",
-            "GET /health": "Health check",
-            "GET /products": "Lista todos os produtos (usa cache)",
+            "GET /health": "Health check (estado mantido pelo prober em segundo plano)",
+            "GET /livez": "Liveness: apenas o processo, sem dependências",
+            "GET /readyz": "Readiness: último estado das dependências",
+            "GET /metrics": "Métricas Prometheus deste processo",
+            "GET /products": "Lista todos os produtos em streaming (usa cache)",
+            "GET /products?limit=&after=": "Lista produtos paginados por cursor (usa cache)",
+            "GET /products?ids=1,2,3": "Busca vários produtos de uma vez (usa cache)",
+            "POST /products/batch": "Busca vários produtos a partir de {\"ids\": [...]} (usa cache)",
+            "GET /products/search?q=&page=&limit=": "Busca textual ranqueada em nome e descrição (usa cache)",
             "GET /products/<id>": "Busca produto por ID (usa cache)",
             "POST /products": "Cria novo produto",
+            "POST /products/import": "Importa produtos em massa (CSV ou NDJSON via COPY)",
             "PUT /products/<id>": "Atualiza produto",
             "DELETE /products/<id>": "Remove produto",
-            "GET /stats": "Estatísticas do sistema"
+            "GET /stats": "Estatísticas do sistema",
+            "POST /admin/cache/warmup": "Aquece o cache com os produtos mais acessados e as primeiras páginas"
         }
     }), 200
 
 @app.route('/health')
 def health():
+    probe = get_health_prober().snapshot()
     health_status = {
         "service": "web",
-        "status": "healthy",
+        "status": "healthy" if probe["ready"] else "degraded",
         "timestamp": datetime.now().isoformat(),
-        "dependencies": {}
+        "dependencies": {
+            name: "healthy" if result["error"] is None else f"unhealthy: {result['error']}"
+            for name, result in probe["dependencies"].items()
+        },
+        "last_probe": probe["last_probe"]
     }
     
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1")
-        cursor.close()
-        conn.close()
-        health_status["dependencies"]["database"] = "healthy"
-    except Exception as e:
-        health_status["dependencies"]["database"] = f"unhealthy: {str(e)}"
-        health_status["status"] = "degraded"
-    
-    try:
-        client = get_redis_client()
-        client.ping()
-        health_status["dependencies"]["cache"] = "healthy"
-    except Exception as e:
-        health_status["dependencies"]["cache"] = f"unhealthy: {str(e)}"
-        health_status["status"] = "degraded"
-    
-    status_code = 200 if health_status["status"] == "healthy" else 503
+    status_code = 200 if probe["ready"] else 503
     return jsonify(health_status), status_code
 
+@app.route('/livez')
+def livez():
+    return jsonify({"status": "alive"}), 200
+
+@app.route('/readyz')
+def readyz():
+    probe = get_health_prober().snapshot()
+    return jsonify(probe), 200 if probe["ready"] else 503
+
+def fragment_response(source, fragment, status=200, etag=None):
+    """Monta a resposta a partir de um objeto JSON já serializado
+    (o corpo armazenado no cache), apenas inserindo o campo "source"."""
+    body = b'{"source":"' + source.encode('ascii') + b'",' + fragment[1:]
+    return with_etag(Response(body, status=status, mimetype='application/json'), etag)
+
+def negotiate_encoding(size):
+    if size < RESPONSE_COMPRESS_MIN_BYTES:
+        return None
+    return request.accept_encodings.best_match(CONTENT_ENCODINGS)
+
+def variant_response(source, value, etag=None):
+    """Resposta para um valor gerado por pack_variants, com a codificação
+    pedida em Accept-Encoding. Em hits a variante armazenada é enviada sem
+    nenhum processamento; só a resposta que preencheu a entrada é comprimida
+    na hora."""
+    fragment, variants = unpack_variants(value)
+    encoding = negotiate_encoding(len(fragment))
+    if encoding is None:
+        response = fragment_response(source, fragment, etag=etag)
+    else:
+        body = variants.get(encoding) if source == "cache" else None
+        if body is None:
+            body = compress_body(b'{"source":"' + source.encode('ascii') + b'",' + fragment[1:], encoding)
+        response = Response(body, status=200, mimetype='application/json')
+        response.headers['Content-Encoding'] = encoding
+        with_etag(response, f"{etag}-{encoding}" if etag is not None else None)
+    if len(fragment) >= RESPONSE_COMPRESS_MIN_BYTES:
+        # O corpo depende de Accept-Encoding mesmo quando não há ETag
+        response.vary.add('Accept-Encoding')
+    return response
+
+def etag_matches(etag):
+    """Retorna a tag de If-None-Match que corresponde a etag, em qualquer
+    das codificações (sufixos -br/-gzip), ou None."""
+    if etag is None:
+        return None
+    for tag in [etag] + [f"{etag}-{encoding}" for encoding in CONTENT_ENCODINGS]:
+        if request.if_none_match.contains_weak(tag):
+            return tag
+    return None
+
+def not_modified(etag):
+    return with_etag(Response(status=304), etag_matches(etag) or etag)
+
+def versions_current(versions):
+    return get_product_cache().get_counters(list(versions)) == versions
+
+def page_is_current(value):
+    return versions_current(split_versions(value)[0])
+
+def bump_generations(created=False, changed=None, product_id=None):
+    """Invalida listas e o produto alterado após uma escrita incrementando
+    contadores de geração em vez de apagar chaves."""
+    cache = get_product_cache()
+    keys = generation_keys(created, changed, product_id)
+    cache.incr_counters(keys)
+
 @app.route('/products', methods=['GET'])
 def get_products():
-    cache_key = "products:all"
+    ids = request.args.get('ids')
+    if ids is not None:
+        try:
+            product_ids = [int(value) for value in ids.split(',') if value.strip()]
+        except ValueError:
+            return jsonify({"error": "ids must be a comma-separated list of integers"}), 400
+        return get_products_batch(product_ids)
     
-    try:
-        cached_data = redis_client.get(cache_key)
-        if cached_data:
-            logger.info("✓ Produtos obtidos do cache Redis")
-            return jsonify({
-                "source": "cache",
-                "products": json.loads(cached_data)
-            }), 200
-    except Exception as e:
-        logger.warning(f"Erro ao acessar cache: {e}")
+    limit = request.args.get('limit')
+    after = request.args.get('after')
+    
+    if limit is None and after is None:
+        return stream_all_products()
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, name, description, price, stock, created_at, updated_at
-            FROM products
-            ORDER BY created_at DESC
-        """)
-        
-        products = []
-        for row in cursor.fetchall():
-            products.append({
-                "id": row[0],
-                "name": row[1],
-                "description": row[2],
-                "price": float(row[3]),
-                "stock": row[4],
-                "created_at": row[5].isoformat(),
-                "updated_at": row[6].isoformat()
-            })
+        limit = int(limit) if limit is not None else PRODUCTS_PAGE_DEFAULT
+        if not 1 <= limit <= PRODUCTS_PAGE_MAX:
+            raise ValueError(f"limit must be between 1 and {PRODUCTS_PAGE_MAX}")
+        position = decode_cursor(after) if after else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return get_products_page(limit, after, position)
+
+def get_products_page(limit, after, position):
+    cache_key = f"products:page:{limit}:{after or 'first'}"
+    cache = get_product_cache()
+    etag = catalog_etag(cache.get_counters([GEN_ALL_KEY])[GEN_ALL_KEY], "page", limit, after)
+    if etag_matches(etag):
+        return not_modified(etag)
+    min_lsn = client_lsn()
+    
+    def load_page():
+        guard = cache.get_counters([GEN_ALL_KEY], fresh=True)[GEN_ALL_KEY]
+        with read_connection(min_lsn) as conn:
+            cursor = conn.cursor()
+            if position is None:
+                cursor.execute(f"""
+                    SELECT {PRODUCT_COLUMNS}
+                    FROM products
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s
+                """, (limit + 1,))
+            else:
+                created_at, product_id = position
+                cursor.execute(f"""
+                    SELECT {PRODUCT_COLUMNS}
+                    FROM products
+                    WHERE created_at <= %s
+                      AND (created_at < %s OR id < %s)
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s
+                """, (created_at, created_at, product_id, limit + 1))
+            
+            rows = cursor.fetchall()
+            cursor.close()
         
-        cursor.close()
-        conn.close()
+        products = [row_to_product(row) for row in rows[:limit]]
+        dependencies = page_gen_keys(rows[:limit], position)
+        versions = cache.get_counters(dependencies + [GEN_ALL_KEY], fresh=True)
+        if versions.pop(GEN_ALL_KEY) != guard:
+            # Houve escrita durante a consulta: a página não deve ser reaproveitada
+            versions = {key: -1 for key in versions}
         
+        logger.info(f"✓ {len(products)} produtos obtidos do banco de dados (página)")
+        return page_value(versions, limit, products, encode_cursor(products[-1]) if len(rows) > limit else None)
+    
+    try:
+        page, source = cache.get_or_load(
+            cache_key, load_page, CACHE_EXPIRATION, raw=True, validate=page_is_current, compress=False
+        )
+    except Exception as e:
+        logger.error(f"Erro ao buscar produtos: {e}")
+        return jsonify({"error": str(e)}), 500
+    
+    count_lookup("page", source == "cache")
+    return variant_response(source, split_versions(page)[1], etag=etag)
+
+def open_products_stream(conn):
+    cursor = conn.cursor(name="products_stream")
+    cursor.itersize = PRODUCTS_STREAM_ITERSIZE
+    cursor.execute(ALL_PRODUCTS_QUERY)
+    return cursor
+
+def load_all_products_json():
+    items = []
+    size = 16
+    with read_connection() as conn:
+        cursor = open_products_stream(conn)
         try:
-            redis_client.setex(cache_key, CACHE_EXPIRATION, json.dumps(products))
-            logger.info("✓ Produtos armazenados no cache Redis")
+            for row in cursor:
+                item = dumps(row_to_product(row))
+                size += len(item) + 1
+                if size > PRODUCTS_ALL_CACHE_MAX_BYTES:
+                    return None
+                items.append(item)
+        finally:
+            cursor.close()
+    logger.info(f"✓ {len(items)} produtos obtidos do banco de dados")
+    return pack_variants(b'{"products":[' + b','.join(items) + b']}')
+
+def stream_all_products():
+    global _catalog_too_large_until
+    
+    cache = get_product_cache()
+    generation = cache.get_counters([GEN_ALL_KEY])[GEN_ALL_KEY]
+    etag = catalog_etag(generation, "all")
+    if etag_matches(etag):
+        return not_modified(etag)
+    
+    if time.monotonic() >= _catalog_too_large_until:
+        try:
+            data, source = cache.get_or_load(
+                f"products:all:g{generation}", load_all_products_json, CACHE_EXPIRATION, raw=True, compress=False
+            )
         except Exception as e:
-            logger.warning(f"Erro ao armazenar no cache: {e}")
+            logger.error(f"Erro ao buscar produtos: {e}")
+            return jsonify({"error": str(e)}), 500
         
-        logger.info(f"✓ {len(products)} produtos obtidos do banco de dados")
-        return jsonify({
-            "source": "database",
-            "products": products
-        }), 200
+        count_lookup("all", source == "cache")
+        if data is not None:
+            logger.info(f"✓ Produtos obtidos ({source})")
+            return variant_response(source, data, etag=etag)
         
+        # Catálogo maior que PRODUCTS_ALL_CACHE_MAX_BYTES: não vale tentar cachear de novo tão cedo
+        _catalog_too_large_until = time.monotonic() + CACHE_EXPIRATION
+    
+    pool = None
+    conn = None
+    try:
+        conn, pool = checkout_read(client_lsn(), fills_cache=False)
+        cursor = open_products_stream(conn)
     except Exception as e:
+        if conn is not None:
+            pool.putconn(conn)
         logger.error(f"Erro ao buscar produtos: {e}")
         return jsonify({"error": str(e)}), 500
+    
+    released = False
+    
+    def release():
+        # Chamado pelo finally do gerador ou pelo fechamento da resposta;
+        # este último também cobre HEAD e clientes que desconectam antes
+        # de o gerador começar
+        nonlocal released
+        if released:
+            return
+        released = True
+        try:
+            cursor.close()
+        except Exception:
+            pass
+        pool.putconn(conn)
+    
+    def generate():
+        chunk = []
+        total = 0
+        
+        try:
+            yield b'{"source":"database","products":['
+            for row in cursor:
+                item = dumps(row_to_product(row))
+                chunk.append(item if total == 0 else b',' + item)
+                total += 1
+                
+                if len(chunk) >= PRODUCTS_STREAM_ITERSIZE:
+                    yield b''.join(chunk)
+                    chunk = []
+            
+            if chunk:
+                yield b''.join(chunk)
+            yield b']}'
+        except Exception as e:
+            logger.error(f"Erro durante streaming de produtos: {e}")
+            return
+        finally:
+            release()
+        
+        logger.info(f"✓ {total} produtos transmitidos do banco de dados")
+    
+    response = Response(generate(), status=200, mimetype='application/json')
+    response.call_on_close(release)
+    return with_etag(response, etag)
 
-@app.route('/products/<int:product_id>', methods=['GET'])
-def get_product(product_id):
-    cache_key = f"product:{product_id}"
+@app.route('/products/search', methods=['GET'])
+def search_products():
+    normalized = normalize_search_query(request.args.get('q', ''))
+    if not normalized:
+        return jsonify({"error": "Query parameter 'q' is required"}), 400
+    if len(normalized) > SEARCH_QUERY_MAX_LENGTH:
+        return jsonify({"error": f"Query longer than {SEARCH_QUERY_MAX_LENGTH} characters"}), 400
     
     try:
-        cached_data = redis_client.get(cache_key)
-        if cached_data:
-            logger.info(f"✓ Produto {product_id} obtido do cache")
-            return jsonify({
-                "source": "cache",
-                "product": json.loads(cached_data)
-            }), 200
-    except Exception as e:
-        logger.warning(f"Erro ao acessar cache: {e}")
+        limit = int(request.args.get('limit', SEARCH_PAGE_DEFAULT))
+        page = int(request.args.get('page', 1))
+        if not 1 <= limit <= PRODUCTS_PAGE_MAX or page < 1:
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": f"limit must be between 1 and {PRODUCTS_PAGE_MAX} and page >= 1"}), 400
     
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, name, description, price, stock, created_at, updated_at
-            FROM products
-            WHERE id = %s
-        """, (product_id,))
+    tsquery = build_prefix_tsquery(normalized)
+    min_lsn = client_lsn()
+    
+    def load_results():
+        with read_connection(min_lsn) as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT {PRODUCT_COLUMNS},
+                       ts_rank({SEARCH_DOCUMENT}, query) + similarity(name, %(term)s) AS rank
+                FROM products, to_tsquery('simple', %(tsquery)s) AS query
+                WHERE {SEARCH_DOCUMENT} @@ query
+                   OR name %% %(term)s
+                ORDER BY rank DESC, id DESC
+                LIMIT %(limit)s OFFSET %(offset)s
+            """, {
+                "term": normalized,
+                "tsquery": tsquery,
+                "limit": limit + 1,
+                "offset": (page - 1) * limit
+            })
+            rows = cursor.fetchall()
+            cursor.close()
         
-        row = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        results = []
+        for row in rows[:limit]:
+            product = row_to_product(row)
+            product["rank"] = round(float(row[7]), 4)
+            results.append(product)
+        logger.info(f"✓ Busca '{normalized}': {len(results)} resultados do banco")
+        return pack_variants(dumps({
+            "query": normalized,
+            "page": page,
+            "limit": limit,
+            "products": results,
+            "has_more": len(rows) > limit
+        }))
+    
+    try:
+        cache = get_product_cache()
+        generation = cache.get_counters([GEN_ALL_KEY])[GEN_ALL_KEY]
+        etag = catalog_etag(generation, "search", normalized, limit, page)
+        if etag_matches(etag):
+            return not_modified(etag)
+        digest = hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+        cache_key = f"products:search:g{generation}:{digest}:{limit}:{page}"
+        results, source = cache.get_or_load(cache_key, load_results, CACHE_EXPIRATION, raw=True, compress=False)
+    except Exception as e:
+        logger.error(f"Erro na busca de produtos: {e}")
+        return jsonify({"error": str(e)}), 500
+    
+    count_lookup("search", source == "cache")
+    return variant_response(source, results, etag=etag)
+
+@app.route('/products/batch', methods=['POST'])
+def post_products_batch():
+    data = request.get_json(silent=True) or {}
+    product_ids = data.get('ids')
+    if not isinstance(product_ids, list) or not all(isinstance(value, int) for value in product_ids):
+        return jsonify({"error": "Field 'ids' must be a list of integers"}), 400
+    return get_products_batch(product_ids)
+
+def get_products_batch(product_ids):
+    if not product_ids:
+        return jsonify({"error": "At least one id is required"}), 400
+    if len(product_ids) > PRODUCTS_BATCH_MAX_IDS:
+        return jsonify({"error": f"At most {PRODUCTS_BATCH_MAX_IDS} ids per request"}), 400
+    
+    cache = get_product_cache()
+    unique_ids = list(dict.fromkeys(product_ids))
+    for pid in unique_ids:
+        product_hits.hit(pid)
+    keys = product_cache_keys(unique_ids, cache.get_counters([product_gen_key(pid) for pid in unique_ids]))
+    now = time.time()
+    cached = {}
+    for key, entry in cache.get_many(list(keys), raw=True).items():
+        if entry.fresh_until > now:
+            cached[keys[key]] = entry.value
+    
+    missing = [pid for pid in unique_ids if pid not in cached]
+    count_lookup("product", True, len(cached))
+    count_lookup("product", False, len(missing))
+    loaded = {}
+    if missing:
+        try:
+            with read_connection(client_lsn()) as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT {PRODUCT_COLUMNS}
+                    FROM products
+                    WHERE id = ANY(%s)
+                """, (missing,))
+                rows = cursor.fetchall()
+                cursor.close()
+        except Exception as e:
+            logger.error(f"Erro ao buscar produtos em lote: {e}")
+            return jsonify({"error": str(e)}), 500
         
-        if row:
-            product = {
-                "id": row[0],
-                "name": row[1],
-                "description": row[2],
-                "price": float(row[3]),
-                "stock": row[4],
-                "created_at": row[5].isoformat(),
-                "updated_at": row[6].isoformat()
-            }
-            
-            try:
-                redis_client.setex(cache_key, CACHE_EXPIRATION, json.dumps(product))
-            except Exception as e:
-                logger.warning(f"Erro ao armazenar no cache: {e}")
-            
-            logger.info(f"✓ Produto {product_id} obtido do banco")
-            return jsonify({
-                "source": "database",
-                "product": product
-            }), 200
+        loaded = {row[0]: dumps({"product": row_to_product(row)}) for row in rows}
+        fragments = {key: loaded[pid] for key, pid in keys.items() if pid in loaded}
+        if fragments:
+            cache.set_many(fragments, CACHE_EXPIRATION, raw=True)
+    
+    results = []
+    found = 0
+    for pid in product_ids:
+        if pid in cached:
+            results.append(b'{"id":%d,"status":200,"source":"cache",' % pid + cached[pid][1:])
+        elif pid in loaded:
+            results.append(b'{"id":%d,"status":200,"source":"database",' % pid + loaded[pid][1:])
         else:
-            return jsonify({"error": "Product not found"}), 404
+            results.append(b'{"id":%d,"status":404,"error":"Product not found"}' % pid)
+            continue
+        found += 1
+    
+    logger.info(f"✓ Lote de {len(unique_ids)} produtos: {len(cached)} do cache, {len(loaded)} do banco")
+    body = b'{"requested":%d,"found":%d,"results":[' % (len(product_ids), found) + b','.join(results) + b']}'
+    return Response(body, status=200, mimetype='application/json')
+
+@app.route('/products/<int:product_id>', methods=['GET'])
+def get_product(product_id):
+    cache = get_product_cache()
+    product_hits.hit(product_id)
+    min_lsn = client_lsn()
+    
+    # Toda escrita incrementa products:gen:all: com o contador, um
+    # If-None-Match válido é respondido sem ler o produto
+    generations = cache.get_counters([GEN_ALL_KEY, product_gen_key(product_id)])
+    etag = catalog_etag(generations[GEN_ALL_KEY], "product", product_id)
+    if etag_matches(etag):
+        return not_modified(etag)
+    
+    def load_product():
+        with read_connection(min_lsn) as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT {PRODUCT_COLUMNS}
+                FROM products
+                WHERE id = %s
+            """, (product_id,))
             
+            row = cursor.fetchone()
+            cursor.close()
+        
+        if row is None:
+            return None
+        logger.info(f"✓ Produto {product_id} obtido do banco")
+        return dumps({"product": row_to_product(row)})
+    
+    keys = product_cache_keys([product_id], generations)
+    try:
+        if keys:
+            product, source = cache.get_or_load(next(iter(keys)), load_product, CACHE_EXPIRATION, raw=True)
+        else:
+            product, source = load_product(), "database"
     except Exception as e:
         logger.error(f"Erro ao buscar produto: {e}")
         return jsonify({"error": str(e)}), 500
+    
+    count_lookup("product", source == "cache")
+    if product is None:
+        return jsonify({"error": "Product not found"}), 404
+    
+    if etag is None:
+        # Sem o contador (Redis indisponível), o ETag vem do conteúdo
+        etag = content_etag(product)
+        if etag_matches(etag):
+            return not_modified(etag)
+    return fragment_response(source, product, etag=etag)
 
 @app.route('/products', methods=['POST'])
 def create_product():
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     
     required_fields = ['name', 'price', 'stock']
     for field in required_fields:
@@ -222,40 +933,174 @@ def create_product():
             return jsonify({"error": f"Missing field: {field}"}), 400
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO products (name, description, price, stock)
-            VALUES (%s, %s, %s, %s)
-            RETURNING id
-        """, (
-            data['name'],
-            data.get('description', ''),
-            data['price'],
-            data['stock']
-        ))
-        
-        product_id = cursor.fetchone()[0]
-        conn.commit()
-        cursor.close()
-        conn.close()
+        values = validate_fields(data, IMPORT_COLUMNS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        with get_db_pool().connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO products (name, description, price, stock)
+                VALUES (%s, %s, %s, %s)
+                RETURNING id
+            """, values)
+            
+            product_id = cursor.fetchone()[0]
+            conn.commit()
+            cursor.close()
+            lsn = record_write(conn)
         
         try:
-            redis_client.delete("products:all")
+            bump_generations(created=True)
             logger.info("✓ Cache de produtos invalidado")
         except Exception as e:
             logger.warning(f"Erro ao invalidar cache: {e}")
         
         logger.info(f"✓ Produto {product_id} criado com sucesso")
-        return jsonify({
+        return with_lsn_token(jsonify({
             "message": "Product created",
             "id": product_id
-        }), 201
+        }), lsn), 201
         
     except Exception as e:
         logger.error(f"Erro ao criar produto: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/products/import', methods=['POST'])
+def import_products_endpoint():
+    fmt = request.args.get('format') or detect_format(None, request.content_type)
+    strict = request.args.get('strict', 'false').lower() in ('1', 'true', 'yes')
+    stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+    
+    try:
+        with get_db_pool().connection() as conn:
+            result = import_products(conn, stream, fmt, strict, IMPORT_MAX_ERRORS)
+            lsn = record_write(conn) if result.inserted else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Erro na importação de produtos: {e}")
+        return jsonify({"error": str(e)}), 500
+    
+    if result.inserted:
+        try:
+            bump_generations(created=True)
+            logger.info("✓ Cache de produtos invalidado")
+        except Exception as e:
+            logger.warning(f"Erro ao invalidar cache: {e}")
+    
+    logger.info(
+        f"✓ Importação concluída: {result.inserted} inseridos, "
+        f"{result.rejected} rejeitados em {result.duration:.2f}s"
+    )
+    status_code = 422 if strict and result.rejected else 200
+    return with_lsn_token(jsonify(result.to_dict()), lsn), status_code
+
+@app.route('/products/<int:product_id>', methods=['PUT'])
+def update_product(product_id):
+    data = request.get_json(silent=True) or {}
+    
+    updatable_fields = ['name', 'description', 'price', 'stock']
+    fields = [field for field in updatable_fields if field in data]
+    if not fields:
+        return jsonify({"error": f"Provide at least one of: {', '.join(updatable_fields)}"}), 400
+    
+    try:
+        values = validate_fields(data, fields)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        with get_db_pool().connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql.SQL("""
+                UPDATE products
+                SET {assignments}
+                WHERE id = %s
+                RETURNING {columns}
+            """).format(
+                assignments=sql.SQL(', ').join(
+                    sql.SQL("{} = %s").format(sql.Identifier(field)) for field in fields
+                ),
+                columns=sql.SQL(PRODUCT_COLUMNS)
+            ), values + [product_id])
+            
+            row = cursor.fetchone()
+            conn.commit()
+            cursor.close()
+            lsn = record_write(conn) if row is not None else None
+        
+        if row is None:
+            return jsonify({"error": "Product not found"}), 404
+        
+        product = row_to_product(row)
+        
+        try:
+            bump_generations(changed=row[5], product_id=product_id)
+            logger.info(f"✓ Cache do produto {product_id} invalidado")
+        except Exception as e:
+            logger.warning(f"Erro ao invalidar cache: {e}")
+        
+        logger.info(f"✓ Produto {product_id} atualizado com sucesso")
+        return with_lsn_token(jsonify({
+            "message": "Product updated",
+            "product": product
+        }), lsn), 200
+        
+    except Exception as e:
+        logger.error(f"Erro ao atualizar produto: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/products/<int:product_id>', methods=['DELETE'])
+def delete_product(product_id):
+    try:
+        with get_db_pool().connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                DELETE FROM products
+                WHERE id = %s
+                RETURNING created_at
+            """, (product_id,))
+            
+            row = cursor.fetchone()
+            conn.commit()
+            cursor.close()
+            lsn = record_write(conn) if row is not None else None
+        
+        if row is None:
+            return jsonify({"error": "Product not found"}), 404
+        
+        try:
+            bump_generations(changed=row[0], product_id=product_id)
+            logger.info(f"✓ Cache do produto {product_id} invalidado")
+        except Exception as e:
+            logger.warning(f"Erro ao invalidar cache: {e}")
+        
+        logger.info(f"✓ Produto {product_id} removido com sucesso")
+        return with_lsn_token(jsonify({
+            "message": "Product deleted",
+            "id": product_id
+        }), lsn), 200
+        
+    except Exception as e:
+        logger.error(f"Erro ao remover produto: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/admin/cache/warmup', methods=['POST'])
+def warmup_endpoint():
+    if ADMIN_TOKEN and request.headers.get('X-Admin-Token') != ADMIN_TOKEN:
+        return jsonify({"error": "Forbidden"}), 403
+    
+    try:
+        flush_product_hits()
+        summary = warm_cache()
+    except Exception as e:
+        logger.error(f"Erro ao aquecer o cache: {e}")
+        return jsonify({"error": str(e)}), 500
+    
+    return jsonify({"message": "Cache warmed", **summary}), 200
+
 @app.route('/stats')
 def get_stats():
     stats = {
@@ -263,26 +1108,41 @@ def get_stats():
     }
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM products")
-        stats["total_products"] = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT SUM(stock) FROM products")
-        stats["total_stock"] = cursor.fetchone()[0] or 0
+        with read_connection(client_lsn(), fills_cache=False) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT total_products, total_stock, reconciled_at
+                FROM product_stats
+            """)
+            total_products, total_stock, reconciled_at = cursor.fetchone()
+            cursor.close()
         
-        cursor.close()
-        conn.close()
+        stats["total_products"] = total_products
+        stats["total_stock"] = total_stock
+        stats["reconciled_at"] = reconciled_at.isoformat() if reconciled_at else None
     except Exception as e:
         stats["database_error"] = str(e)
     
+    if db_pool is not None:
+        stats["db_pool"] = db_pool.stats()
+    
+    if db_router is not None and db_router.replicas:
+        stats["db_router"] = db_router.stats()
+    
+    if product_cache is not None:
+        stats["app_cache"] = product_cache.stats()
+    
     try:
-        info = redis_client.info()
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.info('memory')
+        pipe.info('stats')
+        pipe.dbsize()
+        memory_info, stats_info, keys = pipe.execute()
         stats["cache"] = {
-            "keys": redis_client.dbsize(),
-            "memory_used": info.get('used_memory_human'),
-            "hits": info.get('keyspace_hits', 0),
-            "misses": info.get('keyspace_misses', 0)
+            "keys": keys,
+            "memory_used": memory_info.get('used_memory_human'),
+            "hits": stats_info.get('keyspace_hits', 0),
+            "misses": stats_info.get('keyspace_misses', 0)
         }
     except Exception as e:
         stats["cache_error"] = str(e)
@@ -291,4 +1151,5 @@ def get_stats():
 
 if __name__ == '__main__':
     logger.info("Iniciando aplicação web...")
+    start_background_tasks()
     app.run(host='0.0.0.0', port=5000, debug=False)
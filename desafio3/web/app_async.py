@@ -0,0 +1,963 @@
+"""Variante assíncrona (ASGI) da API de produtos.
+
+Mesmas rotas e mesmo contrato JSON de app.py, mas com asyncpg e
+redis.asyncio: uma requisição esperando o banco ou o cache não prende uma
+thread, então um único processo atende milhares de conexões simultâneas.
+Compartilha com app.py, via catalog.py, a configuração, as chaves de cache
+e os contadores de geração, além do canal de invalidação, podendo rodar
+lado a lado com ele.
+
+Execução: uvicorn app_async:app --host 0.0.0.0 --port 5000 --loop uvloop
+"""
+from quart import Quart, Response, jsonify, request
+from quart.wrappers.response import IterableBody
+from werkzeug.exceptions import RequestEntityTooLarge
+import redis.asyncio as aioredis
+import asyncpg
+import asyncio
+import logging
+import os
+import hashlib
+import time
+from datetime import datetime
+
+from async_cache import AsyncTwoTierCache
+from bulk_import import IMPORT_COLUMNS, detect_format, import_products_async, validate_fields
+from cache import HitCounter, LocalCache
+from catalog import (
+    ADMIN_TOKEN, ALL_PRODUCTS_QUERY, CACHE_COMPRESS_MIN_BYTES,
+    CACHE_EARLY_REFRESH_BETA, CACHE_EXPIRATION, CACHE_INVALIDATION_CHANNEL,
+    CACHE_LOCK_TIMEOUT, CACHE_STALE_TTL, CONTENT_ENCODINGS, DB_CONFIG,
+    DB_POOL_MAX, DB_POOL_MIN, DB_POOL_TIMEOUT, DB_REPLICA_DSNS, GEN_ALL_KEY,
+    HEALTH_PROBE_INTERVAL, HEALTH_PROBE_TIMEOUT,
+    HOT_PRODUCTS_FLUSH_INTERVAL, HOT_PRODUCTS_KEY, HOT_PRODUCTS_MAX_TRACKED,
+    IMPORT_MAX_ERRORS, LOCAL_CACHE_MAX_ENTRIES, LOCAL_CACHE_TTL,
+    PRODUCTS_ALL_CACHE_MAX_BYTES, PRODUCTS_BATCH_MAX_IDS,
+    PRODUCTS_PAGE_DEFAULT, PRODUCTS_PAGE_MAX, PRODUCTS_STREAM_ITERSIZE,
+    PRODUCT_COLUMNS, RECORD_WRITE_LSN_SCRIPT, REDIS_HOST, REDIS_PORT,
+    RESPONSE_COMPRESS_MIN_BYTES, SCHEMA_RETRY_MAX, SEARCH_DOCUMENT,
+    SEARCH_PAGE_DEFAULT, SEARCH_QUERY_MAX_LENGTH, STATS_RECONCILE_INTERVAL,
+    WARMUP_ENABLED, WARMUP_HOT_PRODUCTS, WARMUP_PAGES, WARMUP_RETRY_MAX,
+    WRITE_LSN_KEY,
+    build_prefix_tsquery, catalog_etag, compress_body, content_etag,
+    decode_cursor, dumps, encode_cursor, generation_keys,
+    normalize_search_query, pack_variants, page_gen_keys, page_value,
+    plan_first_pages, product_cache_keys, product_gen_key, row_to_product,
+    split_versions, unpack_variants, warmup_batches, warmup_counter_keys,
+    warmup_values, with_etag, with_lsn_token
+)
+from db_router import parse_lsn
+from health import AsyncHealthProber
+from schema import migrate_schema_async
+
+app = Quart(__name__)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', '200'))
+IMPORT_MAX_BYTES = int(os.getenv('IMPORT_MAX_BYTES', str(64 * 1024 * 1024)))
+
+app.config['MAX_CONTENT_LENGTH'] = IMPORT_MAX_BYTES
+
+db_pool = None
+redis_client = None
+product_cache = None
+_catalog_too_large_until = 0.0
+_stats_reconciler = None
+health_prober = None
+product_hits = HitCounter()
+_background_tasks = []
+_probe_conn = None
+
+class ClosingBody(IterableBody):
+    """Corpo que chama on_close quando o servidor o fecha, mesmo que o
+    gerador nunca tenha começado; faz o papel do call_on_close do Flask."""
+    
+    def __init__(self, iterable, on_close):
+        super().__init__(iterable)
+        self.on_close = on_close
+    
+    async def __aexit__(self, exc_type, exc_value, tb):
+        try:
+            await super().__aexit__(exc_type, exc_value, tb)
+        finally:
+            await self.on_close()
+
+def fragment_response(source, fragment, status=200, etag=None):
+    body = b'{"source":"' + source.encode('ascii') + b'",' + fragment[1:]
+    return with_etag(Response(body, status=status, mimetype='application/json'), etag)
+
+async def variant_response(source, value, etag=None):
+    fragment, variants = unpack_variants(value)
+    negotiated = len(fragment) >= RESPONSE_COMPRESS_MIN_BYTES
+    encoding = request.accept_encodings.best_match(CONTENT_ENCODINGS) if negotiated else None
+    if encoding is None:
+        response = fragment_response(source, fragment, etag=etag)
+    else:
+        body = variants.get(encoding) if source == "cache" else None
+        if body is None:
+            body = await asyncio.to_thread(
+                compress_body, b'{"source":"' + source.encode('ascii') + b'",' + fragment[1:], encoding
+            )
+        response = Response(body, status=200, mimetype='application/json')
+        response.headers['Content-Encoding'] = encoding
+        with_etag(response, f"{etag}-{encoding}" if etag is not None else None)
+    if negotiated:
+        response.vary.add('Accept-Encoding')
+    return response
+
+def etag_matches(etag):
+    if etag is None:
+        return None
+    for tag in [etag] + [f"{etag}-{encoding}" for encoding in CONTENT_ENCODINGS]:
+        if request.if_none_match.contains_weak(tag):
+            return tag
+    return None
+
+def not_modified(etag):
+    return with_etag(Response(b'', status=304), etag_matches(etag) or etag)
+
+@app.before_serving
+async def startup():
+    global db_pool, redis_client, product_cache, _stats_reconciler, health_prober
+    
+    db_pool = await asyncpg.create_pool(
+        host=DB_CONFIG['host'],
+        database=DB_CONFIG['database'],
+        user=DB_CONFIG['user'],
+        password=DB_CONFIG['password'],
+        port=int(DB_CONFIG['port']),
+        min_size=DB_POOL_MIN,
+        max_size=DB_POOL_MAX
+    )
+    logger.info(f"✓ Pool de conexões asyncpg criado (min={DB_POOL_MIN}, max={DB_POOL_MAX})")
+    
+    redis_pool = aioredis.ConnectionPool(
+        host=REDIS_HOST, port=REDIS_PORT, max_connections=REDIS_MAX_CONNECTIONS
+    )
+    redis_client = aioredis.Redis(connection_pool=redis_pool, decode_responses=True)
+    product_cache = AsyncTwoTierCache(
+        aioredis.Redis(connection_pool=redis_pool),
+        local=LocalCache(LOCAL_CACHE_MAX_ENTRIES, LOCAL_CACHE_TTL),
+        channel=CACHE_INVALIDATION_CHANNEL,
+        stale_ttl=CACHE_STALE_TTL,
+        lock_timeout=CACHE_LOCK_TIMEOUT,
+        early_refresh_beta=CACHE_EARLY_REFRESH_BETA,
+        compress_min_bytes=CACHE_COMPRESS_MIN_BYTES
+    )
+    product_cache.start_listener()
+    logger.info("✓ Conexão com Redis configurada")
+    
+    if STATS_RECONCILE_INTERVAL > 0:
+        _stats_reconciler = asyncio.create_task(run_stats_reconciler())
+    
+    health_prober = AsyncHealthProber(
+        {"database": check_database, "cache": redis_client.ping},
+        interval=HEALTH_PROBE_INTERVAL,
+        timeout=HEALTH_PROBE_TIMEOUT
+    )
+    health_prober.start()
+    
+    health_prober.hold("schema")
+    _background_tasks.append(asyncio.create_task(run_schema_migration()))
+    _background_tasks.append(asyncio.create_task(run_hit_flusher()))
+    if WARMUP_ENABLED:
+        health_prober.hold("warmup")
+        _background_tasks.append(asyncio.create_task(run_warmup()))
+
+@app.after_serving
+async def shutdown():
+    if _stats_reconciler is not None:
+        _stats_reconciler.cancel()
+    if health_prober is not None:
+        health_prober.stop()
+    for task in _background_tasks:
+        task.cancel()
+    if product_cache is not None:
+        await product_cache.stop()
+    if redis_client is not None:
+        await redis_client.connection_pool.disconnect()
+    if _probe_conn is not None:
+        _probe_conn.terminate()
+    if db_pool is not None:
+        await db_pool.close()
+
+def acquire():
+    return db_pool.acquire(timeout=DB_POOL_TIMEOUT)
+
+async def record_write(conn):
+    """Equivalente de app.record_write: esta aplicação só lê do primário,
+    mas as instâncias síncronas que compartilham o cache usam db:write_lsn
+    para não preenchê-lo a partir de uma réplica atrasada."""
+    if not DB_REPLICA_DSNS:
+        return None
+    lsn = parse_lsn(await conn.fetchval("SELECT pg_current_wal_lsn()::text"))
+    try:
+        await product_cache.redis.eval(RECORD_WRITE_LSN_SCRIPT, 1, WRITE_LSN_KEY, lsn)
+    except Exception as e:
+        logger.warning(f"Erro ao registrar LSN da escrita: {e}")
+    return lsn
+
+async def check_database():
+    """Sonda com conexão própria, fora do pool: um pool esgotado por
+    requisições lentas não deve tirar o serviço de prontidão."""
+    global _probe_conn
+    if _probe_conn is None or _probe_conn.is_closed():
+        _probe_conn = await asyncpg.connect(
+            host=DB_CONFIG['host'],
+            database=DB_CONFIG['database'],
+            user=DB_CONFIG['user'],
+            password=DB_CONFIG['password'],
+            port=int(DB_CONFIG['port']),
+            timeout=HEALTH_PROBE_TIMEOUT,
+            server_settings={'statement_timeout': str(int(HEALTH_PROBE_TIMEOUT * 1000))}
+        )
+    try:
+        await _probe_conn.fetchval("SELECT 1")
+    except BaseException:
+        # Inclui o cancelamento pelo timeout do prober, que deixaria a
+        # consulta pendente na conexão
+        _probe_conn.terminate()
+        raise
+
+async def reconcile_product_stats(force=False):
+    async with acquire() as conn:
+        async with conn.transaction():
+            if not await conn.fetchval("SELECT pg_try_advisory_xact_lock(hashtext('product_stats_reconcile'))"):
+                return False
+            
+            row = await conn.fetchrow("""
+                SELECT reconciled_at > CURRENT_TIMESTAMP - make_interval(secs => $1)
+                FROM product_stats
+                FOR UPDATE
+            """, float(STATS_RECONCILE_INTERVAL))
+            if row is None or (row[0] and not force):
+                return False
+            
+            await conn.execute("""
+                UPDATE product_stats
+                SET total_products = totals.total_products,
+                    total_stock = totals.total_stock,
+                    reconciled_at = CURRENT_TIMESTAMP
+                FROM (
+                    SELECT COUNT(*) AS total_products, COALESCE(SUM(stock), 0) AS total_stock
+                    FROM products
+                ) AS totals
+            """)
+    
+    logger.info("✓ Estatísticas de produtos reconciliadas")
+    return True
+
+async def run_stats_reconciler():
+    while True:
+        try:
+            await reconcile_product_stats()
+        except Exception as e:
+            logger.warning(f"Erro ao reconciliar estatísticas: {e}")
+        await asyncio.sleep(STATS_RECONCILE_INTERVAL)
+
+async def versions_current(versions):
+    return await product_cache.get_counters(list(versions)) == versions
+
+async def page_is_current(value):
+    return await versions_current(split_versions(value)[0])
+
+async def bump_generations(created=False, changed=None, product_id=None):
+    await product_cache.incr_counters(generation_keys(created, changed, product_id))
+
+async def flush_product_hits():
+    counts = product_hits.drain()
+    if not counts:
+        return
+    pipe = product_cache.redis.pipeline(transaction=False)
+    for product_id, count in counts.items():
+        pipe.zincrby(HOT_PRODUCTS_KEY, count, product_id)
+    pipe.zremrangebyrank(HOT_PRODUCTS_KEY, 0, -HOT_PRODUCTS_MAX_TRACKED - 1)
+    await pipe.execute()
+
+async def run_hit_flusher():
+    while True:
+        await asyncio.sleep(HOT_PRODUCTS_FLUSH_INTERVAL)
+        try:
+            await flush_product_hits()
+        except Exception as e:
+            logger.warning(f"Erro ao registrar produtos mais acessados: {e}")
+
+WARMUP_QUERY = f"""
+    SELECT TRUE AS hot, {PRODUCT_COLUMNS}
+    FROM products
+    WHERE id = ANY($1::int[])
+    UNION ALL
+    (
+        SELECT FALSE AS hot, {PRODUCT_COLUMNS}
+        FROM products
+        ORDER BY created_at DESC, id DESC
+        LIMIT $2
+    )
+"""
+
+async def warm_cache():
+    start = time.monotonic()
+    hot_ids = [int(pid) for pid in await product_cache.redis.zrevrange(HOT_PRODUCTS_KEY, 0, WARMUP_HOT_PRODUCTS - 1)]
+    guard = (await product_cache.get_counters([GEN_ALL_KEY], fresh=True))[GEN_ALL_KEY]
+    
+    async with acquire() as conn:
+        rows = await conn.fetch(WARMUP_QUERY, hot_ids, WARMUP_PAGES * PRODUCTS_PAGE_DEFAULT + 1)
+    
+    pages = plan_first_pages([tuple(row)[1:] for row in rows if not row[0]], PRODUCTS_PAGE_DEFAULT, WARMUP_PAGES)
+    rows = [tuple(row) for row in rows]
+    versions = await product_cache.get_counters(warmup_counter_keys(rows, pages), fresh=True)
+    values = warmup_values(rows, pages, versions if versions[GEN_ALL_KEY] == guard else None)
+    
+    batches = 0
+    for batch, compress in warmup_batches(values):
+        await product_cache.set_many(batch, CACHE_EXPIRATION, raw=True, compress=compress)
+        batches += 1
+    
+    summary = {
+        "hot_products": len(hot_ids),
+        "products": sum(1 for key in values if key.startswith("product:")),
+        "pages": sum(1 for key in values if key.startswith("products:page:")),
+        "batches": batches,
+        "duration_ms": round((time.monotonic() - start) * 1000, 1)
+    }
+    logger.info(f"✓ Cache aquecido: {summary['products']} produtos e {summary['pages']} páginas em {summary['duration_ms']}ms")
+    return summary
+
+async def run_schema_migration():
+    delay = 1
+    while True:
+        try:
+            async with db_pool.acquire() as conn:
+                await migrate_schema_async(conn)
+            logger.info("✓ Esquema do banco atualizado")
+            health_prober.release("schema")
+            return
+        except Exception as e:
+            logger.warning(f"Erro ao migrar o esquema, nova tentativa em {delay:g}s: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, SCHEMA_RETRY_MAX)
+
+async def catalog_generation():
+    generation = (await product_cache.get_counters([GEN_ALL_KEY], fresh=True))[GEN_ALL_KEY]
+    return generation if generation >= 0 else None
+
+async def run_warmup():
+    delay = 1
+    baseline = await catalog_generation()
+    while True:
+        try:
+            await warm_cache()
+            return
+        except Exception as e:
+            logger.warning(f"Erro ao aquecer o cache, nova tentativa em {delay:g}s: {e}")
+        finally:
+            health_prober.release("warmup")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, WARMUP_RETRY_MAX)
+        current = await catalog_generation()
+        if baseline is None:
+            baseline = current
+        elif current is not None and current != baseline:
+            logger.info("✓ Aquecimento dispensado: o catálogo foi alterado")
+            return
+
+@app.route('/')
+async def home():
+    return jsonify({
+        "service": "Product Management API",
+        "version": "1.0.0",
+        "mode": "asgi",
+        "endpoints": {
+            "GET /": "Esta página",
+            "GET /health": "Health check (estado mantido pelo prober em segundo plano)",
+            "GET /livez": "Liveness: apenas o processo, sem dependências",
+            "GET /readyz": "Readiness: último estado das dependências",
+            "GET /products": "Lista todos os produtos em streaming (usa cache)",
+            "GET /products?limit=&after=": "Lista produtos paginados por cursor (usa cache)",
+            "GET /products?ids=1,2,3": "Busca vários produtos de uma vez (usa cache)",
+            "POST /products/batch": "Busca vários produtos a partir de {\"ids\": [...]} (usa cache)",
+            "GET /products/search?q=&page=&limit=": "Busca textual ranqueada em nome e descrição (usa cache)",
+            "GET /products/<id>": "Busca produto por ID (usa cache)",
+            "POST /products": "Cria novo produto",
+            "POST /products/import": "Importa produtos em massa (CSV ou NDJSON via COPY)",
+            "PUT /products/<id>": "Atualiza produto",
+            "DELETE /products/<id>": "Remove produto",
+            "GET /stats": "Estatísticas do sistema",
+            "POST /admin/cache/warmup": "Aquece o cache com os produtos mais acessados e as primeiras páginas"
+        }
+    }), 200
+
+@app.route('/health')
+async def health():
+    probe = health_prober.snapshot()
+    health_status = {
+        "service": "web",
+        "status": "healthy" if probe["ready"] else "degraded",
+        "timestamp": datetime.now().isoformat(),
+        "dependencies": {
+            name: "healthy" if result["error"] is None else f"unhealthy: {result['error']}"
+            for name, result in probe["dependencies"].items()
+        },
+        "last_probe": probe["last_probe"]
+    }
+    
+    status_code = 200 if probe["ready"] else 503
+    return jsonify(health_status), status_code
+
+@app.route('/livez')
+async def livez():
+    return jsonify({"status": "alive"}), 200
+
+@app.route('/readyz')
+async def readyz():
+    probe = health_prober.snapshot()
+    return jsonify(probe), 200 if probe["ready"] else 503
+
+@app.route('/products', methods=['GET'])
+async def get_products():
+    ids = request.args.get('ids')
+    if ids is not None:
+        try:
+            product_ids = [int(value) for value in ids.split(',') if value.strip()]
+        except ValueError:
+            return jsonify({"error": "ids must be a comma-separated list of integers"}), 400
+        return await get_products_batch(product_ids)
+    
+    limit = request.args.get('limit')
+    after = request.args.get('after')
+    
+    if limit is None and after is None:
+        return await stream_all_products()
+    
+    try:
+        limit = int(limit) if limit is not None else PRODUCTS_PAGE_DEFAULT
+        if not 1 <= limit <= PRODUCTS_PAGE_MAX:
+            raise ValueError(f"limit must be between 1 and {PRODUCTS_PAGE_MAX}")
+        position = decode_cursor(after) if after else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return await get_products_page(limit, after, position)
+
+async def get_products_page(limit, after, position):
+    cache_key = f"products:page:{limit}:{after or 'first'}"
+    etag = catalog_etag((await product_cache.get_counters([GEN_ALL_KEY]))[GEN_ALL_KEY], "page", limit, after)
+    if etag_matches(etag):
+        return not_modified(etag)
+    
+    async def load_page():
+        guard = (await product_cache.get_counters([GEN_ALL_KEY], fresh=True))[GEN_ALL_KEY]
+        async with acquire() as conn:
+            if position is None:
+                rows = await conn.fetch(f"""
+                    SELECT {PRODUCT_COLUMNS}
+                    FROM products
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT $1
+                """, limit + 1)
+            else:
+                created_at, product_id = position
+                rows = await conn.fetch(f"""
+                    SELECT {PRODUCT_COLUMNS}
+                    FROM products
+                    WHERE created_at <= $1
+                      AND (created_at < $1 OR id < $2)
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT $3
+                """, created_at, product_id, limit + 1)
+        
+        products = [row_to_product(row) for row in rows[:limit]]
+        dependencies = page_gen_keys(rows[:limit], position)
+        versions = await product_cache.get_counters(dependencies + [GEN_ALL_KEY], fresh=True)
+        if versions.pop(GEN_ALL_KEY) != guard:
+            versions = {key: -1 for key in versions}
+        
+        logger.info(f"✓ {len(products)} produtos obtidos do banco de dados (página)")
+        return page_value(versions, limit, products, encode_cursor(products[-1]) if len(rows) > limit else None)
+    
+    try:
+        page, source = await product_cache.get_or_load(
+            cache_key, load_page, CACHE_EXPIRATION, raw=True, validate=page_is_current, compress=False
+        )
+    except Exception as e:
+        logger.error(f"Erro ao buscar produtos: {e}")
+        return jsonify({"error": str(e)}), 500
+    
+    return await variant_response(source, split_versions(page)[1], etag=etag)
+
+async def load_all_products_json():
+    items = []
+    size = 16
+    async with acquire() as conn:
+        async with conn.transaction():
+            async for row in conn.cursor(ALL_PRODUCTS_QUERY, prefetch=PRODUCTS_STREAM_ITERSIZE):
+                item = dumps(row_to_product(row))
+                size += len(item) + 1
+                if size > PRODUCTS_ALL_CACHE_MAX_BYTES:
+                    return None
+                items.append(item)
+    logger.info(f"✓ {len(items)} produtos obtidos do banco de dados")
+    return await asyncio.to_thread(pack_variants, b'{"products":[' + b','.join(items) + b']}')
+
+async def stream_all_products():
+    global _catalog_too_large_until
+    
+    generation = (await product_cache.get_counters([GEN_ALL_KEY]))[GEN_ALL_KEY]
+    etag = catalog_etag(generation, "all")
+    if etag_matches(etag):
+        return not_modified(etag)
+    
+    if time.monotonic() >= _catalog_too_large_until:
+        try:
+            data, source = await product_cache.get_or_load(
+                f"products:all:g{generation}", load_all_products_json, CACHE_EXPIRATION, raw=True, compress=False
+            )
+        except Exception as e:
+            logger.error(f"Erro ao buscar produtos: {e}")
+            return jsonify({"error": str(e)}), 500
+        
+        if data is not None:
+            logger.info(f"✓ Produtos obtidos ({source})")
+            return await variant_response(source, data, etag=etag)
+        
+        _catalog_too_large_until = time.monotonic() + CACHE_EXPIRATION
+    
+    # Conexão e cursor são abertos antes dos cabeçalhos: uma falha aqui
+    # ainda vira 500, e não um 200 truncado
+    try:
+        conn = await db_pool.acquire(timeout=DB_POOL_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Erro ao buscar produtos: {e}")
+        return jsonify({"error": str(e)}), 500
+    
+    transaction = conn.transaction()
+    try:
+        await transaction.start()
+        cursor = await conn.cursor(ALL_PRODUCTS_QUERY)
+    except Exception as e:
+        await db_pool.release(conn)
+        logger.error(f"Erro ao buscar produtos: {e}")
+        return jsonify({"error": str(e)}), 500
+    
+    released = False
+    
+    async def release():
+        # Chamado pelo finally do gerador ou pelo fechamento do corpo; este
+        # último também cobre HEAD e clientes que desconectam antes de o
+        # gerador começar
+        nonlocal released
+        if released:
+            return
+        released = True
+        try:
+            await transaction.rollback()
+        except Exception:
+            pass
+        await db_pool.release(conn)
+    
+    async def generate():
+        total = 0
+        
+        try:
+            yield b'{"source":"database","products":['
+            while True:
+                rows = await cursor.fetch(PRODUCTS_STREAM_ITERSIZE)
+                if not rows:
+                    break
+                items = [dumps(row_to_product(row)) for row in rows]
+                yield (b',' if total else b'') + b','.join(items)
+                total += len(items)
+            yield b']}'
+        except Exception as e:
+            logger.error(f"Erro durante streaming de produtos: {e}")
+            return
+        finally:
+            await release()
+        
+        logger.info(f"✓ {total} produtos transmitidos do banco de dados")
+    
+    response = Response(generate(), status=200, mimetype='application/json')
+    response.response = ClosingBody(response.response.iter, release)
+    return with_etag(response, etag)
+
+@app.route('/products/search', methods=['GET'])
+async def search_products():
+    normalized = normalize_search_query(request.args.get('q', ''))
+    if not normalized:
+        return jsonify({"error": "Query parameter 'q' is required"}), 400
+    if len(normalized) > SEARCH_QUERY_MAX_LENGTH:
+        return jsonify({"error": f"Query longer than {SEARCH_QUERY_MAX_LENGTH} characters"}), 400
+    
+    try:
+        limit = int(request.args.get('limit', SEARCH_PAGE_DEFAULT))
+        page = int(request.args.get('page', 1))
+        if not 1 <= limit <= PRODUCTS_PAGE_MAX or page < 1:
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": f"limit must be between 1 and {PRODUCTS_PAGE_MAX} and page >= 1"}), 400
+    
+    tsquery = build_prefix_tsquery(normalized)
+    
+    async def load_results():
+        async with acquire() as conn:
+            rows = await conn.fetch(f"""
+                SELECT {PRODUCT_COLUMNS},
+                       ts_rank({SEARCH_DOCUMENT}, query) + similarity(name, $1) AS rank
+                FROM products, to_tsquery('simple', $2) AS query
+                WHERE {SEARCH_DOCUMENT} @@ query
+                   OR name % $1
+                ORDER BY rank DESC, id DESC
+                LIMIT $3 OFFSET $4
+            """, normalized, tsquery, limit + 1, (page - 1) * limit)
+        
+        results = []
+        for row in rows[:limit]:
+            product = row_to_product(row)
+            product["rank"] = round(float(row[7]), 4)
+            results.append(product)
+        logger.info(f"✓ Busca '{normalized}': {len(results)} resultados do banco")
+        return pack_variants(dumps({
+            "query": normalized,
+            "page": page,
+            "limit": limit,
+            "products": results,
+            "has_more": len(rows) > limit
+        }))
+    
+    try:
+        generation = (await product_cache.get_counters([GEN_ALL_KEY]))[GEN_ALL_KEY]
+        etag = catalog_etag(generation, "search", normalized, limit, page)
+        if etag_matches(etag):
+            return not_modified(etag)
+        digest = hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+        cache_key = f"products:search:g{generation}:{digest}:{limit}:{page}"
+        results, source = await product_cache.get_or_load(cache_key, load_results, CACHE_EXPIRATION, raw=True, compress=False)
+    except Exception as e:
+        logger.error(f"Erro na busca de produtos: {e}")
+        return jsonify({"error": str(e)}), 500
+    
+    return await variant_response(source, results, etag=etag)
+
+@app.route('/products/batch', methods=['POST'])
+async def post_products_batch():
+    data = await request.get_json(silent=True) or {}
+    product_ids = data.get('ids')
+    if not isinstance(product_ids, list) or not all(isinstance(value, int) for value in product_ids):
+        return jsonify({"error": "Field 'ids' must be a list of integers"}), 400
+    return await get_products_batch(product_ids)
+
+async def get_products_batch(product_ids):
+    if not product_ids:
+        return jsonify({"error": "At least one id is required"}), 400
+    if len(product_ids) > PRODUCTS_BATCH_MAX_IDS:
+        return jsonify({"error": f"At most {PRODUCTS_BATCH_MAX_IDS} ids per request"}), 400
+    
+    unique_ids = list(dict.fromkeys(product_ids))
+    for pid in unique_ids:
+        product_hits.hit(pid)
+    generations = await product_cache.get_counters([product_gen_key(pid) for pid in unique_ids])
+    keys = product_cache_keys(unique_ids, generations)
+    now = time.time()
+    cached = {}
+    entries = await product_cache.get_many(list(keys), raw=True)
+    for key, entry in entries.items():
+        if entry.fresh_until > now:
+            cached[keys[key]] = entry.value
+    
+    missing = [pid for pid in unique_ids if pid not in cached]
+    loaded = {}
+    if missing:
+        try:
+            async with acquire() as conn:
+                rows = await conn.fetch(f"""
+                    SELECT {PRODUCT_COLUMNS}
+                    FROM products
+                    WHERE id = ANY($1::bigint[])
+                """, missing)
+        except Exception as e:
+            logger.error(f"Erro ao buscar produtos em lote: {e}")
+            return jsonify({"error": str(e)}), 500
+        
+        loaded = {row[0]: dumps({"product": row_to_product(row)}) for row in rows}
+        fragments = {key: loaded[pid] for key, pid in keys.items() if pid in loaded}
+        if fragments:
+            await product_cache.set_many(fragments, CACHE_EXPIRATION, raw=True)
+    
+    results = []
+    found = 0
+    for pid in product_ids:
+        if pid in cached:
+            results.append(b'{"id":%d,"status":200,"source":"cache",' % pid + cached[pid][1:])
+        elif pid in loaded:
+            results.append(b'{"id":%d,"status":200,"source":"database",' % pid + loaded[pid][1:])
+        else:
+            results.append(b'{"id":%d,"status":404,"error":"Product not found"}' % pid)
+            continue
+        found += 1
+    
+    logger.info(f"✓ Lote de {len(unique_ids)} produtos: {len(cached)} do cache, {len(loaded)} do banco")
+    body = b'{"requested":%d,"found":%d,"results":[' % (len(product_ids), found) + b','.join(results) + b']}'
+    return Response(body, status=200, mimetype='application/json')
+
+@app.route('/products/<int:product_id>', methods=['GET'])
+async def get_product(product_id):
+    product_hits.hit(product_id)
+    
+    generations = await product_cache.get_counters([GEN_ALL_KEY, product_gen_key(product_id)])
+    etag = catalog_etag(generations[GEN_ALL_KEY], "product", product_id)
+    if etag_matches(etag):
+        return not_modified(etag)
+    
+    async def load_product():
+        async with acquire() as conn:
+            row = await conn.fetchrow(f"""
+                SELECT {PRODUCT_COLUMNS}
+                FROM products
+                WHERE id = $1::bigint
+            """, product_id)
+        
+        if row is None:
+            return None
+        logger.info(f"✓ Produto {product_id} obtido do banco")
+        return dumps({"product": row_to_product(row)})
+    
+    keys = product_cache_keys([product_id], generations)
+    try:
+        if keys:
+            product, source = await product_cache.get_or_load(next(iter(keys)), load_product, CACHE_EXPIRATION, raw=True)
+        else:
+            product, source = await load_product(), "database"
+    except Exception as e:
+        logger.error(f"Erro ao buscar produto: {e}")
+        return jsonify({"error": str(e)}), 500
+    
+    if product is None:
+        return jsonify({"error": "Product not found"}), 404
+    
+    if etag is None:
+        etag = content_etag(product)
+        if etag_matches(etag):
+            return not_modified(etag)
+    return fragment_response(source, product, etag=etag)
+
+@app.route('/products', methods=['POST'])
+async def create_product():
+    data = await request.get_json(silent=True) or {}
+    
+    required_fields = ['name', 'price', 'stock']
+    for field in required_fields:
+        if field not in data:
+            return jsonify({"error": f"Missing field: {field}"}), 400
+    
+    try:
+        values = validate_fields(data, IMPORT_COLUMNS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        async with acquire() as conn:
+            product_id = await conn.fetchval("""
+                INSERT INTO products (name, description, price, stock)
+                VALUES ($1, $2, $3, $4)
+                RETURNING id
+            """, *values)
+            lsn = await record_write(conn)
+        
+        try:
+            await bump_generations(created=True)
+            logger.info("✓ Cache de produtos invalidado")
+        except Exception as e:
+            logger.warning(f"Erro ao invalidar cache: {e}")
+        
+        logger.info(f"✓ Produto {product_id} criado com sucesso")
+        return with_lsn_token(jsonify({
+            "message": "Product created",
+            "id": product_id
+        }), lsn), 201
+    
+    except Exception as e:
+        logger.error(f"Erro ao criar produto: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/products/import', methods=['POST'])
+async def import_products_endpoint():
+    fmt = request.args.get('format') or detect_format(None, request.content_type)
+    strict = request.args.get('strict', 'false').lower() in ('1', 'true', 'yes')
+    
+    try:
+        async with acquire() as conn:
+            result = await import_products_async(conn, request.body, fmt, strict, IMPORT_MAX_ERRORS)
+            lsn = await record_write(conn) if result.inserted else None
+    except RequestEntityTooLarge:
+        return jsonify({"error": f"Upload larger than {IMPORT_MAX_BYTES} bytes"}), 413
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Erro na importação de produtos: {e}")
+        return jsonify({"error": str(e)}), 500
+    
+    if result.inserted:
+        try:
+            await bump_generations(created=True)
+            logger.info("✓ Cache de produtos invalidado")
+        except Exception as e:
+            logger.warning(f"Erro ao invalidar cache: {e}")
+    
+    logger.info(
+        f"✓ Importação concluída: {result.inserted} inseridos, "
+        f"{result.rejected} rejeitados em {result.duration:.2f}s"
+    )
+    status_code = 422 if strict and result.rejected else 200
+    return with_lsn_token(jsonify(result.to_dict()), lsn), status_code
+
+@app.route('/products/<int:product_id>', methods=['PUT'])
+async def update_product(product_id):
+    data = await request.get_json(silent=True) or {}
+    
+    updatable_fields = ['name', 'description', 'price', 'stock']
+    fields = [field for field in updatable_fields if field in data]
+    if not fields:
+        return jsonify({"error": f"Provide at least one of: {', '.join(updatable_fields)}"}), 400
+    
+    try:
+        values = validate_fields(data, fields)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    assignments = ', '.join(f'"{field}" = ${index}' for index, field in enumerate(fields, 1))
+    
+    try:
+        async with acquire() as conn:
+            row = await conn.fetchrow(f"""
+                UPDATE products
+                SET {assignments}
+                WHERE id = ${len(fields) + 1}::bigint
+                RETURNING {PRODUCT_COLUMNS}
+            """, *values, product_id)
+            lsn = await record_write(conn) if row is not None else None
+        
+        if row is None:
+            return jsonify({"error": "Product not found"}), 404
+        
+        product = row_to_product(row)
+        
+        try:
+            await bump_generations(changed=row[5], product_id=product_id)
+            logger.info(f"✓ Cache do produto {product_id} invalidado")
+        except Exception as e:
+            logger.warning(f"Erro ao invalidar cache: {e}")
+        
+        logger.info(f"✓ Produto {product_id} atualizado com sucesso")
+        return with_lsn_token(jsonify({
+            "message": "Product updated",
+            "product": product
+        }), lsn), 200
+    
+    except Exception as e:
+        logger.error(f"Erro ao atualizar produto: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/products/<int:product_id>', methods=['DELETE'])
+async def delete_product(product_id):
+    try:
+        async with acquire() as conn:
+            created_at = await conn.fetchval("""
+                DELETE FROM products
+                WHERE id = $1::bigint
+                RETURNING created_at
+            """, product_id)
+            lsn = await record_write(conn) if created_at is not None else None
+        
+        if created_at is None:
+            return jsonify({"error": "Product not found"}), 404
+        
+        try:
+            await bump_generations(changed=created_at, product_id=product_id)
+            logger.info(f"✓ Cache do produto {product_id} invalidado")
+        except Exception as e:
+            logger.warning(f"Erro ao invalidar cache: {e}")
+        
+        logger.info(f"✓ Produto {product_id} removido com sucesso")
+        return with_lsn_token(jsonify({
+            "message": "Product deleted",
+            "id": product_id
+        }), lsn), 200
+    
+    except Exception as e:
+        logger.error(f"Erro ao remover produto: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/admin/cache/warmup', methods=['POST'])
+async def warmup_endpoint():
+    if ADMIN_TOKEN and request.headers.get('X-Admin-Token') != ADMIN_TOKEN:
+        return jsonify({"error": "Forbidden"}), 403
+    
+    try:
+        await flush_product_hits()
+        summary = await warm_cache()
+    except Exception as e:
+        logger.error(f"Erro ao aquecer o cache: {e}")
+        return jsonify({"error": str(e)}), 500
+    
+    return jsonify({"message": "Cache warmed", **summary}), 200
+
+@app.route('/stats')
+async def get_stats():
+    stats = {
+        "timestamp": datetime.now().isoformat()
+    }
+    
+    try:
+        async with acquire() as conn:
+            total_products, total_stock, reconciled_at = await conn.fetchrow("""
+                SELECT total_products, total_stock, reconciled_at
+                FROM product_stats
+            """)
+        
+        stats["total_products"] = total_products
+        stats["total_stock"] = total_stock
+        stats["reconciled_at"] = reconciled_at.isoformat() if reconciled_at else None
+    except Exception as e:
+        stats["database_error"] = str(e)
+    
+    if db_pool is not None:
+        size = db_pool.get_size()
+        idle = db_pool.get_idle_size()
+        stats["db_pool"] = {
+            "min_size": db_pool.get_min_size(),
+            "max_size": db_pool.get_max_size(),
+            "size": size,
+            "in_use": size - idle,
+            "idle": idle
+        }
+    
+    if product_cache is not None:
+        stats["app_cache"] = product_cache.stats()
+    
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.info('memory')
+        pipe.info('stats')
+        pipe.dbsize()
+        memory_info, stats_info, keys = await pipe.execute()
+        stats["cache"] = {
+            "keys": keys,
+            "memory_used": memory_info.get('used_memory_human'),
+            "hits": stats_info.get('keyspace_hits', 0),
+            "misses": stats_info.get('keyspace_misses', 0)
+        }
+    except Exception as e:
+        stats["cache_error"] = str(e)
+    
+    return jsonify(stats), 200
+
+if __name__ == '__main__':
+    import uvicorn
+    
+    logger.info("Iniciando aplicação web (ASGI)...")
+    uvicorn.run(app, host='0.0.0.0', port=5000, loop='uvloop', http='httptools', access_log=False)
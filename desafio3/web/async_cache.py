@@ -0,0 +1,247 @@
+import asyncio
+import logging
+import time
+
+from cache import _MISSING, _TwoTierCacheBase
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTwoTierCache(_TwoTierCacheBase):
+    """Versão asyncio do TwoTierCache para uso com redis.asyncio.
+
+    Usa o mesmo formato de entrada no Redis, as mesmas chaves de lock e o
+    mesmo canal de invalidação, então pode rodar lado a lado com réplicas
+    síncronas. Loaders são funções assíncronas; cargas concorrentes da mesma
+    chave aguardam um único Future e revalidações rodam como tasks."""
+
+    def __init__(self, redis_client, **kwargs):
+        super().__init__(redis_client, **kwargs)
+        self._refreshing = {}
+
+    async def _get_remote(self, key, raw):
+        try:
+            data = await self.redis.get(key)
+        except Exception as e:
+            logger.warning(f"Erro ao acessar cache Redis: {e}")
+            return None
+        return self._cache_remote(key, data, raw)
+
+    async def get_entry(self, key, raw=False):
+        entry = self.local.get(key, _MISSING)
+        if entry is not _MISSING:
+            return entry
+        return await self._get_remote(key, raw)
+
+    async def get(self, key, raw=False):
+        entry = await self.get_entry(key, raw)
+        return entry.value if entry is not None else None
+
+    async def set(self, key, value, ttl, raw=False, delta=0.0, compress=True):
+        fresh_until = time.time() + ttl
+        try:
+            await self.redis.setex(key, self._remote_ttl(ttl), self._encode(value, fresh_until, delta, raw, compress))
+        except Exception as e:
+            logger.warning(f"Erro ao armazenar no cache: {e}")
+        self._store_local(key, value, ttl, fresh_until, delta)
+
+    async def get_many(self, keys, raw=False):
+        entries, remote_keys = self._split_local(keys)
+        if remote_keys:
+            try:
+                values = await self.redis.mget(remote_keys)
+            except Exception as e:
+                logger.warning(f"Erro ao acessar cache Redis: {e}")
+                values = []
+            self._merge_remote(entries, remote_keys, values, raw)
+        return entries
+
+    async def set_many(self, items, ttl, raw=False, compress=True):
+        fresh_until = time.time() + ttl
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.setex(key, self._remote_ttl(ttl), self._encode(value, fresh_until, 0.0, raw, compress))
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Erro ao armazenar no cache: {e}")
+        for key, value in items.items():
+            self._store_local(key, value, ttl, fresh_until)
+
+    async def get_counters(self, keys, fresh=False):
+        counters, remote_keys = self._split_counters(keys, fresh)
+        if remote_keys:
+            try:
+                values = await self.redis.mget(remote_keys)
+            except Exception as e:
+                logger.warning(f"Erro ao ler contadores no Redis: {e}")
+                values = None
+            self._merge_counters(counters, remote_keys, values)
+        return counters
+
+    async def incr_counters(self, keys):
+        keys = list(keys)
+        pipe = self.redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.incr(key)
+        pipe.publish(self.channel, self._invalidation_message(keys, []))
+        self._store_counters(keys, await pipe.execute())
+
+    async def _acquire_remote_lock(self, key):
+        lock_key, token, timeout_ms = self._new_lock(key)
+        try:
+            acquired = await self.redis.set(lock_key, token, nx=True, px=timeout_ms)
+        except Exception as e:
+            logger.warning(f"Erro ao adquirir lock no Redis: {e}")
+            return ""
+        return token if acquired else None
+
+    async def _lock_held(self, key):
+        try:
+            return bool(await self.redis.exists(f"lock:{key}"))
+        except Exception as e:
+            logger.warning(f"Erro ao consultar lock no Redis: {e}")
+            return True
+
+    async def _release_remote_lock(self, key, token):
+        if not token:
+            return
+        try:
+            await self._release_lock(keys=[f"lock:{key}"], args=[token])
+        except Exception as e:
+            logger.warning(f"Erro ao liberar lock no Redis: {e}")
+
+    async def _load_and_store(self, key, loader, ttl, raw, compress):
+        start = time.monotonic()
+        value = await loader()
+        delta = time.monotonic() - start
+        self._count("_loads")
+        if value is not None:
+            await self.set(key, value, ttl, raw=raw, delta=delta, compress=compress)
+        return value
+
+    async def get_or_load(self, key, loader, ttl, raw=False, validate=None, compress=True):
+        """Retorna (valor, origem). validate, se informado, é uma função
+        assíncrona que recebe o valor em cache."""
+        entry = await self.get_entry(key, raw)
+        if entry is not None and validate is not None and not await validate(entry.value):
+            entry = None
+        if entry is not None:
+            if self._needs_refresh(entry):
+                self._refresh_in_background(key, loader, ttl, raw, compress)
+            return entry.value, "cache"
+
+        return await self._load_coalesced(key, loader, ttl, raw, validate, compress)
+
+    def _refresh_in_background(self, key, loader, ttl, raw, compress):
+        if key in self._refreshing:
+            return
+        self._refreshing[key] = asyncio.create_task(self._refresh(key, loader, ttl, raw, compress))
+
+    async def _refresh(self, key, loader, ttl, raw, compress):
+        try:
+            token = await self._acquire_remote_lock(key)
+            if token is None:
+                return
+            try:
+                await self._load_and_store(key, loader, ttl, raw, compress)
+            finally:
+                await self._release_remote_lock(key, token)
+        except Exception as e:
+            logger.warning(f"Erro ao revalidar cache '{key}': {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def _load_coalesced(self, key, loader, ttl, raw, validate, compress):
+        flight = self._flights.get(key)
+        if flight is not None:
+            self._count("_coalesced")
+            try:
+                value, _ = await asyncio.wait_for(asyncio.shield(flight), self.lock_timeout)
+                return value, "cache"
+            except asyncio.TimeoutError:
+                return await self._load_and_store(key, loader, ttl, raw, compress), "database"
+
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        try:
+            result = await self._load_across_replicas(key, loader, ttl, raw, validate, compress)
+            flight.set_result(result)
+            return result
+        except BaseException as e:
+            flight.set_exception(e)
+            # Evita o aviso de exceção não consumida quando não há seguidores
+            flight.exception()
+            raise
+        finally:
+            self._flights.pop(key, None)
+
+    async def _load_across_replicas(self, key, loader, ttl, raw, validate, compress):
+        token = await self._acquire_remote_lock(key)
+        if token is not None:
+            try:
+                return await self._load_and_store(key, loader, ttl, raw, compress), "database"
+            finally:
+                await self._release_remote_lock(key, token)
+
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            entry = await self._get_remote(key, raw)
+            if entry is not None and (validate is None or await validate(entry.value)):
+                self._count("_coalesced")
+                return entry.value, "cache"
+            if not await self._lock_held(key):
+                # A carga da outra réplica terminou sem gravar um valor
+                # utilizável (loader retornou None): não há o que esperar
+                break
+        return await self._load_and_store(key, loader, ttl, raw, compress), "database"
+
+    async def invalidate(self, keys=(), prefixes=()):
+        keys = list(keys)
+        prefixes = list(prefixes)
+        pipe = self.redis.pipeline(transaction=False)
+        if keys:
+            pipe.delete(*keys)
+        for prefix in prefixes:
+            matched = [key async for key in self.redis.scan_iter(match=f"{prefix}*", count=500)]
+            if matched:
+                pipe.delete(*matched)
+        pipe.publish(self.channel, self._invalidation_message(keys, prefixes))
+        await pipe.execute()
+        # Só depois do DELETE: antes dele, uma leitura concorrente traria
+        # o valor antigo do Redis de volta ao nível local
+        self._drop_local(keys, prefixes)
+
+    def start_listener(self):
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        tasks = list(self._refreshing.values())
+        if self._listener is not None:
+            tasks.append(self._listener)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _listen(self):
+        backoff = 1
+        while True:
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(self.channel)
+                self.local.clear()
+                backoff = 1
+                logger.info(f"✓ Escutando invalidações de cache em '{self.channel}'")
+                async for message in pubsub.listen():
+                    self._handle_message(message.get("data"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Listener de invalidação desconectado: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+    def _listener_alive(self):
+        return self._listener is not None and not self._listener.done()
@@ -0,0 +1,349 @@
+import argparse
+import asyncio
+import csv
+import io
+import json
+import logging
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+
+logger = logging.getLogger(__name__)
+
+IMPORT_COLUMNS = ('name', 'description', 'price', 'stock')
+MAX_PRICE = Decimal('99999999.99')
+CHUNK_ROWS = 1000
+
+
+class ImportResult:
+    def __init__(self, max_errors=100):
+        self.max_errors = max_errors
+        self.accepted = 0
+        self.rejected = 0
+        self.inserted = 0
+        self.errors = []
+        self.duration = 0.0
+
+    def reject(self, line, message):
+        self.rejected += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "error": message})
+
+    def to_dict(self):
+        return {
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "inserted": self.inserted,
+            "errors": self.errors,
+            "errors_truncated": self.rejected > len(self.errors),
+            "duration_ms": round(self.duration * 1000, 1)
+        }
+
+
+def validate_name(name):
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError("name is required")
+    if len(name) > 200:
+        raise ValueError("name longer than 200 characters")
+    return name
+
+
+def validate_description(description):
+    description = description or ''
+    if not isinstance(description, str):
+        raise ValueError("description must be a string")
+    return description
+
+
+def validate_price(value):
+    if isinstance(value, bool) or value is None or value == '':
+        raise ValueError("price is required")
+    try:
+        price = Decimal(str(value)).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError(f"invalid price: {value!r}")
+    if not price.is_finite() or price < 0 or price > MAX_PRICE:
+        raise ValueError(f"price out of range: {price}")
+    return price
+
+
+def validate_stock(value):
+    if isinstance(value, bool) or value is None or value == '':
+        raise ValueError("stock is required")
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"invalid stock: {value!r}")
+    try:
+        stock = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid stock: {value!r}")
+    if stock < 0 or stock > 2147483647:
+        raise ValueError(f"stock out of range: {stock}")
+    return stock
+
+
+FIELD_VALIDATORS = {
+    'name': validate_name,
+    'description': validate_description,
+    'price': validate_price,
+    'stock': validate_stock
+}
+
+
+def validate_fields(data, fields):
+    """Valida e normaliza os campos informados de um produto; ValueError
+    com a mensagem do primeiro campo inválido."""
+    if not isinstance(data, dict):
+        raise ValueError("body must be a JSON object")
+    return [FIELD_VALIDATORS[field](data.get(field)) for field in fields]
+
+
+def validate_record(record):
+    if not isinstance(record, dict):
+        raise ValueError("row must be an object")
+    return tuple(validate_fields(record, IMPORT_COLUMNS))
+
+
+def read_csv_records(stream):
+    reader = csv.DictReader(stream)
+    missing = [column for column in ('name', 'price', 'stock') if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"CSV header is missing columns: {', '.join(missing)}")
+    for record in reader:
+        yield reader.line_num, record
+
+
+def read_ndjson_records(stream):
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, e
+
+
+def copy_chunks(records, result):
+    """Valida os registros um a um e os converte em blocos CSV para o COPY,
+    sem nunca materializar o arquivo inteiro em memória."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL, lineterminator='\n')
+    pending = 0
+
+    for line_number, record in records:
+        if isinstance(record, Exception):
+            result.reject(line_number, f"invalid JSON: {record}")
+            continue
+        try:
+            writer.writerow(validate_record(record))
+        except ValueError as e:
+            result.reject(line_number, str(e))
+            continue
+
+        result.accepted += 1
+        pending += 1
+        if pending >= CHUNK_ROWS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if pending:
+        yield buffer.getvalue()
+
+
+class ChunkReader:
+    """Objeto tipo arquivo que alimenta copy_expert a partir de um gerador."""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._chunks)
+            except StopIteration:
+                break
+        if size < 0:
+            data, self._buffer = self._buffer, ''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def import_products(conn, stream, fmt='csv', strict=False, max_errors=100):
+    """Carrega produtos de um stream CSV ou NDJSON via COPY em uma tabela de
+    staging e insere tudo em products em uma única instrução.
+    Com strict=True nada é inserido se alguma linha for rejeitada."""
+    if fmt not in ('csv', 'ndjson'):
+        raise ValueError(f"Unsupported format: {fmt}")
+
+    result = ImportResult(max_errors)
+    start = time.monotonic()
+    records = read_csv_records(stream) if fmt == 'csv' else read_ndjson_records(stream)
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            CREATE TEMP TABLE products_import (
+                name VARCHAR(200) NOT NULL,
+                description TEXT,
+                price DECIMAL(10, 2) NOT NULL,
+                stock INTEGER NOT NULL
+            ) ON COMMIT DROP
+        """)
+        cursor.copy_expert(
+            f"COPY products_import ({', '.join(IMPORT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            ChunkReader(copy_chunks(records, result))
+        )
+
+        if strict and result.rejected:
+            conn.rollback()
+        else:
+            cursor.execute(f"""
+                INSERT INTO products ({', '.join(IMPORT_COLUMNS)})
+                SELECT {', '.join(IMPORT_COLUMNS)}
+                FROM products_import
+            """)
+            result.inserted = cursor.rowcount
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    result.duration = time.monotonic() - start
+    return result
+
+
+async def _next_chunk(chunks):
+    try:
+        return await chunks.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+class AsyncBodyReader(io.RawIOBase):
+    """Arquivo binário lido de uma thread de trabalho que consome, no event
+    loop, um iterador assíncrono de bytes (o corpo da requisição)."""
+
+    def __init__(self, chunks, loop):
+        self._chunks = chunks.__aiter__()
+        self._loop = loop
+        self._buffer = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while not self._buffer:
+            chunk = asyncio.run_coroutine_threadsafe(_next_chunk(self._chunks), self._loop).result()
+            if chunk is None:
+                return 0
+            self._buffer = bytes(chunk)
+        size = min(len(target), len(self._buffer))
+        target[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+async def _offload_chunks(chunks):
+    """Avança o gerador de blocos em uma thread: leitura do corpo, parsing e
+    validação não bloqueiam o event loop."""
+    loop = asyncio.get_running_loop()
+    while True:
+        chunk = await loop.run_in_executor(None, next, chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+async def import_products_async(conn, body, fmt='csv', strict=False, max_errors=100):
+    """Equivalente a import_products para uma conexão asyncpg. body é um
+    iterador assíncrono de bytes, consumido à medida que o COPY avança."""
+    if fmt not in ('csv', 'ndjson'):
+        raise ValueError(f"Unsupported format: {fmt}")
+
+    result = ImportResult(max_errors)
+    start = time.monotonic()
+    raw = AsyncBodyReader(body, asyncio.get_running_loop())
+    stream = io.TextIOWrapper(io.BufferedReader(raw), encoding='utf-8', newline='')
+    records = read_csv_records(stream) if fmt == 'csv' else read_ndjson_records(stream)
+    chunks = (chunk.encode('utf-8') for chunk in copy_chunks(records, result))
+
+    transaction = conn.transaction()
+    await transaction.start()
+    try:
+        await conn.execute("""
+            CREATE TEMP TABLE products_import (
+                name VARCHAR(200) NOT NULL,
+                description TEXT,
+                price DECIMAL(10, 2) NOT NULL,
+                stock INTEGER NOT NULL
+            ) ON COMMIT DROP
+        """)
+        await conn.copy_to_table(
+            'products_import',
+            source=_offload_chunks(chunks),
+            columns=IMPORT_COLUMNS,
+            format='csv'
+        )
+
+        if strict and result.rejected:
+            await transaction.rollback()
+        else:
+            status = await conn.execute(f"""
+                INSERT INTO products ({', '.join(IMPORT_COLUMNS)})
+                SELECT {', '.join(IMPORT_COLUMNS)}
+                FROM products_import
+            """)
+            result.inserted = int(status.split()[-1])
+            await transaction.commit()
+    except BaseException:
+        await transaction.rollback()
+        raise
+
+    result.duration = time.monotonic() - start
+    return result
+
+
+def detect_format(filename, content_type=None):
+    if content_type:
+        if 'ndjson' in content_type or 'jsonl' in content_type or 'json' in content_type:
+            return 'ndjson'
+        if 'csv' in content_type:
+            return 'csv'
+    if filename and filename.endswith(('.ndjson', '.jsonl', '.json')):
+        return 'ndjson'
+    return 'csv'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importação em massa de produtos via COPY")
+    parser.add_argument('file', help="Arquivo CSV ou NDJSON ('-' para stdin)")
+    parser.add_argument('--format', choices=['csv', 'ndjson'], help="Formato (detectado pela extensão se omitido)")
+    parser.add_argument('--strict', action='store_true', help="Não insere nada se alguma linha for inválida")
+    parser.add_argument('--max-errors', type=int, default=100, help="Máximo de erros reportados")
+    args = parser.parse_args()
+
+    import app
+
+    fmt = args.format or detect_format(args.file)
+    stream = sys.stdin if args.file == '-' else open(args.file, encoding='utf-8', newline='')
+    try:
+        with app.get_db_pool().connection() as conn:
+            result = import_products(conn, stream, fmt, args.strict, args.max_errors)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+    if result.inserted:
+        app.bump_generations(created=True)
+
+    print(json.dumps(result.to_dict(), indent=2, ensure_ascii=False))
+    return 0 if result.rejected == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
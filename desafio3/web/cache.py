@@ -0,0 +1,572 @@
+import json
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LocalCache:
+    """Cache LRU em memória do processo, limitado por número de entradas
+    e com TTL por entrada."""
+
+    def __init__(self, max_entries=1024, ttl=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._data[key]
+                self._misses += 1
+                return default
+            self._data.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def delete_prefix(self, *prefixes):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefixes)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions
+            }
+
+
+class CacheEntry:
+    __slots__ = ("value", "fresh_until", "delta")
+
+    def __init__(self, value, fresh_until, delta):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.delta = delta
+
+
+class HitCounter:
+    """Conta acessos por chave em memória. drain() devolve as contagens
+    acumuladas e zera o contador, para envio periódico em lote."""
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key, count=1):
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + count
+
+    def drain(self):
+        with self._lock:
+            counts, self._counts = self._counts, {}
+        return counts
+
+
+class _Flight:
+    __slots__ = ("event", "value", "source", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.source = None
+        self.error = None
+
+
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class _TwoTierCacheBase:
+    """Estado e lógica sem E/S compartilhados por TwoTierCache e pela versão
+    asyncio (async_cache.AsyncTwoTierCache): formato das entradas no Redis,
+    decisão de renovação, separação entre nível local e Redis e mensagens
+    de invalidação. As subclasses implementam apenas o acesso ao Redis."""
+
+    def __init__(self, redis_client, local=None, channel="cache:invalidate",
+                 serializer=json.dumps, deserializer=json.loads,
+                 stale_ttl=60, lock_timeout=10.0, poll_interval=0.05,
+                 early_refresh_beta=1.0, compress_min_bytes=0):
+        self.redis = redis_client
+        self.local = local if local is not None else LocalCache()
+        self.channel = channel
+        self.serializer = serializer
+        self.deserializer = deserializer
+        self.stale_ttl = stale_ttl
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.early_refresh_beta = early_refresh_beta
+        self.compress_min_bytes = compress_min_bytes
+        self.instance_id = uuid.uuid4().hex
+
+        self._listener = None
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._release_lock = self.redis.register_script(_RELEASE_LOCK_SCRIPT)
+
+        self._coalesced = 0
+        self._stale_served = 0
+        self._early_refreshes = 0
+        self._loads = 0
+
+    def _encode(self, value, fresh_until, delta, raw, compress=True):
+        payload = value if raw else self.serializer(value)
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        flags = ""
+        if compress and self.compress_min_bytes and len(payload) >= self.compress_min_bytes:
+            payload = zlib.compress(payload, 1)
+            flags = "z"
+        return f"{fresh_until:.3f}:{delta:.4f}:{flags}:".encode("ascii") + payload
+
+    def _decode(self, data, raw):
+        try:
+            fresh_until, delta, flags, payload = data.split(b":", 3)
+            if flags == b"z":
+                payload = zlib.decompress(payload)
+            value = payload if raw else self.deserializer(payload)
+            return CacheEntry(value, float(fresh_until), float(delta))
+        except (ValueError, TypeError, zlib.error):
+            return None
+
+    def _remote_ttl(self, ttl):
+        return ttl + self.stale_ttl
+
+    def _cache_remote(self, key, data, raw):
+        """Decodifica um valor lido do Redis e o guarda no nível local."""
+        if data is None:
+            return None
+        entry = self._decode(data, raw)
+        if entry is not None:
+            self.local.set(key, entry)
+        return entry
+
+    def _store_local(self, key, value, ttl, fresh_until, delta=0.0):
+        entry = CacheEntry(value, fresh_until, delta)
+        self.local.set(key, entry, self._remote_ttl(ttl))
+        return entry
+
+    def _split_local(self, keys):
+        """Separa as chaves já presentes no nível local das que precisam
+        ser buscadas no Redis."""
+        entries = {}
+        remote_keys = []
+        for key in keys:
+            entry = self.local.get(key, _MISSING)
+            if entry is _MISSING:
+                remote_keys.append(key)
+            else:
+                entries[key] = entry
+        return entries, remote_keys
+
+    def _merge_remote(self, entries, remote_keys, values, raw):
+        for key, data in zip(remote_keys, values):
+            entry = self._cache_remote(key, data, raw)
+            if entry is not None:
+                entries[key] = entry
+        return entries
+
+    def _split_counters(self, keys, fresh):
+        counters = {}
+        remote_keys = []
+        for key in keys:
+            value = _MISSING if fresh else self.local.get(key, _MISSING)
+            if value is _MISSING:
+                remote_keys.append(key)
+            else:
+                counters[key] = value
+        return counters, remote_keys
+
+    def _merge_counters(self, counters, remote_keys, values):
+        """values é None quando o Redis falhou: os contadores ficam em -1,
+        valor que nenhuma entrada em cache registra como dependência."""
+        for index, key in enumerate(remote_keys):
+            if values is None:
+                counters[key] = -1
+                continue
+            counters[key] = int(values[index] or 0)
+            self.local.set(key, counters[key])
+        return counters
+
+    def _store_counters(self, keys, results):
+        """Guarda localmente os valores devolvidos pelo INCR, já depois da
+        escrita no Redis: uma leitura concorrente não fixa a geração antiga."""
+        for key, value in zip(keys, results):
+            self.local.set(key, int(value))
+
+    def _should_refresh(self, entry, now):
+        if now >= entry.fresh_until:
+            return True
+        if entry.delta <= 0:
+            return False
+        # XFetch: quanto mais cara a recarga, mais cedo ela tende a acontecer
+        jitter = -entry.delta * self.early_refresh_beta * math.log(1.0 - random.random())
+        return now + jitter >= entry.fresh_until
+
+    def _needs_refresh(self, entry):
+        """Decide se uma entrada servida do cache deve ser revalidada em
+        segundo plano, contabilizando entregas expiradas e renovações antecipadas."""
+        now = time.time()
+        if not self._should_refresh(entry, now):
+            return False
+        with self._lock:
+            if now >= entry.fresh_until:
+                self._stale_served += 1
+            else:
+                self._early_refreshes += 1
+        return True
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _new_lock(self, key):
+        return f"lock:{key}", uuid.uuid4().hex, int(self.lock_timeout * 1000)
+
+    def _invalidation_message(self, keys, prefixes):
+        return json.dumps({
+            "origin": self.instance_id,
+            "keys": keys,
+            "prefixes": prefixes
+        })
+
+    def _drop_local(self, keys, prefixes):
+        if keys:
+            self.local.delete(*keys)
+        if prefixes:
+            self.local.delete_prefix(*prefixes)
+
+    def _handle_message(self, data):
+        try:
+            message = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        # Mensagens da própria instância também são aplicadas: descartam o
+        # que uma leitura concorrente tenha trazido do Redis durante a escrita
+        self._drop_local(message.get("keys") or [], message.get("prefixes") or [])
+
+    def _listener_alive(self):
+        return self._listener is not None and self._listener.is_alive()
+
+    def _refreshing_count(self):
+        return len(self._refreshing)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "local": self.local.stats(),
+                "listener_alive": self._listener_alive(),
+                "loads": self._loads,
+                "coalesced": self._coalesced,
+                "stale_served": self._stale_served,
+                "early_refreshes": self._early_refreshes,
+                "refreshing": self._refreshing_count()
+            }
+
+
+class TwoTierCache(_TwoTierCacheBase):
+    """Cache em dois níveis: LocalCache na frente do Redis, mantido coerente
+    entre réplicas por mensagens de invalidação via pub/sub.
+
+    get_or_load() protege contra stampede: uma única carga por chave
+    (no processo e entre réplicas via lock no Redis), valor anterior servido
+    enquanto é revalidado em segundo plano e renovação antecipada
+    probabilística (XFetch) antes da expiração."""
+
+    def __init__(self, redis_client, local=None, channel="cache:invalidate",
+                 serializer=json.dumps, deserializer=json.loads,
+                 stale_ttl=60, lock_timeout=10.0, poll_interval=0.05,
+                 early_refresh_beta=1.0, refresh_workers=4, compress_min_bytes=0):
+        super().__init__(
+            redis_client, local, channel, serializer, deserializer, stale_ttl,
+            lock_timeout, poll_interval, early_refresh_beta, compress_min_bytes
+        )
+        self._refreshing = set()
+        self._executor = ThreadPoolExecutor(
+            max_workers=refresh_workers,
+            thread_name_prefix="cache-refresh"
+        )
+
+    def _get_remote(self, key, raw):
+        try:
+            data = self.redis.get(key)
+        except Exception as e:
+            logger.warning(f"Erro ao acessar cache Redis: {e}")
+            return None
+        return self._cache_remote(key, data, raw)
+
+    def get_entry(self, key, raw=False):
+        entry = self.local.get(key, _MISSING)
+        if entry is not _MISSING:
+            return entry
+        return self._get_remote(key, raw)
+
+    def get(self, key, raw=False):
+        entry = self.get_entry(key, raw)
+        return entry.value if entry is not None else None
+
+    def set(self, key, value, ttl, raw=False, delta=0.0, compress=True):
+        fresh_until = time.time() + ttl
+        try:
+            self.redis.setex(key, self._remote_ttl(ttl), self._encode(value, fresh_until, delta, raw, compress))
+        except Exception as e:
+            logger.warning(f"Erro ao armazenar no cache: {e}")
+        self._store_local(key, value, ttl, fresh_until, delta)
+
+    def get_many(self, keys, raw=False):
+        entries, remote_keys = self._split_local(keys)
+        if remote_keys:
+            try:
+                values = self.redis.mget(remote_keys)
+            except Exception as e:
+                logger.warning(f"Erro ao acessar cache Redis: {e}")
+                values = []
+            self._merge_remote(entries, remote_keys, values, raw)
+        return entries
+
+    def set_many(self, items, ttl, raw=False, compress=True):
+        fresh_until = time.time() + ttl
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.setex(key, self._remote_ttl(ttl), self._encode(value, fresh_until, 0.0, raw, compress))
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Erro ao armazenar no cache: {e}")
+        for key, value in items.items():
+            self._store_local(key, value, ttl, fresh_until)
+
+    def get_counters(self, keys, fresh=False):
+        """Lê contadores de geração (0 quando inexistentes). Com fresh=True
+        ignora a cópia local e consulta o Redis diretamente."""
+        counters, remote_keys = self._split_counters(keys, fresh)
+        if remote_keys:
+            try:
+                values = self.redis.mget(remote_keys)
+            except Exception as e:
+                logger.warning(f"Erro ao ler contadores no Redis: {e}")
+                values = None
+            self._merge_counters(counters, remote_keys, values)
+        return counters
+
+    def incr_counters(self, keys):
+        keys = list(keys)
+        pipe = self.redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.incr(key)
+        pipe.publish(self.channel, self._invalidation_message(keys, []))
+        self._store_counters(keys, pipe.execute())
+
+    def _acquire_remote_lock(self, key):
+        lock_key, token, timeout_ms = self._new_lock(key)
+        try:
+            acquired = self.redis.set(lock_key, token, nx=True, px=timeout_ms)
+        except Exception as e:
+            logger.warning(f"Erro ao adquirir lock no Redis: {e}")
+            return ""
+        return token if acquired else None
+
+    def _lock_held(self, key):
+        try:
+            return bool(self.redis.exists(f"lock:{key}"))
+        except Exception as e:
+            logger.warning(f"Erro ao consultar lock no Redis: {e}")
+            return True
+
+    def _release_remote_lock(self, key, token):
+        if not token:
+            return
+        try:
+            self._release_lock(keys=[f"lock:{key}"], args=[token])
+        except Exception as e:
+            logger.warning(f"Erro ao liberar lock no Redis: {e}")
+
+    def _load_and_store(self, key, loader, ttl, raw, compress):
+        start = time.monotonic()
+        value = loader()
+        delta = time.monotonic() - start
+        self._count("_loads")
+        if value is not None:
+            self.set(key, value, ttl, raw=raw, delta=delta, compress=compress)
+        return value
+
+    def get_or_load(self, key, loader, ttl, raw=False, validate=None, compress=True):
+        """Retorna (valor, origem), onde origem é "cache" ou "database"; entre
+        chamadas agrupadas na mesma carga, só quem executou o loader recebe
+        "database". Se o loader retornar None nada é armazenado.
+        validate(valor) permite descartar entradas cujas dependências mudaram
+        desde a carga. compress=False grava sem zlib valores que já chegam
+        comprimidos."""
+        entry = self.get_entry(key, raw)
+        if entry is not None and validate is not None and not validate(entry.value):
+            entry = None
+        if entry is not None:
+            if self._needs_refresh(entry):
+                self._refresh_in_background(key, loader, ttl, raw, compress)
+            return entry.value, "cache"
+
+        return self._load_coalesced(key, loader, ttl, raw, validate, compress)
+
+    def _refresh_in_background(self, key, loader, ttl, raw, compress):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        token = self._acquire_remote_lock(key)
+        if token is None:
+            with self._lock:
+                self._refreshing.discard(key)
+            return
+
+        def refresh():
+            try:
+                self._load_and_store(key, loader, ttl, raw, compress)
+            except Exception as e:
+                logger.warning(f"Erro ao revalidar cache '{key}': {e}")
+            finally:
+                self._release_remote_lock(key, token)
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._executor.submit(refresh)
+
+    def _load_coalesced(self, key, loader, ttl, raw, validate, compress):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            if flight.event.wait(self.lock_timeout):
+                if flight.error is not None:
+                    raise flight.error
+                return flight.value, "cache"
+            return self._load_and_store(key, loader, ttl, raw, compress), "database"
+
+        try:
+            flight.value, flight.source = self._load_across_replicas(key, loader, ttl, raw, validate, compress)
+            return flight.value, flight.source
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    def _load_across_replicas(self, key, loader, ttl, raw, validate, compress):
+        token = self._acquire_remote_lock(key)
+        if token is not None:
+            try:
+                return self._load_and_store(key, loader, ttl, raw, compress), "database"
+            finally:
+                self._release_remote_lock(key, token)
+
+        # Outra réplica está carregando: aguarda o resultado dela
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            entry = self._get_remote(key, raw)
+            if entry is not None and (validate is None or validate(entry.value)):
+                self._count("_coalesced")
+                return entry.value, "cache"
+            if not self._lock_held(key):
+                # A carga da outra réplica terminou sem gravar um valor
+                # utilizável (loader retornou None): não há o que esperar
+                break
+        return self._load_and_store(key, loader, ttl, raw, compress), "database"
+
+    def invalidate(self, keys=(), prefixes=()):
+        keys = list(keys)
+        prefixes = list(prefixes)
+        pipe = self.redis.pipeline(transaction=False)
+        if keys:
+            pipe.delete(*keys)
+        for prefix in prefixes:
+            matched = list(self.redis.scan_iter(match=f"{prefix}*", count=500))
+            if matched:
+                pipe.delete(*matched)
+        pipe.publish(self.channel, self._invalidation_message(keys, prefixes))
+        pipe.execute()
+        # Só depois do DELETE: antes dele, uma leitura concorrente traria
+        # o valor antigo do Redis de volta ao nível local
+        self._drop_local(keys, prefixes)
+
+    def start_listener(self):
+        with self._lock:
+            if self._listener is not None:
+                return
+            self._listener = threading.Thread(
+                target=self._listen,
+                name="cache-invalidation-listener",
+                daemon=True
+            )
+            self._listener.start()
+
+    def _listen(self):
+        backoff = 1
+        while True:
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # Mensagens perdidas enquanto desconectado não podem ser recuperadas
+                self.local.clear()
+                backoff = 1
+                logger.info(f"✓ Escutando invalidações de cache em '{self.channel}'")
+                for message in pubsub.listen():
+                    self._handle_message(message.get("data"))
+            except Exception as e:
+                logger.warning(f"Listener de invalidação desconectado: {e}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
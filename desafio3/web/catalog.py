@@ -0,0 +1,311 @@
+"""Configuração e funções puras compartilhadas por app.py (Flask) e
+app_async.py (Quart): serialização, ETags, variantes comprimidas, chaves e
+contadores de geração do cache e normalização da busca. Nada aqui abre
+conexões ou depende do framework."""
+import os
+import json
+import base64
+import gzip
+import hashlib
+import re
+import unicodedata
+from datetime import datetime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from db_router import format_lsn
+
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'db'),
+    'database': os.getenv('DB_NAME', 'productsdb'),
+    'user': os.getenv('DB_USER', 'postgres'),
+    'password': os.getenv('DB_PASSWORD', 'postgres'),
+    'port': os.getenv('DB_PORT', '5432')
+}
+
+REDIS_HOST = os.getenv('REDIS_HOST', 'cache')
+REDIS_PORT = int(os.getenv('REDIS_PORT', '6379'))
+CACHE_EXPIRATION = 300
+LOCAL_CACHE_MAX_ENTRIES = int(os.getenv('LOCAL_CACHE_MAX_ENTRIES', '1024'))
+LOCAL_CACHE_TTL = float(os.getenv('LOCAL_CACHE_TTL', '30'))
+CACHE_INVALIDATION_CHANNEL = os.getenv('CACHE_INVALIDATION_CHANNEL', 'products:invalidate')
+CACHE_STALE_TTL = int(os.getenv('CACHE_STALE_TTL', '60'))
+CACHE_LOCK_TIMEOUT = float(os.getenv('CACHE_LOCK_TIMEOUT', '10'))
+CACHE_EARLY_REFRESH_BETA = float(os.getenv('CACHE_EARLY_REFRESH_BETA', '1.0'))
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv('CACHE_COMPRESS_MIN_BYTES', '4096'))
+PRODUCTS_CACHE_CONTROL = os.getenv('PRODUCTS_CACHE_CONTROL', 'public, no-cache')
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv('RESPONSE_COMPRESS_MIN_BYTES', '1024'))
+RESPONSE_GZIP_LEVEL = int(os.getenv('RESPONSE_GZIP_LEVEL', '6'))
+RESPONSE_BROTLI_QUALITY = int(os.getenv('RESPONSE_BROTLI_QUALITY', '6'))
+
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '2'))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '5'))
+DB_POOL_VALIDATE_AFTER = float(os.getenv('DB_POOL_VALIDATE_AFTER', '30'))
+DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', '5'))
+DB_REPLICA_DSNS = [dsn.strip() for dsn in os.getenv('DB_REPLICA_DSNS', '').split(',') if dsn.strip()]
+DB_REPLICA_TIMEOUT = float(os.getenv('DB_REPLICA_TIMEOUT', '1'))
+DB_REPLICA_RETRY_AFTER = float(os.getenv('DB_REPLICA_RETRY_AFTER', '30'))
+LSN_TOKEN_MAX_AGE = int(os.getenv('LSN_TOKEN_MAX_AGE', '300'))
+
+PRODUCTS_PAGE_DEFAULT = int(os.getenv('PRODUCTS_PAGE_DEFAULT', '20'))
+PRODUCTS_PAGE_MAX = int(os.getenv('PRODUCTS_PAGE_MAX', '100'))
+PRODUCTS_STREAM_ITERSIZE = int(os.getenv('PRODUCTS_STREAM_ITERSIZE', '500'))
+PRODUCTS_ALL_CACHE_MAX_BYTES = int(os.getenv('PRODUCTS_ALL_CACHE_MAX_BYTES', str(1024 * 1024)))
+PRODUCTS_BATCH_MAX_IDS = int(os.getenv('PRODUCTS_BATCH_MAX_IDS', '100'))
+PRODUCTS_GEN_BUCKET_SECONDS = int(os.getenv('PRODUCTS_GEN_BUCKET_SECONDS', '3600'))
+PRODUCTS_GEN_MAX_BUCKETS = int(os.getenv('PRODUCTS_GEN_MAX_BUCKETS', '48'))
+IMPORT_MAX_ERRORS = int(os.getenv('IMPORT_MAX_ERRORS', '100'))
+SEARCH_PAGE_DEFAULT = int(os.getenv('SEARCH_PAGE_DEFAULT', '20'))
+SEARCH_QUERY_MAX_LENGTH = int(os.getenv('SEARCH_QUERY_MAX_LENGTH', '100'))
+
+STATS_RECONCILE_INTERVAL = int(os.getenv('STATS_RECONCILE_INTERVAL', '600'))
+
+HEALTH_PROBE_INTERVAL = float(os.getenv('HEALTH_PROBE_INTERVAL', '5'))
+HEALTH_PROBE_TIMEOUT = float(os.getenv('HEALTH_PROBE_TIMEOUT', '2'))
+SCHEMA_RETRY_MAX = float(os.getenv('SCHEMA_RETRY_MAX', '60'))
+
+WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+WARMUP_HOT_PRODUCTS = int(os.getenv('WARMUP_HOT_PRODUCTS', '500'))
+WARMUP_PAGES = int(os.getenv('WARMUP_PAGES', '5'))
+WARMUP_BATCH_SIZE = int(os.getenv('WARMUP_BATCH_SIZE', '200'))
+WARMUP_RETRY_MAX = float(os.getenv('WARMUP_RETRY_MAX', '60'))
+HOT_PRODUCTS_FLUSH_INTERVAL = float(os.getenv('HOT_PRODUCTS_FLUSH_INTERVAL', '10'))
+HOT_PRODUCTS_MAX_TRACKED = int(os.getenv('HOT_PRODUCTS_MAX_TRACKED', '10000'))
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+
+SEARCH_DOCUMENT = "to_tsvector('simple', name || ' ' || coalesce(description, ''))"
+
+GEN_ALL_KEY = "products:gen:all"
+GEN_HEAD_KEY = "products:gen:head"
+HOT_PRODUCTS_KEY = "products:hot"
+WRITE_LSN_KEY = "db:write_lsn"
+LSN_TOKEN_HEADER = "X-DB-LSN"
+LSN_TOKEN_COOKIE = "db_lsn"
+EPOCH = datetime(1970, 1, 1)
+
+PRODUCT_COLUMNS = "id, name, description, price, stock, created_at, updated_at"
+CONTENT_ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+ALL_PRODUCTS_QUERY = f"""
+    SELECT {PRODUCT_COLUMNS}
+    FROM products
+    ORDER BY created_at DESC, id DESC
+"""
+
+def dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+def row_to_product(row):
+    return {
+        "id": row[0],
+        "name": row[1],
+        "description": row[2],
+        "price": float(row[3]),
+        "stock": row[4],
+        "created_at": row[5].isoformat(),
+        "updated_at": row[6].isoformat()
+    }
+
+def encode_cursor(product):
+    raw = f"{product['created_at']}|{product['id']}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(token):
+    try:
+        created_at, product_id = base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8').split('|')
+        return datetime.fromisoformat(created_at), int(product_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {token}")
+
+def compress_body(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY)
+    return gzip.compress(body, RESPONSE_GZIP_LEVEL, mtime=0)
+
+def pack_variants(fragment):
+    """Acrescenta ao fragmento as versões comprimidas do corpo servido em
+    um hit de cache, geradas uma única vez ao preencher a entrada:
+    b'br=<n>,gzip=<n>\\n' + variantes + fragmento. Fragmentos pequenos
+    ficam como estão."""
+    if len(fragment) < RESPONSE_COMPRESS_MIN_BYTES:
+        return fragment
+    body = b'{"source":"cache",' + fragment[1:]
+    variants = [(encoding, compress_body(body, encoding)) for encoding in CONTENT_ENCODINGS]
+    header = ','.join(f"{encoding}={len(data)}" for encoding, data in variants)
+    return header.encode('ascii') + b'\n' + b''.join(data for _, data in variants) + fragment
+
+def unpack_variants(value):
+    if value[:1] == b'{':
+        return value, {}
+    header, rest = value.split(b'\n', 1)
+    variants = {}
+    offset = 0
+    for item in header.decode('ascii').split(','):
+        encoding, size = item.split('=')
+        variants[encoding] = rest[offset:offset + int(size)]
+        offset += int(size)
+    return rest[offset:], variants
+
+def with_etag(response, etag):
+    if etag is not None:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = PRODUCTS_CACHE_CONTROL
+        response.vary.add('Accept-Encoding')
+    return response
+
+def catalog_etag(generation, *parts):
+    """ETag de uma listagem ou produto: muda a cada escrita no catálogo, pois
+    products:gen:all é incrementado em toda escrita. Sem o contador
+    (Redis indisponível), None."""
+    if generation < 0:
+        return None
+    digest = hashlib.sha1(':'.join(map(str, parts)).encode('utf-8')).hexdigest()[:16]
+    return f"g{generation}-{digest}"
+
+def content_etag(fragment):
+    return hashlib.sha1(fragment).hexdigest()[:20]
+
+RECORD_WRITE_LSN_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tonumber(ARGV[1]) > current then
+    redis.call('SET', KEYS[1], ARGV[1])
+end
+return 1
+"""
+
+def with_lsn_token(response, lsn):
+    if lsn is not None:
+        token = format_lsn(lsn)
+        response.headers[LSN_TOKEN_HEADER] = token
+        response.set_cookie(LSN_TOKEN_COOKIE, token, max_age=LSN_TOKEN_MAX_AGE, httponly=True, samesite='Lax')
+    return response
+
+def gen_bucket(created_at):
+    return int((created_at - EPOCH).total_seconds()) // PRODUCTS_GEN_BUCKET_SECONDS
+
+def gen_bucket_key(bucket):
+    return f"products:gen:b{bucket}"
+
+def product_gen_key(product_id):
+    return f"products:gen:id:{product_id}"
+
+def product_key(product_id, generation):
+    """Chave do produto em cache, versionada pela geração do próprio id:
+    uma leitura anterior a uma escrita grava na versão antiga, que nenhuma
+    leitura posterior consulta."""
+    return f"product:{product_id}:g{generation}"
+
+def product_cache_keys(product_ids, generations):
+    """{chave: id} dos produtos com geração conhecida (sem Redis, -1)."""
+    keys = {}
+    for product_id in product_ids:
+        generation = generations[product_gen_key(product_id)]
+        if generation >= 0:
+            keys[product_key(product_id, generation)] = product_id
+    return keys
+
+def generation_keys(created=False, changed=None, product_id=None):
+    keys = [GEN_ALL_KEY]
+    if created:
+        keys.append(GEN_HEAD_KEY)
+    if changed is not None:
+        keys.append(gen_bucket_key(gen_bucket(changed)))
+    if product_id is not None:
+        keys.append(product_gen_key(product_id))
+    return keys
+
+def split_versions(value):
+    header, fragment = value.split(b'\n', 1)
+    return json.loads(header), fragment
+
+def page_gen_keys(rows, position):
+    """Contadores de geração dos quais uma página depende: as faixas de
+    created_at cobertas por ela e, na primeira página, o contador de inserções."""
+    keys = [] if position else [GEN_HEAD_KEY]
+    newest = position[0] if position else (rows[0][5] if rows else None)
+    if newest is None:
+        return keys
+    oldest = rows[-1][5] if rows else newest
+    first, last = gen_bucket(oldest), gen_bucket(newest)
+    if last - first >= PRODUCTS_GEN_MAX_BUCKETS:
+        return keys + [GEN_ALL_KEY]
+    return keys + [gen_bucket_key(bucket) for bucket in range(first, last + 1)]
+
+def plan_first_pages(rows, limit, pages):
+    """Divide as linhas mais recentes nas primeiras páginas da listagem,
+    com as mesmas chaves e dependências que get_products_page usaria."""
+    planned = []
+    position = None
+    after = None
+    for _ in range(pages):
+        page_rows = rows[:limit]
+        if not page_rows:
+            break
+        products = [row_to_product(row) for row in page_rows]
+        has_more = len(rows) > limit
+        planned.append({
+            "key": f"products:page:{limit}:{after or 'first'}",
+            "products": products,
+            "dependencies": page_gen_keys(page_rows, position),
+            "next_after": encode_cursor(products[-1]) if has_more else None
+        })
+        if not has_more:
+            break
+        position = (page_rows[-1][5], page_rows[-1][0])
+        after = encode_cursor(products[-1])
+        rows = rows[limit:]
+    return planned
+
+def page_value(versions, limit, products, next_after):
+    return dumps(versions) + b'\n' + pack_variants(dumps({
+        "limit": limit,
+        "products": products,
+        "next_after": next_after
+    }))
+
+def warmup_values(rows, pages, versions):
+    """Monta as entradas de cache do aquecimento a partir das linhas de
+    WARMUP_QUERY. versions é None se houve escrita durante a consulta,
+    caso em que nada é aquecido."""
+    if versions is None:
+        return {}
+    values = {
+        product_key(row[1], versions[product_gen_key(row[1])]): dumps({"product": row_to_product(row[1:])})
+        for row in rows
+    }
+    for page in pages:
+        page_versions = {key: versions[key] for key in page["dependencies"]}
+        values[page["key"]] = page_value(page_versions, PRODUCTS_PAGE_DEFAULT, page["products"], page["next_after"])
+    return values
+
+def warmup_counter_keys(rows, pages):
+    """Contadores lidos depois de WARMUP_QUERY para versionar as entradas."""
+    dependencies = {key for page in pages for key in page["dependencies"]}
+    dependencies.update(product_gen_key(row[1]) for row in rows)
+    return sorted(dependencies) + [GEN_ALL_KEY]
+
+def warmup_batches(values):
+    """Divide as entradas do aquecimento em lotes de WARMUP_BATCH_SIZE,
+    com as páginas (já comprimidas por pack_variants) separadas dos
+    produtos. Gera pares (lote, compress)."""
+    for packed in (False, True):
+        items = [(key, value) for key, value in values.items() if key.startswith("products:page:") == packed]
+        for index in range(0, len(items), WARMUP_BATCH_SIZE):
+            yield dict(items[index:index + WARMUP_BATCH_SIZE]), not packed
+
+def normalize_search_query(query):
+    return ' '.join(re.findall(r'\w+', unicodedata.normalize('NFKC', query).lower()))
+
+def build_prefix_tsquery(normalized):
+    return ' & '.join(f"{term}:*" for term in normalized.split())
@@ -0,0 +1,150 @@
+import logging
+import re
+import threading
+import time
+
+import psycopg2
+
+from db_pool import PoolTimeout
+
+logger = logging.getLogger(__name__)
+
+LSN_PATTERN = re.compile(r'^[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}$')
+
+
+def parse_lsn(text):
+    """Converte um LSN do PostgreSQL ('16/B374D848') em inteiro comparável."""
+    if not text or not LSN_PATTERN.match(text):
+        raise ValueError(f"Invalid LSN: {text!r}")
+    high, low = text.split('/')
+    return (int(high, 16) << 32) | int(low, 16)
+
+
+def format_lsn(value):
+    return f"{value >> 32:X}/{value & 0xFFFFFFFF:X}"
+
+
+def current_wal_lsn(conn):
+    """LSN atual do WAL no primário; chamado após o commit de uma escrita,
+    é um limite superior para o registro desse commit."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT pg_current_wal_lsn()::text")
+    lsn = parse_lsn(cursor.fetchone()[0])
+    cursor.close()
+    conn.rollback()
+    return lsn
+
+
+class ReplicaRouter:
+    """Distribui leituras entre réplicas (round-robin) e escritas no primário.
+
+    Uma leitura com min_lsn só vai para uma réplica que já aplicou esse LSN;
+    caso nenhuma tenha aplicado, vai para o primário. O último LSN aplicado
+    de cada réplica é memorizado para evitar a verificação quando já se sabe
+    que ela está à frente. Réplicas inacessíveis ficam fora da rotação por
+    retry_after segundos."""
+
+    def __init__(self, primary, replicas=(), retry_after=30.0):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._next = 0
+        self._replayed = [0] * len(self.replicas)
+        self._down_until = [0.0] * len(self.replicas)
+
+        self._primary_reads = 0
+        self._replica_reads = [0] * len(self.replicas)
+        self._lag_fallbacks = 0
+        self._error_fallbacks = 0
+        self._busy_fallbacks = 0
+
+    def _candidates(self):
+        now = time.monotonic()
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % max(len(self.replicas), 1)
+            return [
+                (start + offset) % len(self.replicas)
+                for offset in range(len(self.replicas))
+                if self._down_until[(start + offset) % len(self.replicas)] <= now
+            ]
+
+    def _mark_down(self, index, error):
+        logger.warning(f"Réplica {index} indisponível, usando outra rota: {error}")
+        with self._lock:
+            self._down_until[index] = time.monotonic() + self.retry_after
+            self._error_fallbacks += 1
+
+    def _replay_lsn(self, conn):
+        cursor = conn.cursor()
+        cursor.execute("SELECT pg_last_wal_replay_lsn()::text")
+        value = cursor.fetchone()[0]
+        cursor.close()
+        conn.rollback()
+        # NULL quando o servidor não está em recuperação (réplica promovida)
+        return parse_lsn(value) if value else None
+
+    def _caught_up(self, index, conn, min_lsn):
+        if not min_lsn or self._replayed[index] >= min_lsn:
+            return True
+        replayed = self._replay_lsn(conn)
+        if replayed is None:
+            return True
+        with self._lock:
+            self._replayed[index] = max(self._replayed[index], replayed)
+        return replayed >= min_lsn
+
+    def checkout_read(self, min_lsn=0):
+        """Retorna (conexão, pool) para uma leitura que precisa enxergar
+        tudo até min_lsn. A conexão deve ser devolvida com pool.putconn()."""
+        lagging = False
+        for index in self._candidates():
+            pool = self.replicas[index]
+            try:
+                conn = pool.getconn()
+            except PoolTimeout:
+                # Réplica saturada, mas saudável: tenta a próxima sem tirá-la de rota
+                with self._lock:
+                    self._busy_fallbacks += 1
+                continue
+            except psycopg2.Error as e:
+                self._mark_down(index, e)
+                continue
+            try:
+                caught_up = self._caught_up(index, conn, min_lsn)
+            except psycopg2.Error as e:
+                pool.putconn(conn, close=True)
+                self._mark_down(index, e)
+                continue
+            if caught_up:
+                with self._lock:
+                    self._replica_reads[index] += 1
+                return conn, pool
+            pool.putconn(conn)
+            lagging = True
+
+        with self._lock:
+            self._primary_reads += 1
+            if lagging:
+                self._lag_fallbacks += 1
+        return self.primary.getconn(), self.primary
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "primary_reads": self._primary_reads,
+                "lag_fallbacks": self._lag_fallbacks,
+                "error_fallbacks": self._error_fallbacks,
+                "busy_fallbacks": self._busy_fallbacks,
+                "replicas": [
+                    {
+                        "reads": self._replica_reads[index],
+                        "replayed_lsn": format_lsn(self._replayed[index]) if self._replayed[index] else None,
+                        "available": self._down_until[index] <= now,
+                        "pool": pool.stats()
+                    }
+                    for index, pool in enumerate(self.replicas)
+                ]
+            }
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class HealthProber:
+    """Verifica as dependências em segundo plano, em intervalo fixo, e guarda
+    o último resultado. Endpoints de health apenas leem esse resultado, então
+    probes do orquestrador não abrem conexões nem se acumulam durante uma
+    falha.
+
+    checks é um dicionário nome -> função que levanta exceção em caso de
+    falha. O estado deixa de ser considerado pronto se nenhuma verificação
+    terminar em stale_after segundos (prober travado)."""
+
+    def __init__(self, checks, interval=5.0, stale_after=None):
+        self.checks = checks
+        self.interval = interval
+        self.stale_after = stale_after if stale_after is not None else interval * 3
+        self._lock = threading.Lock()
+        self._results = {}
+        self._last_probe = None
+        self._runner = None
+        self._holds = set()
+
+    def hold(self, reason):
+        """Mantém o serviço fora de prontidão até release(reason),
+        por exemplo durante o aquecimento do cache."""
+        with self._lock:
+            self._holds.add(reason)
+
+    def release(self, reason):
+        with self._lock:
+            self._holds.discard(reason)
+
+    def _record(self, name, error, latency):
+        now = time.time()
+        with self._lock:
+            previous = self._results.get(name, {})
+            failures = previous.get("consecutive_failures", 0) + 1 if error else 0
+            self._results[name] = {
+                "status": "unhealthy" if error else "healthy",
+                "error": error,
+                "latency_ms": round(latency * 1000, 3),
+                "max_latency_ms": max(previous.get("max_latency_ms", 0.0), round(latency * 1000, 3)),
+                "consecutive_failures": failures,
+                "checked_at": now
+            }
+
+    def _finish(self):
+        with self._lock:
+            self._last_probe = time.time()
+
+    def probe_once(self):
+        for name, check in self.checks.items():
+            start = time.monotonic()
+            error = None
+            try:
+                check()
+            except Exception as e:
+                error = str(e) or e.__class__.__name__
+            self._record(name, error, time.monotonic() - start)
+        self._finish()
+
+    def start(self):
+        with self._lock:
+            if self._runner is not None:
+                return
+            self._runner = threading.Thread(target=self._run, name="health-prober", daemon=True)
+            self._runner.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.probe_once()
+            except Exception as e:
+                logger.warning(f"Erro no prober de health: {e}")
+            time.sleep(self.interval)
+
+    def is_alive(self):
+        return self._runner is not None and self._runner.is_alive()
+
+    def snapshot(self):
+        now = time.time()
+        with self._lock:
+            results = {name: dict(result) for name, result in self._results.items()}
+            last_probe = self._last_probe
+            holds = sorted(self._holds)
+
+        if last_probe is None:
+            status = "starting"
+        elif holds:
+            status = "warming"
+        elif now - last_probe > self.stale_after:
+            status = "stale"
+        elif any(result["status"] != "healthy" for result in results.values()):
+            status = "degraded"
+        else:
+            status = "healthy"
+
+        for result in results.values():
+            result["checked_at"] = datetime.fromtimestamp(result["checked_at"]).isoformat()
+        return {
+            "status": status,
+            "ready": status == "healthy",
+            "last_probe": datetime.fromtimestamp(last_probe).isoformat() if last_probe else None,
+            "probe_age_seconds": round(now - last_probe, 3) if last_probe else None,
+            "holds": holds,
+            "dependencies": results
+        }
+
+
+class AsyncHealthProber(HealthProber):
+    """HealthProber para aplicações asyncio: as verificações são funções
+    assíncronas e o laço roda como uma task no event loop."""
+
+    def __init__(self, checks, interval=5.0, stale_after=None, timeout=2.0):
+        super().__init__(checks, interval, stale_after)
+        self.timeout = timeout
+
+    async def probe_once(self):
+        for name, check in self.checks.items():
+            start = time.monotonic()
+            error = None
+            try:
+                await asyncio.wait_for(check(), self.timeout)
+            except asyncio.TimeoutError:
+                error = f"timeout after {self.timeout:.1f}s"
+            except Exception as e:
+                error = str(e) or e.__class__.__name__
+            self._record(name, error, time.monotonic() - start)
+        self._finish()
+
+    def start(self):
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await self.probe_once()
+            except Exception as e:
+                logger.warning(f"Erro no prober de health: {e}")
+            await asyncio.sleep(self.interval)
+
+    def is_alive(self):
+        return self._runner is not None and not self._runner.done()
+
+    def stop(self):
+        if self._runner is not None:
+            self._runner.cancel()
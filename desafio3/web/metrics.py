@@ -0,0 +1,99 @@
+"""Métricas Prometheus da API de produtos.
+
+Contadores e histogramas são por processo; com vários workers, defina
+PROMETHEUS_MULTIPROC_DIR (diretório vazio e gravável, limpo a cada
+inicialização) para que os valores sejam gravados em arquivos mmap e
+somados por /metrics, qualquer que seja o worker que atenda a coleta."""
+import os
+import time
+
+import psycopg2.extensions
+import psycopg2.sql
+from flask import Response, g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+    generate_latest, multiprocess
+)
+
+REQUESTS = Counter(
+    'http_requests_total',
+    'Requisições HTTP atendidas',
+    ['method', 'route', 'status']
+)
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Latência das requisições HTTP',
+    ['method', 'route'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+CACHE_LOOKUPS = Counter(
+    'app_cache_lookups_total',
+    'Consultas ao cache de produtos feitas por esta aplicação',
+    ['cache', 'result']
+)
+DB_QUERY_LATENCY = Histogram(
+    'db_query_duration_seconds',
+    'Duração das instruções SQL',
+    ['endpoint', 'operation'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+
+
+def count_lookup(cache, hit, count=1):
+    CACHE_LOOKUPS.labels(cache=cache, result='hit' if hit else 'miss').inc(count)
+
+
+def metrics_payload():
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class TimedCursor(psycopg2.extensions.cursor):
+    """Cursor que registra a duração de cada instrução em
+    db_query_duration_seconds, rotulada pelo endpoint da requisição."""
+
+    def _observe(self, query, start):
+        if isinstance(query, psycopg2.sql.Composable):
+            query = query.as_string(self)
+        operation = query.split(None, 1)[0].upper() if query.strip() else 'EMPTY'
+        endpoint = (request.endpoint or 'unmatched') if has_request_context() else 'background'
+        DB_QUERY_LATENCY.labels(endpoint=endpoint, operation=operation).observe(time.perf_counter() - start)
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            self._observe(query, start)
+
+    def copy_expert(self, sql, file, size=8192):
+        start = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            self._observe(sql, start)
+
+
+def init_app(app):
+    """Registra a medição de todas as rotas e o endpoint /metrics."""
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('request_started', None)
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUESTS.labels(method=request.method, route=route, status=response.status_code).inc()
+        if started is not None:
+            REQUEST_LATENCY.labels(method=request.method, route=route).observe(time.perf_counter() - started)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        payload, content_type = metrics_payload()
+        return Response(payload, content_type=content_type)
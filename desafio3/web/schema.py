@@ -0,0 +1,91 @@
+"""Migração idempotente do esquema, aplicada na inicialização.
+
+O init.sql só roda quando o volume do PostgreSQL é criado; bancos já
+existentes recebem aqui a extensão, os índices, a tabela de resumo e os
+gatilhos adicionados depois, além da carga inicial de product_stats."""
+
+# Roda numa única transação: CREATE TRIGGER bloqueia escritas em products
+# até o commit, então a carga final de product_stats conta exatamente as
+# linhas que os gatilhos ainda não viram. Só recalcula enquanto
+# reconciled_at for NULL (tabela recém-criada ou nunca reconciliada).
+SCHEMA_MIGRATION = """
+SELECT pg_advisory_xact_lock(hashtext('schema_migration'));
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_products_search ON products USING GIN (
+    to_tsvector('simple', name || ' ' || coalesce(description, ''))
+);
+
+CREATE INDEX IF NOT EXISTS idx_products_name_trgm ON products USING GIN (name gin_trgm_ops);
+
+CREATE TABLE IF NOT EXISTS product_stats (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    total_products BIGINT NOT NULL DEFAULT 0,
+    total_stock BIGINT NOT NULL DEFAULT 0,
+    reconciled_at TIMESTAMP
+);
+
+INSERT INTO product_stats (id) VALUES (TRUE) ON CONFLICT DO NOTHING;
+
+CREATE OR REPLACE FUNCTION product_stats_after_insert() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE product_stats
+    SET total_products = total_products + (SELECT COUNT(*) FROM new_rows),
+        total_stock = total_stock + (SELECT COALESCE(SUM(stock), 0) FROM new_rows);
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION product_stats_after_update() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE product_stats
+    SET total_stock = total_stock + (SELECT COALESCE(SUM(stock), 0) FROM new_rows)
+        - (SELECT COALESCE(SUM(stock), 0) FROM old_rows);
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION product_stats_after_delete() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE product_stats
+    SET total_products = total_products - (SELECT COUNT(*) FROM old_rows),
+        total_stock = total_stock - (SELECT COALESCE(SUM(stock), 0) FROM old_rows);
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE TRIGGER products_stats_insert
+AFTER INSERT ON products REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION product_stats_after_insert();
+
+CREATE OR REPLACE TRIGGER products_stats_update
+AFTER UPDATE ON products REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION product_stats_after_update();
+
+CREATE OR REPLACE TRIGGER products_stats_delete
+AFTER DELETE ON products REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION product_stats_after_delete();
+
+UPDATE product_stats
+SET total_products = totals.total_products,
+    total_stock = totals.total_stock,
+    reconciled_at = CURRENT_TIMESTAMP
+FROM (
+    SELECT COUNT(*) AS total_products, COALESCE(SUM(stock), 0) AS total_stock
+    FROM products
+) AS totals
+WHERE product_stats.reconciled_at IS NULL;
+"""
+
+
+def migrate_schema(conn):
+    cursor = conn.cursor()
+    cursor.execute(SCHEMA_MIGRATION)
+    conn.commit()
+    cursor.close()
+
+
+async def migrate_schema_async(conn):
+    async with conn.transaction():
+        await conn.execute(SCHEMA_MIGRATION)
@@ -26,7 +26,7 @@ docker network create $NETWORK_NAME
 echo -e "${GREEN}✓ Rede '$NETWORK_NAME' criada${NC}"
 
 echo -e "\n${YELLOW}[3/6] Construindo imagem do Serviço A (Usuários)...${NC}"
-docker build -t desafio4-service-a ./service-a
+docker build -t desafio4-service-a -f service-a/Dockerfile .
 if [ $? -eq 0 ]; then
     echo -e "${GREEN}✓ Imagem do Serviço A construída${NC}"
 else
@@ -35,7 +35,7 @@ else
 fi
 
 echo -e "\n${YELLOW}[4/6] Construindo imagem do Serviço B (Agregador)...${NC}"
-docker build -t desafio4-service-b ./service-b
+docker build -t desafio4-service-b -f service-b/Dockerfile .
 if [ $? -eq 0 ]; then
     echo -e "${GREEN}✓ Imagem do Serviço B construída${NC}"
 else
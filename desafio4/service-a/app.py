@@ -3,7 +3,10 @@ import logging
 from datetime import datetime, timedelta
 import uuid
 
+from metrics import init_app as init_metrics
+
 app = Flask(__name__)
+init_metrics(app)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -68,6 +71,9 @@ def home():
         "endpoints": {
             "GET /": "Informações do serviço",
             "GET /health": "Health check",
+            "GET /livez": "Liveness do processo",
+            "GET /readyz": "Readiness (serviço sem dependências externas)",
+            "GET /metrics": "Métricas Prometheus",
             "GET /users": "Lista todos os usuários",
             "GET /users/<id>": "Busca usuário por ID",
             "POST /users": "Cria novo usuário",
@@ -86,6 +92,14 @@ def health():
         "total_users": len(users_db)
     }), 200
 
+@app.route('/livez')
+def livez():
+    return jsonify({"status": "alive"}), 200
+
+@app.route('/readyz')
+def readyz():
+    return jsonify({"service": "users-service", "ready": True}), 200
+
 @app.route('/users', methods=['GET'])
 def get_users():
     status_filter = request.args.get('status')
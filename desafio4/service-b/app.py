@@ -1,9 +1,16 @@
 from flask import Flask, jsonify, request
 import requests
 import logging
+import os
+import threading
+import time
 from datetime import datetime, timedelta
+from prometheus_client import Histogram
+
+from metrics import init_app as init_metrics
 
 app = Flask(__name__)
+init_metrics(app)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -12,6 +19,30 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 SERVICE_A_URL = "http://service-a:5001"
+HEALTH_PROBE_INTERVAL = float(os.getenv('HEALTH_PROBE_INTERVAL', '5'))
+HEALTH_PROBE_TIMEOUT = float(os.getenv('HEALTH_PROBE_TIMEOUT', '2'))
+HEALTH_FAILURE_THRESHOLD = int(os.getenv('HEALTH_FAILURE_THRESHOLD', '3'))
+
+UPSTREAM_LATENCY = Histogram(
+    'upstream_request_duration_seconds',
+    'Latência das chamadas a outros serviços',
+    ['service', 'method', 'outcome']
+)
+
+def upstream_request(service, method, url, **kwargs):
+    """requests.request com a duração registrada em UPSTREAM_LATENCY;
+    outcome é o status HTTP ou o nome da exceção."""
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        response = requests.request(method, url, **kwargs)
+        outcome = str(response.status_code)
+        return response
+    except requests.exceptions.RequestException as e:
+        outcome = e.__class__.__name__
+        raise
+    finally:
+        UPSTREAM_LATENCY.labels(service, method, outcome).observe(time.perf_counter() - start)
 
 user_activities = {
     "1": {"last_login": "2025-11-18 14:30:00", "total_logins": 245, "projects": 8},
@@ -21,22 +52,93 @@ user_activities = {
     "5": {"last_login": "2025-11-10 11:00:00", "total_logins": 87, "projects": 3}
 }
 
+class ServiceAProber:
+    """Thread que chama GET /readyz do Serviço A a cada intervalo; /health e
+    /readyz deste serviço devolvem o último resultado. Uma falha isolada
+    do Serviço A só degrada o status: a prontidão cai após
+    failure_threshold falhas seguidas."""
+    
+    def __init__(self, url, interval, timeout, failure_threshold):
+        self.url = url
+        self.interval = interval
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.session = requests.Session()
+        self._lock = threading.Lock()
+        self._result = None
+        self._failures = 0
+        self._last_probe = None
+        self._thread = None
+    
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="health-prober", daemon=True)
+                self._thread.start()
+    
+    def _run(self):
+        while True:
+            start = time.monotonic()
+            try:
+                response = self.session.get(self.url, timeout=self.timeout)
+                error = None if response.status_code == 200 else f"HTTP {response.status_code}"
+            except requests.exceptions.RequestException as e:
+                error = e.__class__.__name__
+            result = {
+                "status": "healthy" if error is None else "unhealthy",
+                "error": error,
+                "latency_ms": round((time.monotonic() - start) * 1000, 3),
+                "checked_at": datetime.now().isoformat()
+            }
+            with self._lock:
+                self._failures = 0 if error is None else self._failures + 1
+                result["consecutive_failures"] = self._failures
+                self._result = result
+                self._last_probe = time.monotonic()
+            time.sleep(self.interval)
+    
+    def snapshot(self):
+        with self._lock:
+            result = self._result
+            last_probe = self._last_probe
+        
+        if last_probe is None:
+            status = "starting"
+        elif time.monotonic() - last_probe > self.interval * 3:
+            status = "stale"
+        elif result["status"] != "healthy":
+            status = "degraded"
+        else:
+            status = "healthy"
+        failing = result is not None and result["consecutive_failures"] >= self.failure_threshold
+        return {
+            "status": status,
+            "ready": status in ("healthy", "degraded") and not failing,
+            "probe_age_seconds": round(time.monotonic() - last_probe, 3) if last_probe else None,
+            "dependencies": {"service-a": dict(result)} if result else {}
+        }
+
+health_prober = ServiceAProber(
+    f"{SERVICE_A_URL}/readyz",
+    HEALTH_PROBE_INTERVAL,
+    HEALTH_PROBE_TIMEOUT,
+    HEALTH_FAILURE_THRESHOLD
+)
+health_prober.start()
+
 def call_service_a(endpoint, method='GET', data=None):
     url = f"{SERVICE_A_URL}{endpoint}"
     
     try:
         logger.info(f"📡 Chamando Serviço A: {method} {url}")
         
-        if method == 'GET':
-            response = requests.get(url, timeout=10)
-        elif method == 'POST':
-            response = requests.post(url, json=data, timeout=10)
-        elif method == 'PUT':
-            response = requests.put(url, json=data, timeout=10)
-        elif method == 'DELETE':
-            response = requests.delete(url, timeout=10)
-        else:
+        if method not in ('GET', 'POST', 'PUT', 'DELETE'):
             return None
+        response = upstream_request(
+            'service-a', method, url,
+            json=data if method in ('POST', 'PUT') else None,
+            timeout=10
+        )
         
         if response.status_code in [200, 201]:
             logger.info(f"✓ Resposta do Serviço A: {response.status_code}")
@@ -64,7 +166,10 @@ def home():
         "depends_on": ["service-a (Users Service)"],
         "endpoints": {
             "GET /": "Informações do serviço",
-            "GET /health": "Health check",
+            "GET /health": "Health check (estado mantido pelo prober em segundo plano)",
+            "GET /livez": "Liveness do processo",
+            "GET /readyz": "Readiness: último estado do Serviço A",
+            "GET /metrics": "Métricas Prometheus",
             "GET /users-info": "Lista usuários com informações agregadas",
             "GET /users-info/<id>": "Informações completas de um usuário",
             "GET /active-users": "Lista usuários ativos com detalhes",
@@ -75,27 +180,28 @@ def home():
 
 @app.route('/health')
 def health():
+    probe = health_prober.snapshot()
     health_status = {
         "service": "aggregator-service",
-        "status": "healthy",
+        "status": probe["status"],
         "timestamp": datetime.now().isoformat(),
-        "dependencies": {}
+        "dependencies": {
+            name: result["status"] for name, result in probe["dependencies"].items()
+        }
     }
     
-    try:
-        service_a_health = call_service_a('/health')
-        if service_a_health:
-            health_status["dependencies"]["service-a"] = "healthy"
-        else:
-            health_status["dependencies"]["service-a"] = "unhealthy"
-            health_status["status"] = "degraded"
-    except Exception as e:
-        health_status["dependencies"]["service-a"] = f"unhealthy: {str(e)}"
-        health_status["status"] = "degraded"
-    
-    status_code = 200 if health_status["status"] == "healthy" else 503
+    status_code = 200 if probe["ready"] else 503
     return jsonify(health_status), status_code
 
+@app.route('/livez')
+def livez():
+    return jsonify({"status": "alive"}), 200
+
+@app.route('/readyz')
+def readyz():
+    probe = health_prober.snapshot()
+    return jsonify(probe), 200 if probe["ready"] else 503
+
 @app.route('/users-info', methods=['GET'])
 def get_users_info():
     users_data = call_service_a('/users')
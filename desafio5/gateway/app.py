@@ -1,30 +1,138 @@
-from flask import Flask, jsonify, request, Response
+from flask import Flask, Response, jsonify, request
 import requests
 import logging
+import os
+import threading
+import time
 from datetime import datetime
+from prometheus_client import Histogram
+
+from metrics import init_app as init_metrics
 
 app = Flask(__name__)
+init_metrics(app)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 USERS_SERVICE_URL = "http://users-service:5001"
 ORDERS_SERVICE_URL = "http://orders-service:5003"
+SERVICE_NAMES = {USERS_SERVICE_URL: "users-service", ORDERS_SERVICE_URL: "orders-service"}
+HEALTH_PROBE_INTERVAL = float(os.getenv('HEALTH_PROBE_INTERVAL', '5'))
+HEALTH_PROBE_TIMEOUT = float(os.getenv('HEALTH_PROBE_TIMEOUT', '2'))
+HEALTH_FAILURE_THRESHOLD = int(os.getenv('HEALTH_FAILURE_THRESHOLD', '3'))
+
+UPSTREAM_LATENCY = Histogram(
+    'upstream_request_duration_seconds',
+    'Latência das chamadas a outros serviços',
+    ['service', 'method', 'outcome']
+)
+
+def upstream_request(service, method, url, **kwargs):
+    """requests.request com a duração registrada em UPSTREAM_LATENCY;
+    outcome é o status HTTP ou o nome da exceção."""
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        response = requests.request(method, url, **kwargs)
+        outcome = str(response.status_code)
+        return response
+    except requests.exceptions.RequestException as e:
+        outcome = e.__class__.__name__
+        raise
+    finally:
+        UPSTREAM_LATENCY.labels(service, method, outcome).observe(time.perf_counter() - start)
+
+class DependencyProber:
+    """Consulta as dependências em segundo plano e guarda o último resultado,
+    para que /health e /readyz respondam sem chamar outros serviços. Uma
+    falha isolada só degrada o status: a prontidão cai quando alguma
+    dependência acumula failure_threshold falhas seguidas."""
+    
+    def __init__(self, dependencies, interval, timeout, failure_threshold):
+        self.dependencies = dependencies
+        self.interval = interval
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.session = requests.Session()
+        self._lock = threading.Lock()
+        self._results = {}
+        self._last_probe = None
+        self._thread = None
+    
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="health-prober", daemon=True)
+                self._thread.start()
+    
+    def _run(self):
+        while True:
+            for name, url in self.dependencies.items():
+                start = time.monotonic()
+                try:
+                    response = self.session.get(url, timeout=self.timeout)
+                    error = None if response.status_code == 200 else f"HTTP {response.status_code}"
+                except requests.exceptions.RequestException as e:
+                    error = e.__class__.__name__
+                latency_ms = round((time.monotonic() - start) * 1000, 3)
+                with self._lock:
+                    previous = self._results.get(name)
+                    failures = 0 if error is None else (previous["consecutive_failures"] if previous else 0) + 1
+                    self._results[name] = {
+                        "status": "healthy" if error is None else "unhealthy",
+                        "error": error,
+                        "consecutive_failures": failures,
+                        "latency_ms": latency_ms,
+                        "checked_at": datetime.now().isoformat()
+                    }
+            with self._lock:
+                self._last_probe = time.monotonic()
+            time.sleep(self.interval)
+    
+    def snapshot(self):
+        with self._lock:
+            results = {name: dict(result) for name, result in self._results.items()}
+            last_probe = self._last_probe
+        
+        if last_probe is None:
+            status = "starting"
+        elif time.monotonic() - last_probe > self.interval * 3:
+            status = "stale"
+        elif any(result["status"] != "healthy" for result in results.values()):
+            status = "degraded"
+        else:
+            status = "healthy"
+        failing = any(result["consecutive_failures"] >= self.failure_threshold for result in results.values())
+        return {
+            "status": status,
+            "ready": status in ("healthy", "degraded") and not failing,
+            "probe_age_seconds": round(time.monotonic() - last_probe, 3) if last_probe else None,
+            "dependencies": results
+        }
+
+health_prober = DependencyProber(
+    {
+        "users-service": f"{USERS_SERVICE_URL}/readyz",
+        "orders-service": f"{ORDERS_SERVICE_URL}/readyz"
+    },
+    HEALTH_PROBE_INTERVAL,
+    HEALTH_PROBE_TIMEOUT,
+    HEALTH_FAILURE_THRESHOLD
+)
+health_prober.start()
 
 def forward_request(service_url, path, method='GET', data=None):
     url = f"{service_url}{path}"
     try:
         logger.info(f"🔀 Gateway encaminhando: {method} {url}")
         
-        if method == 'GET':
-            response = requests.get(url, timeout=10)
-        elif method == 'POST':
-            response = requests.post(url, json=data, timeout=10)
-        elif method == 'PUT':
-            response = requests.put(url, json=data, timeout=10)
-        elif method == 'DELETE':
-            response = requests.delete(url, timeout=10)
-        else:
+        if method not in ('GET', 'POST', 'PUT', 'DELETE'):
             return jsonify({"error": "Method not allowed"}), 405
+        response = upstream_request(
+            SERVICE_NAMES[service_url], method, url,
+            json=data if method in ('POST', 'PUT') else None,
+            timeout=10
+        )
         
         logger.info(f"✓ Resposta recebida: {response.status_code}")
         return Response(response.content, status=response.status_code, content_type='application/json')
@@ -47,7 +155,10 @@ def home():
         "description": "Ponto único de entrada para todos os microsserviços",
         "available_routes": {
             "GET /": "Informações do gateway",
-            "GET /health": "Health check de todos os serviços",
+            "GET /health": "Health check de todos os serviços (estado mantido pelo prober)",
+            "GET /livez": "Liveness do gateway",
+            "GET /readyz": "Readiness: último estado dos serviços",
+            "GET /metrics": "Métricas Prometheus",
             "GET /users": "Lista usuários (via Users Service)",
             "GET /users/<id>": "Busca usuário (via Users Service)",
             "POST /users": "Cria usuário (via Users Service)",
@@ -64,29 +175,28 @@ def home():
 
 @app.route('/health')
 def health():
+    probe = health_prober.snapshot()
     health_status = {
         "gateway": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "services": {}
+        "services": {
+            name: result["status"] for name, result in probe["dependencies"].items()
+        }
     }
     
-    try:
-        resp = requests.get(f"{USERS_SERVICE_URL}/health", timeout=5)
-        health_status["services"]["users-service"] = "healthy" if resp.status_code == 200 else "unhealthy"
-    except:
-        health_status["services"]["users-service"] = "unhealthy"
-    
-    try:
-        resp = requests.get(f"{ORDERS_SERVICE_URL}/health", timeout=5)
-        health_status["services"]["orders-service"] = "healthy" if resp.status_code == 200 else "unhealthy"
-    except:
-        health_status["services"]["orders-service"] = "unhealthy"
-    
-    all_healthy = all(s == "healthy" for s in health_status["services"].values())
-    overall_status = 200 if all_healthy else 503
+    overall_status = 200 if probe["ready"] else 503
     
     return jsonify(health_status), overall_status
 
+@app.route('/livez')
+def livez():
+    return jsonify({"status": "alive"}), 200
+
+@app.route('/readyz')
+def readyz():
+    probe = health_prober.snapshot()
+    return jsonify(probe), 200 if probe["ready"] else 503
+
 
 @app.route('/users', methods=['GET', 'POST'])
 def users():
@@ -120,7 +230,7 @@ def user_orders(user_id):
     logger.info(f"🔄 Orquestrando requisição para usuário {user_id} e seus pedidos")
     
     try:
-        user_response = requests.get(f"{USERS_SERVICE_URL}/users/{user_id}", timeout=10)
+        user_response = upstream_request("users-service", "GET", f"{USERS_SERVICE_URL}/users/{user_id}", timeout=10)
         if user_response.status_code != 200:
             return jsonify({"error": "User not found"}), 404
         user_data = user_response.json()
@@ -129,7 +239,7 @@ def user_orders(user_id):
         return jsonify({"error": "Could not fetch user"}), 503
     
     try:
-        orders_response = requests.get(f"{ORDERS_SERVICE_URL}/orders?user_id={user_id}", timeout=10)
+        orders_response = upstream_request("orders-service", "GET", f"{ORDERS_SERVICE_URL}/orders?user_id={user_id}", timeout=10)
         orders_data = orders_response.json() if orders_response.status_code == 200 else {"orders": []}
     except Exception as e:
         logger.error(f"Erro ao buscar pedidos: {e}")
@@ -2,7 +2,10 @@ from flask import Flask, jsonify, request
 import logging
 from datetime import datetime
 
+from metrics import init_app as init_metrics
+
 app = Flask(__name__)
+init_metrics(app)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -16,6 +19,14 @@ orders_db = {
 def health():
     return jsonify({"service": "orders-service", "status": "healthy"}), 200
 
+@app.route('/livez')
+def livez():
+    return jsonify({"status": "alive"}), 200
+
+@app.route('/readyz')
+def readyz():
+    return jsonify({"service": "orders-service", "ready": True}), 200
+
 @app.route('/orders', methods=['GET'])
 def get_orders():
     user_id = request.args.get('user_id')
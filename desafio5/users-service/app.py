@@ -1,7 +1,10 @@
 from flask import Flask, jsonify, request
 import logging
 
+from metrics import init_app as init_metrics
+
 app = Flask(__name__)
+init_metrics(app)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -15,6 +18,14 @@ users_db = {
 def health():
     return jsonify({"service": "users-service", "status": "healthy"}), 200
 
+@app.route('/livez')
+def livez():
+    return jsonify({"status": "alive"}), 200
+
+@app.route('/readyz')
+def readyz():
+    return jsonify({"service": "users-service", "ready": True}), 200
+
 @app.route('/users', methods=['GET'])
 def get_users():
     logger.info("✓ Listando usuários")